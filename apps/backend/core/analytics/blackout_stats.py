@@ -0,0 +1,197 @@
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from core.analytics.cache import cached_result
+from core.analytics.data_source import (
+    BLACKOUT_DISTRICTS_SQL,
+    BLACKOUTS_SQL,
+    DEFAULT_CHUNK_SIZE,
+    iter_chunks,
+    load_weather,
+    with_durations,
+)
+
+# Расчеты из analytics/analytics_middle_stage.ipynb: распределение длительности по типам,
+# частота отключений по районам и связь длительности с погодой.
+# Каждая порция данных сворачивается в небольшие агрегаты (счетчики по бинам длительности,
+# суммы), которые складываются между порциями — память не зависит от размера датасета.
+# Медианы и квантили считаются по бинам ширины bin_width (по умолчанию 15 минут, как в гистограммах).
+
+DEFAULT_BIN_WIDTH_HOURS = 0.25
+
+DISTRICT_LEVELS = {
+    "district": ("district_id", "districts"),
+    "folk_district": ("folk_district_id", "folk_districts"),
+    "big_folk_district": ("big_folk_district_id", "big_folk_districts"),
+}
+
+
+def add_bin_counts(total: pd.Series | None, keys: pd.Series, durations: pd.Series, bin_width: float) -> pd.Series:
+    """Прибавляет к total число строк по (ключ, номер бина длительности)."""
+    bins = np.floor(durations.to_numpy() / bin_width).astype(np.int64)
+    counts = pd.Series(1, index=pd.MultiIndex.from_arrays([keys.to_numpy(), bins], names=["key", "bin"])).groupby(level=[0, 1]).sum()
+    return counts if total is None else total.add(counts, fill_value=0)
+
+
+def binned_quantile(bin_counts: pd.Series, bin_width: float, q: float) -> float:
+    """
+    Квантиль по счетчикам бинов (индекс — номер бина): нижняя граница бина, в который он попадает.
+    Длительности в данных кратны 15 минутам, поэтому при bin_width=0.25 значение точное.
+    """
+    bin_counts = bin_counts.sort_index()
+    cumulative = bin_counts.cumsum().to_numpy()
+    if not len(cumulative):
+        return float("nan")
+    position = int(np.searchsorted(cumulative, q * cumulative[-1]))
+    return float(bin_counts.index[position] * bin_width)
+
+
+@cached_result("duration_distribution")
+def duration_distribution(
+    dataset_path: str,
+    bin_width: float = DEFAULT_BIN_WIDTH_HOURS,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> dict:
+    """
+    Длительность отключений по типам.
+    Возвращает {"summary": DataFrame по типам, "histograms": {тип: Series счетчиков по номеру бина}, "bin_width"}.
+    """
+    conn = sqlite3.connect(dataset_path)
+    bin_counts = None
+    sums = []
+    for chunk in iter_chunks(conn, BLACKOUTS_SQL, chunk_size):
+        chunk = with_durations(chunk)
+        bin_counts = add_bin_counts(bin_counts, chunk["type"], chunk["duration_hours"], bin_width)
+        sums.append(chunk.groupby("type")["duration_hours"].agg(["count", "sum", "max"]))
+    conn.close()
+
+    if bin_counts is None:
+        return {"summary": pd.DataFrame(), "histograms": {}, "bin_width": bin_width}
+
+    totals = pd.concat(sums).groupby(level=0).agg({"count": "sum", "sum": "sum", "max": "max"})
+    histograms = {blackout_type: bin_counts.xs(blackout_type, level="key") for blackout_type in totals.index}
+
+    summary = pd.DataFrame({
+        "count": totals["count"].astype(int),
+        "total_duration_hours": totals["sum"],
+        "average_duration_hours": totals["sum"] / totals["count"],
+        "median_duration_hours": [binned_quantile(histograms[t], bin_width, 0.5) for t in totals.index],
+        "p90_duration_hours": [binned_quantile(histograms[t], bin_width, 0.9) for t in totals.index],
+        "max_duration_hours": totals["max"],
+    }, index=totals.index).sort_values("count", ascending=False)
+    summary["count_share"] = summary["count"] / summary["count"].sum() * 100
+
+    return {"summary": summary, "histograms": histograms, "bin_width": bin_width}
+
+
+@cached_result("district_frequency")
+def district_frequency(
+    dataset_path: str,
+    level: str = "district",
+    bin_width: float = DEFAULT_BIN_WIDTH_HOURS,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> pd.DataFrame:
+    """
+    Частота отключений по районам уровня level (district, folk_district, big_folk_district):
+    уникальные отключения, суммарная и медианная длительность, здания и отключений на здание.
+    """
+    id_column, table = DISTRICT_LEVELS[level]
+
+    conn = sqlite3.connect(dataset_path)
+    bin_counts = None
+    totals = []
+    for chunk in iter_chunks(conn, BLACKOUT_DISTRICTS_SQL, chunk_size):
+        chunk = with_durations(chunk).dropna(subset=[id_column])
+        chunk = chunk.drop_duplicates(["blackout_id", id_column])
+        bin_counts = add_bin_counts(bin_counts, chunk[id_column], chunk["duration_hours"], bin_width)
+        totals.append(chunk.groupby(id_column)["duration_hours"].agg(["count", "sum"]))
+
+    names = pd.read_sql_query(f"SELECT id, name FROM {table}", conn).set_index("id")["name"]
+    buildings = pd.read_sql_query(
+        f"SELECT {id_column} AS id, COUNT(*) AS total_buildings FROM buildings GROUP BY {id_column}", conn
+    ).set_index("id")["total_buildings"]
+    conn.close()
+
+    if bin_counts is None:
+        return pd.DataFrame()
+
+    totals = pd.concat(totals).groupby(level=0).sum()
+    medians = bin_counts.groupby(level="key").apply(
+        lambda counts: binned_quantile(counts.droplevel("key"), bin_width, 0.5)
+    )
+
+    analysis = pd.DataFrame({
+        "total_blackouts": totals["count"].astype(int),
+        "total_duration_hours": totals["sum"],
+        "median_duration_hours": medians,
+        "total_buildings": buildings.reindex(totals.index),
+    })
+    analysis["blackouts_per_building"] = analysis["total_blackouts"] / analysis["total_buildings"]
+    analysis.index = pd.Index([names.get(district_id, district_id) for district_id in analysis.index], name=f"{level}_name")
+    return analysis.sort_values("total_blackouts", ascending=False)
+
+
+@cached_result("weather_correlation")
+def weather_correlation(
+    dataset_path: str,
+    weather_path: str,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> dict:
+    """
+    Связь длительности с погодой в день начала отключения.
+    Корреляция Пирсона по накопленным суммам (точная, без хранения строк) для длительности
+    и log1p(длительности) — у длительности очень длинный хвост.
+    Возвращает {"correlation": DataFrame по типам + all, "by_weather_type": DataFrame}.
+    """
+    weather = load_weather(weather_path)
+    features = ["temp_max", "temp_min"]
+    targets = {"duration": lambda d: d, "log_duration": np.log1p}
+
+    conn = sqlite3.connect(dataset_path)
+    moments = []
+    by_weather = []
+    for chunk in iter_chunks(conn, BLACKOUTS_SQL, chunk_size):
+        chunk = with_durations(chunk)
+        chunk["date"] = chunk["start_date"].dt.normalize()
+        chunk = chunk.join(weather, on="date", how="inner")
+        chunk = chunk.dropna(subset=features)
+
+        sums = pd.DataFrame({"type": chunk["type"], "n": 1.0})
+        for target, transform in targets.items():
+            y = transform(chunk["duration_hours"])
+            sums[target] = y
+            sums[f"{target}^2"] = y * y
+            for feature in features:
+                sums[f"{feature}*{target}"] = chunk[feature] * y
+        for feature in features:
+            sums[feature] = chunk[feature]
+            sums[f"{feature}^2"] = chunk[feature] * chunk[feature]
+        moments.append(sums.groupby("type").sum())
+
+        by_weather.append(chunk.groupby("weather_type")["duration_hours"].agg(["count", "sum"]))
+    conn.close()
+
+    if not moments:
+        return {"correlation": pd.DataFrame(), "by_weather_type": pd.DataFrame()}
+
+    moments = pd.concat(moments).groupby(level=0).sum()
+    moments.loc["all"] = moments.sum()
+
+    correlation = pd.DataFrame({"n": moments["n"].astype(int)})
+    n = moments["n"]
+    for target in targets:
+        for feature in features:
+            covariance = moments[f"{feature}*{target}"] - moments[feature] * moments[target] / n
+            variance_x = moments[f"{feature}^2"] - moments[feature] ** 2 / n
+            variance_y = moments[f"{target}^2"] - moments[target] ** 2 / n
+            correlation[f"corr_{target}_{feature}"] = covariance / np.sqrt(variance_x * variance_y)
+
+    by_weather = pd.concat(by_weather).groupby(level=0).sum()
+    by_weather_type = pd.DataFrame({
+        "count": by_weather["count"].astype(int),
+        "average_duration_hours": by_weather["sum"] / by_weather["count"],
+    }).sort_values("count", ascending=False)
+
+    return {"correlation": correlation, "by_weather_type": by_weather_type}
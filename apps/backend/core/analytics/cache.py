@@ -0,0 +1,48 @@
+import hashlib
+import inspect
+import os
+from functools import wraps
+
+import joblib
+
+from core.analytics.data_source import data_version
+from core.config.settings import ANALYTICS_CACHE_DIR
+
+# Кэш результатов аналитики на диске. Ключ — имя расчета, версия файлов баз
+# (все аргументы с именем *_path) и остальные параметры, так что после изменения
+# dataset.db или weather.db результат пересчитывается автоматически.
+
+
+def cached_result(name: str, ignore: tuple[str, ...] = ("chunk_size",)):
+    """Декоратор: результат функции сохраняется через joblib; use_cache=False — пересчитать и перезаписать."""
+
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @wraps(func)
+        def wrapper(*args, use_cache: bool = True, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+
+            paths = [value for key, value in bound.arguments.items() if key.endswith("_path")]
+            params = sorted(
+                (key, value) for key, value in bound.arguments.items()
+                if not key.endswith("_path") and key not in ignore
+            )
+            params_hash = hashlib.sha1(repr(params).encode()).hexdigest()[:8]
+            cache_path = os.path.join(ANALYTICS_CACHE_DIR, f"{name}_{data_version(*paths)}_{params_hash}.joblib")
+
+            if use_cache and os.path.exists(cache_path):
+                return joblib.load(cache_path)
+
+            result = func(*bound.args, **bound.kwargs)
+
+            os.makedirs(ANALYTICS_CACHE_DIR, exist_ok=True)
+            tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+            joblib.dump(result, tmp_path)
+            os.replace(tmp_path, cache_path)
+            return result
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,67 @@
+import hashlib
+import os
+import sqlite3
+from typing import Iterator
+
+import pandas as pd
+
+# Чтение датасета порциями по диапазонам rowid таблицы blackouts.
+# Все связи отключения с зданиями попадают в ту же порцию, что и само отключение,
+# поэтому агрегаты «по уникальным отключениям» можно считать по порциям и складывать.
+
+DEFAULT_CHUNK_SIZE = 20_000
+
+BLACKOUTS_SQL = """
+SELECT b.id, b.type, b.start_date, b.end_date
+FROM blackouts b
+WHERE b.rowid > ? AND b.rowid <= ?
+"""
+
+BLACKOUT_DISTRICTS_SQL = """
+SELECT DISTINCT b.id AS blackout_id, b.type, b.start_date, b.end_date,
+    bu.district_id, bu.folk_district_id, bu.big_folk_district_id
+FROM blackouts b
+JOIN blackouts_buildings bb ON bb.blackout_id = b.id
+JOIN buildings bu ON bu.id = bb.building_id
+WHERE b.rowid > ? AND b.rowid <= ?
+"""
+
+
+def data_version(*paths: str | None) -> str:
+    """Версия данных для ключа кэша: путь, размер и время изменения каждого файла базы."""
+    digest = hashlib.sha1()
+    for path in paths:
+        if not path:
+            continue
+        stat = os.stat(path)
+        digest.update(f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return digest.hexdigest()[:16]
+
+
+def iter_chunks(conn: sqlite3.Connection, sql: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """Выполняет sql (с параметрами rowid_from, rowid_to) по диапазонам rowid blackouts."""
+    max_rowid = conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM blackouts").fetchone()[0]
+    for rowid_from in range(0, max_rowid, chunk_size):
+        chunk = pd.read_sql_query(sql, conn, params=(rowid_from, rowid_from + chunk_size))
+        if not chunk.empty:
+            yield chunk
+
+
+def with_durations(chunk: pd.DataFrame) -> pd.DataFrame:
+    """Добавляет start_date/end_date как datetime и duration_hours; некорректные и отрицательные строки отбрасываются."""
+    chunk["start_date"] = pd.to_datetime(chunk["start_date"], format="ISO8601", errors="coerce")
+    chunk["end_date"] = pd.to_datetime(chunk["end_date"], format="ISO8601", errors="coerce")
+    chunk["duration_hours"] = (chunk["end_date"] - chunk["start_date"]).dt.total_seconds() / 3600
+    return chunk[chunk["duration_hours"] >= 0].copy()
+
+
+def load_weather(weather_path: str) -> pd.DataFrame:
+    """Погода по дням (таблица маленькая — читается целиком), индекс — дата."""
+    conn = sqlite3.connect(weather_path)
+    weather = pd.read_sql_query("SELECT date, temp_max, temp_min, weather_type FROM weather", conn)
+    conn.close()
+
+    weather["date"] = pd.to_datetime(weather["date"], format="ISO8601", errors="coerce").dt.normalize()
+    weather["temp_max"] = pd.to_numeric(weather["temp_max"], errors="coerce")
+    weather["temp_min"] = pd.to_numeric(weather["temp_min"], errors="coerce")
+    return weather.dropna(subset=["date"]).drop_duplicates("date").set_index("date")
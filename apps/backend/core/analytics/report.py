@@ -0,0 +1,118 @@
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from core.analytics.blackout_stats import (
+    DEFAULT_BIN_WIDTH_HOURS,
+    DISTRICT_LEVELS,
+    district_frequency,
+    duration_distribution,
+    weather_correlation,
+)
+
+# Отчет по датасету и гистограммы длительности hist_<тип>.png (как в analytics_middle_stage.ipynb).
+# Результаты кэшируются в ANALYTICS_CACHE_DIR и пересчитываются только при изменении баз.
+#
+# Запуск из папки backend:
+#   python -m core.analytics.report --dataset ../../databases/dataset.db --weather ../../databases/weather.db --output ../../analytics
+
+ANALYTICS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "..", "analytics")
+
+
+def safe_filename(s):
+    return "".join(c if c.isalnum() or c in '._-' else '_' for c in str(s)).strip('_')
+
+
+def plot_histogram_for_type(blackout_type: str, bin_counts: pd.Series, bin_width: float, mean_hours: float, max_hours: float, output_dir: str) -> str:
+    """Гистограмма по готовым счетчикам бинов — оформление как в ноутбуке."""
+    # matplotlib нужен только для построения графиков
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    max_val = max(48, max_hours)  # минимум 48 часов охвата
+    n_bins = int(np.ceil(max_val / bin_width)) + 1
+    counts = np.zeros(n_bins)
+    in_range = bin_counts[bin_counts.index < n_bins]
+    counts[in_range.index.to_numpy()] = in_range.to_numpy()
+    edges = np.arange(n_bins + 1) * bin_width
+
+    fig, ax = plt.subplots(figsize=(10, 6))
+    ax.stairs(counts, edges, fill=True, edgecolor='black', facecolor='#69b3a2')
+
+    ax.axvline(mean_hours, color='red', linestyle='--', linewidth=1.5)
+
+    ax.set_title(f'Распределение длительности отключений ({blackout_type})')
+    ax.set_xlabel('Длительность отключения (часы)')
+    ax.set_ylabel('Количество отключений')
+    ax.grid(True, alpha=0.3)
+
+    xticks = np.linspace(0, max_val, num=13)
+    ax.set_xticks(np.round(xticks, 2))
+
+    total = int(bin_counts.sum())
+    plt.subplots_adjust(bottom=0.18)
+    plt.figtext(0.5, 0.02, f'Средняя длительность: {mean_hours:.2f} ч    (n={total})',
+                ha='center', fontsize=10, bbox=dict(facecolor='white', alpha=0.8, edgecolor='none'))
+
+    output_path = os.path.join(output_dir, f'hist_{safe_filename(blackout_type)}.png')
+    fig.savefig(output_path, dpi=150, bbox_inches='tight')
+    plt.close(fig)
+    return output_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Аналитика отключений: длительность, районы, погода и гистограммы")
+    parser.add_argument("--dataset", required=True, help="Путь к dataset.db")
+    parser.add_argument("--weather", help="Путь к weather.db (без него корреляция с погодой не считается)")
+    parser.add_argument("--output", default=ANALYTICS_DIR, help="Куда сохранить hist_<тип>.png")
+    parser.add_argument("--levels", default=",".join(DISTRICT_LEVELS), help="Уровни районов через запятую")
+    parser.add_argument("--bin-width", type=float, default=DEFAULT_BIN_WIDTH_HOURS, help="Ширина бина гистограмм, часы")
+    parser.add_argument("--no-plots", action="store_true", help="Только таблицы, без png")
+    parser.add_argument("--no-cache", action="store_true", help="Пересчитать, не читая кэш")
+    args = parser.parse_args()
+
+    pd.set_option('display.width', 1000)
+    pd.set_option('display.max_columns', 100)
+    use_cache = not args.no_cache
+    started = time.perf_counter()
+
+    durations = duration_distribution(args.dataset, bin_width=args.bin_width, use_cache=use_cache)
+    print("--- Длительность отключений по типу услуги ---")
+    print(durations["summary"].round(2))
+
+    for level in args.levels.split(","):
+        analysis = district_frequency(args.dataset, level=level, bin_width=args.bin_width, use_cache=use_cache)
+        print(f"\n--- ТОП-10 по частоте отключений ({level}) ---")
+        print(analysis.head(10).round(2))
+
+    if args.weather:
+        weather = weather_correlation(args.dataset, args.weather, use_cache=use_cache)
+        print("\n--- Корреляция длительности с температурой в день начала ---")
+        print(weather["correlation"].round(3))
+        print("\n--- Средняя длительность по погоде ---")
+        print(weather["by_weather_type"].head(15).round(2))
+
+    if not args.no_plots:
+        os.makedirs(args.output, exist_ok=True)
+        summary = durations["summary"]
+        for blackout_type, bin_counts in durations["histograms"].items():
+            output_path = plot_histogram_for_type(
+                blackout_type,
+                bin_counts,
+                durations["bin_width"],
+                mean_hours=summary.loc[blackout_type, "average_duration_hours"],
+                max_hours=summary.loc[blackout_type, "max_duration_hours"],
+                output_dir=args.output,
+            )
+            print(f"{blackout_type}: -> {output_path}")
+
+    print(f"\nГотово за {time.perf_counter() - started:.1f} с")
+
+
+if __name__ == "__main__":
+    main()
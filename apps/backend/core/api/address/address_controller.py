@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from core.utils.common_util import exception_handler
-from core.utils.db_util import get_session_obj
+from core.utils.shard_util import get_shard_sessions
 
 from .address_schema import AddressSchema, DistrictSchema
 from .address_service import AddressService
@@ -11,7 +11,7 @@ address_contoller = APIRouter()
 @address_contoller.get(
     "/",
     summary="Поиск похожих адресов по вводу пользователя",
-    response_description="Список адресов, соответствующих поисковому запросу.",
+    response_description="Список адресов, соответствующих поисковому запросу, от наиболее похожих (с учетом опечаток, сокращений типа улицы и латинской раскладки).",
 )
 @exception_handler
 async def get_similar_addresses(
@@ -20,9 +20,9 @@ async def get_similar_addresses(
         description="Ввод пользователя в поисковую строку. Может содержать часть улицы, дома или их комбинацию.",
         example="светЛанская 1"
     ),
-    session: AsyncSession = Depends(get_session_obj),
+    sessions: dict[str | None, AsyncSession] = Depends(get_shard_sessions),
 ) -> list[AddressSchema]:
-    address_service = AddressService(session=session)
+    address_service = AddressService(sessions=sessions)
     addresses = await address_service.get_similar_addresses(input=input)
     return addresses
 
@@ -34,8 +34,8 @@ async def get_similar_addresses(
 )
 @exception_handler
 async def get_districts(
-    session: AsyncSession = Depends(get_session_obj),
+    sessions: dict[str | None, AsyncSession] = Depends(get_shard_sessions),
 ) -> list[DistrictSchema]:
-    address_service = AddressService(session=session)
+    address_service = AddressService(sessions=sessions)
     districts = await address_service.get_districts()
     return districts
\ No newline at end of file
@@ -1,3 +1,4 @@
+from core.config.settings import ADDRESS_SEARCH_LIMIT
 from core.models.geo import (
     BigFolkDistrictOrm,
     BuildingOrm,
@@ -5,7 +6,9 @@ from core.models.geo import (
     FolkDistrictOrm,
     StreetOrm,
 )
-from sqlalchemy import or_, select, union
+from core.utils.address_index_util import address_index
+from core.utils.shard_util import shard_router
+from sqlalchemy import select, union
 from sqlalchemy.ext.asyncio import AsyncSession
 
 
@@ -15,6 +18,11 @@ class AddressRepository:
         self.session = session
 
     async def get_similar_addresses(self, input: str | None):
+        if input and input.strip():
+            # Нечеткий поиск по индексу в памяти: опечатки, сокращения типов улиц, латинская раскладка
+            await address_index.ensure_fresh([self.session])
+            return address_index.search(input, limit=ADDRESS_SEARCH_LIMIT)
+
         stmt = select(
             BuildingOrm.number.label("building"), 
             StreetOrm.name.label("street"),
@@ -22,30 +30,6 @@ class AddressRepository:
         ).join(
             StreetOrm, StreetOrm.id == BuildingOrm.street_id
         )
-
-        if input:
-            input_parts = input.split()
-
-            for part in input_parts:
-                part_low = part.lower()
-                search_pattern_low = f"%{part_low}%"
-                part_capitalize = part_low.capitalize()
-                search_pattern_capitalize = f"%{part_capitalize}%"
-
-                street_condition_low = StreetOrm.name.ilike(search_pattern_low)
-                street_condition_capitalize = StreetOrm.name.ilike(search_pattern_capitalize)
-
-                building_number_condition_low = BuildingOrm.number.ilike(search_pattern_low)
-                building_number_condition_capitalize = BuildingOrm.number.ilike(search_pattern_capitalize)
-
-                combined_condition = or_(
-                    street_condition_low, 
-                    street_condition_capitalize, 
-                    building_number_condition_low, 
-                    building_number_condition_capitalize
-                )
-
-                stmt = stmt.where(combined_condition)
         
         result = await self.session.execute(stmt)
         addresses = result.mappings().all() 
@@ -71,4 +55,48 @@ class AddressRepository:
 
         building = (await self.session.execute(stmt)).first()
 
-        return building
\ No newline at end of file
+        return building
+
+    async def get_existing_building_ids(self, building_ids: list[str]) -> set[str]:
+        stmt = select(BuildingOrm.id).where(BuildingOrm.id.in_(building_ids))
+
+        existing_ids = (await self.session.execute(stmt)).scalars().all()
+
+        return set(existing_ids)
+
+
+class AddressRepositoryRouter:
+    """Интерфейс AddressRepository поверх шардов по городам: здания — в шард города, списки — из всех шардов."""
+
+    def __init__(self, sessions: dict[str | None, AsyncSession]):
+        self.sessions = sessions
+        self.repos = {key: AddressRepository(session=session) for key, session in sessions.items()}
+
+    async def get_similar_addresses(self, input: str | None):
+        if input and input.strip():
+            # Индекс поиска общий для всех шардов
+            await address_index.ensure_fresh(list(self.sessions.values()))
+            return address_index.search(input, limit=ADDRESS_SEARCH_LIMIT)
+
+        parts = await shard_router.fan_out(self.repos, lambda key, repo: repo.get_similar_addresses(input=input))
+        return [address for part in parts for address in part]
+
+    async def get_districts(self):
+        parts = await shard_router.fan_out(self.repos, lambda key, repo: repo.get_districts())
+        if len(parts) == 1:
+            return parts[0]
+        # Районы на границе городов есть в нескольких шардах; UNION в SQLite отдает имена по возрастанию
+        return [{"name": name} for name in sorted({district["name"] for part in parts for district in part})]
+
+    async def get_building(self, building_id: str | None = None):
+        if building_id is None:
+            return await next(iter(self.repos.values())).get_building()
+        shard_ids = await shard_router.locate_buildings(self.sessions, [building_id])
+        if building_id not in shard_ids:
+            return None
+        return await self.repos[shard_ids[building_id]].get_building(building_id=building_id)
+
+    async def get_existing_building_ids(self, building_ids: list[str]) -> set[str]:
+        if len(self.repos) == 1:
+            return await next(iter(self.repos.values())).get_existing_building_ids(building_ids=building_ids)
+        return set(await shard_router.locate_buildings(self.sessions, building_ids))
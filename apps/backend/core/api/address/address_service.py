@@ -1,13 +1,13 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from .address_repo import AddressRepository
+from .address_repo import AddressRepositoryRouter
 
 
 class AddressService:
 
-    def __init__(self, session: AsyncSession):
-        self.session = session
-        self.address_repo = AddressRepository(session=self.session)
+    def __init__(self, sessions: dict[str | None, AsyncSession]):
+        self.sessions = sessions
+        self.address_repo = AddressRepositoryRouter(sessions=self.sessions)
 
     async def get_similar_addresses(self, input: str | None):
         addresses = await self.address_repo.get_similar_addresses(input=input)
@@ -20,3 +20,7 @@ class AddressService:
     async def get_building(self, building_id: str | None = None):
         building = await self.address_repo.get_building(building_id=building_id)
         return building
+
+    async def get_existing_building_ids(self, building_ids: list[str]) -> set[str]:
+        existing_ids = await self.address_repo.get_existing_building_ids(building_ids=building_ids)
+        return existing_ids
@@ -2,6 +2,8 @@ from fastapi import APIRouter
 
 from .address.address_controller import address_contoller
 from .blackout.blackout_contoller import blackout_contoller
+from .export.export_controller import export_controller
+from .metrics.metrics_controller import metrics_controller
 
 api_controller = APIRouter()
 api_controller.include_router(
@@ -10,3 +12,9 @@ api_controller.include_router(
 api_controller.include_router(
     address_contoller, prefix="/address", tags=["Адреса"]
 )
+api_controller.include_router(
+    metrics_controller, prefix="/metrics", tags=["Метрики"]
+)
+api_controller.include_router(
+    export_controller, prefix="/export", tags=["Выгрузка"]
+)
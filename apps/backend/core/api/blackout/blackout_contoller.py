@@ -1,34 +1,102 @@
-from fastapi import APIRouter, Depends, status
+from typing import Literal
+
+from fastapi import APIRouter, Depends, Header, Query, status
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from core.utils.common_util import exception_handler
-from core.utils.db_util import get_session_obj, get_session_weather_obj
+from core.utils.db_util import get_session_weather_obj
+from core.utils.shard_util import get_shard_sessions
 
 from .blackout_schema import (
+    BlackoutByAddressBulkFilterSchema,
+    BlackoutByAddressBulkItemSchema,
     BlackoutByAddressFilterSchema,
     BlackoutByAddressListSchema,
+    BlackoutChangesFilterSchema,
+    BlackoutChangesSchema,
+    BlackoutColumnarSchema,
     BlackoutInfoSchema,
+    ColumnarExtraField,
     BlackoutListFilterSchema,
 )
 from .blackout_service import BlackoutService
 
 blackout_contoller = APIRouter()
 
+COLUMNAR_MEDIA_TYPE = "application/vnd.blackout.columnar+json"
+MSGPACK_MEDIA_TYPE = "application/x-msgpack"
+CHANGE_TOKEN_HEADER = "X-Change-Token"
+
+
+def negotiate_list_format(format: str | None, accept: str | None) -> str:
+    """Явный параметр format важнее заголовка Accept; по умолчанию — обычный JSON."""
+    if format:
+        return format
+    accept = accept or ""
+    if MSGPACK_MEDIA_TYPE in accept or "application/msgpack" in accept:
+        return "msgpack"
+    if COLUMNAR_MEDIA_TYPE in accept:
+        return "columnar"
+    return "json"
+
 
 @blackout_contoller.get(
     "/",
     summary="Получение списка всех отключений с возможностью фильтрации",
     response_description="Список отключений, отфильтрованных по типу, дате или району.",
+    responses={
+        status.HTTP_200_OK: {
+            "content": {
+                COLUMNAR_MEDIA_TYPE: {"schema": BlackoutColumnarSchema.model_json_schema()},
+                MSGPACK_MEDIA_TYPE: {"schema": BlackoutColumnarSchema.model_json_schema()},
+            }
+        }
+    }
 )
 @exception_handler
 async def get_blackout_list(
     filter: BlackoutListFilterSchema = Depends(BlackoutListFilterSchema),
-    session: AsyncSession = Depends(get_session_obj),
+    format: Literal["json", "columnar", "msgpack"] | None = Query(
+        None,
+        description=f"Формат ответа: json (по умолчанию), columnar — параллельные массивы (id, тип, координаты, начало и конец), msgpack — то же в MessagePack с упакованными столбцами. Можно задать заголовком Accept: {COLUMNAR_MEDIA_TYPE} или {MSGPACK_MEDIA_TYPE}.",
+    ),
+    columns: list[ColumnarExtraField] | None = Query(None, description="Дополнительные столбцы для columnar и msgpack (индексы в словаре строк)"),
+    accept: str | None = Header(None, include_in_schema=False),
+    response: Response = None,
+    sessions: dict[str | None, AsyncSession] = Depends(get_shard_sessions),
 ) -> list[BlackoutInfoSchema]:
-    blackout_service = BlackoutService(session=session)
+    blackout_service = BlackoutService(sessions=sessions)
+    response_format = negotiate_list_format(format, accept)
+    # Токен читается до списка: изменения между ними клиент получит повторно, но не потеряет
+    headers = {"Vary": "Accept", CHANGE_TOKEN_HEADER: str(await blackout_service.get_change_token())}
+
+    if response_format == "columnar":
+        columns = await blackout_service.get_blackout_list_columnar(filter=filter, extra_fields=columns)
+        return JSONResponse(columns, media_type=COLUMNAR_MEDIA_TYPE, headers=headers)
+    if response_format == "msgpack":
+        content = await blackout_service.get_blackout_list_msgpack(filter=filter, extra_fields=columns)
+        return Response(content, media_type=MSGPACK_MEDIA_TYPE, headers=headers)
+
     blackouts = await blackout_service.get_blackout_list(filter=filter)
+    response.headers.update(headers)
     return blackouts
 
 
+@blackout_contoller.get(
+    "/changes",
+    summary="Изменения списка отключений после токена",
+    response_description="Добавленные, измененные и удаленные строки (отключение, здание) с момента токена и новый токен.",
+)
+@exception_handler
+async def get_blackout_changes(
+    filter: BlackoutChangesFilterSchema = Depends(BlackoutChangesFilterSchema),
+    sessions: dict[str | None, AsyncSession] = Depends(get_shard_sessions),
+) -> BlackoutChangesSchema:
+    blackout_service = BlackoutService(sessions=sessions)
+    changes = await blackout_service.get_changes(filter=filter)
+    return changes
+
+
 @blackout_contoller.get(
     "/by_address",
     summary="Получение актуальных отключений для конкретного здания с прогнозом",
@@ -49,9 +117,37 @@ async def get_blackout_list(
 @exception_handler
 async def get_blackout_by_address(
     filter: BlackoutByAddressFilterSchema = Depends(BlackoutByAddressFilterSchema),
-    session: AsyncSession = Depends(get_session_obj),
+    sessions: dict[str | None, AsyncSession] = Depends(get_shard_sessions),
     weather_session: AsyncSession = Depends(get_session_weather_obj)
 ) -> BlackoutByAddressListSchema:
-    blackout_service = BlackoutService(session=session, weather_session=weather_session)
+    blackout_service = BlackoutService(sessions=sessions, weather_session=weather_session)
     blackouts = await blackout_service.get_blackouts_by_address(filter=filter)
     return blackouts
+
+
+@blackout_contoller.post(
+    "/by_address/bulk",
+    summary="Получение актуальных отключений с прогнозом сразу для набора зданий",
+    response_description="Поток NDJSON: по одной строке на здание в порядке запроса.",
+    response_class=StreamingResponse,
+    responses={
+        status.HTTP_200_OK: {
+            "content": {
+                "application/x-ndjson": {
+                    "schema": BlackoutByAddressBulkItemSchema.model_json_schema()
+                }
+            }
+        }
+    }
+)
+@exception_handler
+async def get_blackouts_by_addresses(
+    filter: BlackoutByAddressBulkFilterSchema,
+    sessions: dict[str | None, AsyncSession] = Depends(get_shard_sessions),
+    weather_session: AsyncSession = Depends(get_session_weather_obj)
+) -> StreamingResponse:
+    blackout_service = BlackoutService(sessions=sessions, weather_session=weather_session)
+    return StreamingResponse(
+        blackout_service.stream_blackouts_by_addresses(filter=filter),
+        media_type="application/x-ndjson",
+    )
@@ -1,17 +1,12 @@
 from datetime import datetime
+from itertools import chain
 
 from core.config.settings import COORD_DELTA
-from core.models.blackout import BlackoutBuildingOrm, BlackoutOrm
-from core.models.geo import (
-    BigFolkDistrictOrm,
-    BuildingOrm,
-    CityOrm,
-    DistrictOrm,
-    FolkDistrictOrm,
-    StreetOrm,
-)
-from sqlalchemy import JSON, Float, and_, func, or_, select, type_coerce
-from sqlalchemy.engine.row import RowMapping
+from core.models.blackout import BlackoutBuildingViewOrm, BlackoutChangeOrm, BlackoutChangesStateOrm
+from core.read_model.blackout_view import to_epoch
+from core.utils.dimension_util import DimensionCache, dimensions
+from core.utils.shard_util import encode_change_token, shard_router
+from sqlalchemy import and_, func, or_, select, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from .blackout_schema import (
@@ -20,173 +15,167 @@ from .blackout_schema import (
     NeighborBlackoutSchema,
 )
 
-# ... (Оставлен метод get_blackout_list без изменений)
+# Все запросы читают денормализованную read-модель blackout_building_view (см. core/read_model)
+View = BlackoutBuildingViewOrm
+
+# Поля колоночного представления списка — только то, что нужно карте; улица и район — по запросу
+COLUMNAR_FIELDS = ("blackout_id", "type", "lat", "lon", "start_ts", "end_ts")
+COLUMNAR_OPTIONAL_FIELDS = ("street", "district")
+
 
 class BlackoutRepository:
     
-    def __init__(self, session: AsyncSession):
+    def __init__(self, session: AsyncSession, dimensions: DimensionCache = dimensions):
         self.session = session
+        self.dimensions = dimensions
 
-    async def get_blackout_list(self, filter: BlackoutListFilterSchema):
-        stmt = (
-            select(
-                BlackoutOrm.id,
-                BlackoutOrm.start_date,
-                BlackoutOrm.end_date,
-                BlackoutOrm.description,
-                BlackoutOrm.type,
-                BuildingOrm.id.label("building_id"),
-                BuildingOrm.number.label("building_number"),
-                type_coerce(
-                func.json_object(
-                "latitude",
-                func.coalesce(
-                func.json_extract(BuildingOrm.coordinates, "$[0].lat"), 0.0
-                ),
-                "longitude",
-                func.coalesce(
-                func.json_extract(BuildingOrm.coordinates, "$[0].lon"), 0.0
-                ),
-                ),
-                JSON,
-                ).label("coordinates"),
-                StreetOrm.name.label("street"),
-                DistrictOrm.name.label("district"),
-                FolkDistrictOrm.name.label("folk_district"),
-                BigFolkDistrictOrm.name.label("big_folk_district"),
-                CityOrm.name.label("city"),
-            )
-            .join(
-                BlackoutBuildingOrm,
-                BlackoutBuildingOrm.blackout_id == BlackoutOrm.id,
-            )
-            .join(
-                BuildingOrm,
-                BuildingOrm.id == BlackoutBuildingOrm.building_id,
-            )
-            .join(StreetOrm, StreetOrm.id == BuildingOrm.street_id)
-            .join(DistrictOrm, DistrictOrm.id == BuildingOrm.district_id)
-            .join(
-                FolkDistrictOrm,
-                FolkDistrictOrm.id == BuildingOrm.folk_district_id,
-            )
-            .join(
-                BigFolkDistrictOrm,
-                BigFolkDistrictOrm.id == BuildingOrm.big_folk_district_id,
-            )
-            .join(CityOrm, CityOrm.id == BuildingOrm.city_id)
+    @staticmethod
+    def _blackout_columns():
+        return (
+            View.blackout_id.label("id"),
+            View.start_date,
+            View.end_date,
+            View.description,
+            View.type,
+            View.building_id,
+            View.building_number,
+            View.lat,
+            View.lon,
+            View.street,
+            View.district,
+            View.folk_district,
+            View.big_folk_district,
+            View.city,
         )
 
+    @staticmethod
+    def _to_blackout(row) -> dict:
+        blackout = dict(row)
+        lat, lon = blackout.pop("lat"), blackout.pop("lon")
+        blackout["coordinates"] = {
+            "latitude": 0.0 if lat is None else lat,
+            "longitude": 0.0 if lon is None else lon,
+        }
+        return blackout
+
+    async def get_blackout_list(self, filter: BlackoutListFilterSchema) -> list[dict]:
+        stmt = await self._apply_list_filter(select(*self._blackout_columns()), filter)
+        if stmt is None:
+            return []
+
+        blackouts = (await self.session.execute(stmt)).mappings().all()
+
+        return [self._to_blackout(blackout) for blackout in blackouts]
+
+    async def get_blackout_list_rows(self, filter: BlackoutListFilterSchema, fields: tuple[str, ...] = COLUMNAR_FIELDS) -> list[tuple]:
+        """Те же отключения, что и get_blackout_list, кортежами из полей fields — для колоночного ответа."""
+        stmt = await self._apply_list_filter(select(*[getattr(View, field) for field in fields]), filter)
+        if stmt is None:
+            return []
+        return (await self.session.execute(stmt)).tuples().all()
+
+    async def _apply_list_filter(self, stmt, filter: BlackoutListFilterSchema):
+        """Добавляет условия фильтра; None — если район с таким именем не существует."""
         if filter.type:
-            stmt = stmt.where(BlackoutOrm.type == filter.type)
+            stmt = stmt.where(View.type == filter.type)
 
         if filter.start_date:
-            stmt = stmt.where(BlackoutOrm.start_date >= filter.start_date)
+            stmt = stmt.where(View.start_ts >= to_epoch(filter.start_date))
 
         if filter.date:
-            stmt = stmt.where(and_(BlackoutOrm.start_date <= filter.date, filter.date<= BlackoutOrm.end_date))
+            date_ts = to_epoch(filter.date)
+            stmt = stmt.where(and_(View.start_ts <= date_ts, date_ts <= View.end_ts))
 
         if filter.district:
+            # Имя района переводится в id заранее, по справочникам в памяти
+            await self.dimensions.ensure_fresh(self.session)
+            district_ids = self.dimensions.resolve_district(filter.district)
+            if not any(district_ids.values()):
+                return None
             stmt = stmt.where(
-                or_(
-                    DistrictOrm.name == filter.district,
-                    FolkDistrictOrm.name == filter.district,
-                    BigFolkDistrictOrm.name == filter.district,
-                )
+                or_(*[
+                    getattr(View, column).in_(ids)
+                    for column, ids in district_ids.items()
+                    if ids
+                ])
             )
 
-        blackouts = await self.session.execute(stmt)
+        return stmt
 
-        return blackouts
+    async def get_change_token(self) -> int:
+        """Текущий токен журнала изменений: последний seq (или граница удаленной части, если журнал пуст)."""
+        stmt = select(
+            func.coalesce(
+                select(func.max(BlackoutChangeOrm.seq)).scalar_subquery(),
+                select(BlackoutChangesStateOrm.pruned_through).scalar_subquery(),
+                0,
+            )
+        )
+        return (await self.session.execute(stmt)).scalar_one()
+
+    async def get_changes_pruned_through(self) -> int:
+        pruned_through = (await self.session.execute(select(BlackoutChangesStateOrm.pruned_through))).scalar()
+        return pruned_through or 0
 
-    async def get_blackouts_by_address(self, filter: BlackoutByAddressFilterSchema) -> list[RowMapping]:
+    async def get_changes(self, since: int, limit: int) -> list[tuple]:
+        """Записи журнала с seq > since по возрастанию: (seq, blackout_id, building_id)."""
         stmt = (
-            select(
-                BlackoutOrm.id,
-                BlackoutOrm.start_date,
-                BlackoutOrm.end_date,
-                BlackoutOrm.description,
-                BlackoutOrm.type,
-                BuildingOrm.number.label("building_number"),
-                type_coerce(
-                    func.json_object(
-                        "latitude",
-                        func.coalesce(
-                            func.json_extract(BuildingOrm.coordinates, "$[0].lat").cast(Float), 0.0
-                        ),
-                        "longitude",
-                        func.coalesce(
-                            func.json_extract(BuildingOrm.coordinates, "$[0].lon").cast(Float), 0.0
-                        ),
-                    ),
-                    JSON,
-                ).label("coordinates"),
-                StreetOrm.name.label("street"),
-                DistrictOrm.name.label("district"),
-                FolkDistrictOrm.name.label("folk_district"),
-                BigFolkDistrictOrm.name.label("big_folk_district"),
-                CityOrm.name.label("city"),
-                BuildingOrm.id.label("building_id")
-            )
-            .join(
-                BlackoutBuildingOrm,
-                BlackoutBuildingOrm.blackout_id == BlackoutOrm.id,
-            )
-            .join(
-                BuildingOrm,
-                BuildingOrm.id == BlackoutBuildingOrm.building_id,
-            )
-            .join(StreetOrm, StreetOrm.id == BuildingOrm.street_id)
-            .join(DistrictOrm, DistrictOrm.id == BuildingOrm.district_id)
-            .join(
-                FolkDistrictOrm,
-                FolkDistrictOrm.id == BuildingOrm.folk_district_id,
-            )
-            .join(
-                BigFolkDistrictOrm,
-                BigFolkDistrictOrm.id == BuildingOrm.big_folk_district_id,
-            )
-            .join(CityOrm, CityOrm.id == BuildingOrm.city_id)
-            .where(
-                and_(
-                    BuildingOrm.id == filter.building_id, 
-                    BlackoutOrm.start_date <= filter.date, 
-                    filter.date<= BlackoutOrm.end_date
-                )
+            select(BlackoutChangeOrm.seq, BlackoutChangeOrm.blackout_id, BlackoutChangeOrm.building_id)
+            .where(BlackoutChangeOrm.seq > since)
+            .order_by(BlackoutChangeOrm.seq)
+            .limit(limit)
+        )
+        return (await self.session.execute(stmt)).tuples().all()
+
+    async def get_blackouts_by_keys(self, blackout_ids: set[str], pairs: set[tuple[str, str]]) -> list[dict]:
+        """Текущие строки read-модели для отключений целиком и для отдельных пар (отключение, здание)."""
+        conditions = []
+        if blackout_ids:
+            conditions.append(View.blackout_id.in_(blackout_ids))
+        if pairs:
+            conditions.append(tuple_(View.blackout_id, View.building_id).in_(pairs))
+        if not conditions:
+            return []
+
+        blackouts = (await self.session.execute(select(*self._blackout_columns()).where(or_(*conditions)))).mappings().all()
+        return [self._to_blackout(blackout) for blackout in blackouts]
+
+    async def get_blackouts_by_address(self, filter: BlackoutByAddressFilterSchema) -> list[dict]:
+        return await self.get_blackouts_by_addresses(building_ids=[filter.building_id], date=filter.date)
+
+    async def get_blackouts_by_addresses(self, building_ids: list[str], date: datetime) -> list[dict]:
+        date_ts = to_epoch(date)
+        stmt = select(*self._blackout_columns()).where(
+            and_(
+                View.building_id.in_(building_ids),
+                View.start_ts <= date_ts,
+                date_ts <= View.end_ts
             )
         )
-        return (await self.session.execute(stmt)).mappings().all()
+        blackouts = (await self.session.execute(stmt)).mappings().all()
+        return [self._to_blackout(blackout) for blackout in blackouts]
 
     async def get_neighbor_blackouts(self, target_lat: float, target_lon: float, exclude_building_id: str, date: datetime, limit: int | None):
-
+        date_ts = to_epoch(date)
 
         neighbor_blackout_stmt = (
             select(
-                StreetOrm.name.label("street"),
-                BuildingOrm.number.label("building"),
-                BuildingOrm.id.label("building_id"),
-                BlackoutOrm.type.label("type"),
-            )
-            .join(StreetOrm, StreetOrm.id == BuildingOrm.street_id)
-            .join(
-                BlackoutBuildingOrm,
-                BlackoutBuildingOrm.building_id == BuildingOrm.id
-            )
-            .join(
-                BlackoutOrm,
-                BlackoutOrm.id == BlackoutBuildingOrm.blackout_id
+                View.street,
+                View.building_number.label("building"),
+                View.building_id,
+                View.type,
             )
             .where(
                 and_(
-                    func.json_extract(BuildingOrm.coordinates, "$[0].lat").cast(Float) >= target_lat - COORD_DELTA,
-                    func.json_extract(BuildingOrm.coordinates, "$[0].lat").cast(Float) <= target_lat + COORD_DELTA,
-                    func.json_extract(BuildingOrm.coordinates, "$[0].lon").cast(Float) >= target_lon - COORD_DELTA,
-                    func.json_extract(BuildingOrm.coordinates, "$[0].lon").cast(Float) <= target_lon + COORD_DELTA,
+                    View.lat >= target_lat - COORD_DELTA,
+                    View.lat <= target_lat + COORD_DELTA,
+                    View.lon >= target_lon - COORD_DELTA,
+                    View.lon <= target_lon + COORD_DELTA,
                     
-                    BuildingOrm.id != exclude_building_id, 
+                    View.building_id != exclude_building_id, 
                     
-                    BlackoutOrm.start_date <= date, 
-                    date <= BlackoutOrm.end_date
+                    View.start_ts <= date_ts, 
+                    date_ts <= View.end_ts
                 )
             )
             .limit(limit) 
@@ -204,4 +193,95 @@ class BlackoutRepository:
             for row in neighbor_results
         ]
         
-        return neighbor_addresses
\ No newline at end of file
+        return neighbor_addresses
+
+    async def get_neighbor_blackouts_in_areas(self, boxes: list[tuple[float, float, float, float]], date: datetime):
+        """
+        Все актуальные отключения зданий в прямоугольниках (min_lat, max_lat, min_lon, max_lon) —
+        одним запросом для разбора соседей сразу по набору зданий. Строка, попавшая в несколько прямоугольников, возвращается один раз.
+        """
+        date_ts = to_epoch(date)
+
+        stmt = (
+            select(
+                View.street,
+                View.building_number.label("building"),
+                View.building_id,
+                View.type,
+                View.lat,
+                View.lon,
+            )
+            .where(
+                and_(
+                    or_(*[
+                        and_(View.lat >= min_lat, View.lat <= max_lat, View.lon >= min_lon, View.lon <= max_lon)
+                        for min_lat, max_lat, min_lon, max_lon in boxes
+                    ]),
+
+                    View.start_ts <= date_ts, 
+                    date_ts <= View.end_ts
+                )
+            )
+        )
+
+        return (await self.session.execute(stmt)).mappings().all()
+
+
+class BlackoutRepositoryRouter:
+    """
+    Интерфейс BlackoutRepository поверх шардов по городам (core/utils/shard_util.py).
+    Запросы по зданиям идут в шарды их городов, списки — во все шарды параллельно со склейкой.
+    """
+
+    def __init__(self, sessions: dict[str | None, AsyncSession]):
+        self.sessions = sessions
+        self.repos = {
+            key: BlackoutRepository(session=session, dimensions=shard_router.shards[key].dimensions)
+            for key, session in sessions.items()
+        }
+
+    async def _fan_out(self, method: str, **kwargs) -> list:
+        return await shard_router.fan_out(self.repos, lambda key, repo: getattr(repo, method)(**kwargs))
+
+    async def _route_buildings(self, building_ids: list[str]) -> dict[str | None, list[str]]:
+        shard_ids: dict[str | None, list[str]] = {}
+        for building_id, key in (await shard_router.locate_buildings(self.sessions, building_ids)).items():
+            shard_ids.setdefault(key, []).append(building_id)
+        return shard_ids
+
+    async def get_blackout_list(self, filter: BlackoutListFilterSchema) -> list[dict]:
+        return list(chain.from_iterable(await self._fan_out("get_blackout_list", filter=filter)))
+
+    async def get_blackout_list_rows(self, filter: BlackoutListFilterSchema, fields: tuple[str, ...] = COLUMNAR_FIELDS) -> list[tuple]:
+        return list(chain.from_iterable(await self._fan_out("get_blackout_list_rows", filter=filter, fields=fields)))
+
+    async def get_blackouts_by_address(self, filter: BlackoutByAddressFilterSchema) -> list[dict]:
+        return await self.get_blackouts_by_addresses(building_ids=[filter.building_id], date=filter.date)
+
+    async def get_blackouts_by_addresses(self, building_ids: list[str], date: datetime) -> list[dict]:
+        shard_ids = await self._route_buildings(building_ids)
+        parts = await shard_router.fan_out(
+            shard_ids,
+            lambda key, ids: self.repos[key].get_blackouts_by_addresses(building_ids=ids, date=date),
+        )
+        return list(chain.from_iterable(parts))
+
+    async def get_neighbor_blackouts(self, target_lat: float, target_lon: float, exclude_building_id: str, date: datetime, limit: int | None):
+        # Соседи в пределах COORD_DELTA — в том же городе, что и здание
+        shard_ids = await self._route_buildings([exclude_building_id])
+        repos = {key: self.repos[key] for key in shard_ids} or self.repos
+        parts = await shard_router.fan_out(
+            repos,
+            lambda key, repo: repo.get_neighbor_blackouts(
+                target_lat=target_lat, target_lon=target_lon, exclude_building_id=exclude_building_id, date=date, limit=limit
+            ),
+        )
+        return list(chain.from_iterable(parts))[:limit]
+
+    async def get_neighbor_blackouts_in_areas(self, boxes: list[tuple[float, float, float, float]], date: datetime):
+        parts = await self._fan_out("get_neighbor_blackouts_in_areas", boxes=boxes, date=date)
+        return list(chain.from_iterable(parts))
+
+    async def get_change_token(self) -> str:
+        tokens = await self._fan_out("get_change_token")
+        return encode_change_token(dict(zip(self.repos, tokens)))
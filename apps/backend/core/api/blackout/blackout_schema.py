@@ -3,6 +3,8 @@ from typing import Literal
 
 from pydantic import BaseModel, Field
 
+from core.config.settings import BULK_MAX_BUILDINGS, CHANGES_MAX_LIMIT
+
 from ..address.address_schema import AddressSchema
 
 
@@ -71,6 +73,41 @@ class BlackoutByAddressFilterSchema(BaseModel):
         example=10
     )
 
+class BlackoutByAddressBulkFilterSchema(BaseModel):
+    """Схема запроса отключений сразу для набора зданий."""
+    building_ids: list[str] = Field(
+        ...,
+        min_length=1,
+        max_length=BULK_MAX_BUILDINGS,
+        description="Список уникальных ID зданий.",
+        example=["b428b92bb123994a56234bb6eeeed414"]
+    )
+    date: datetime = Field(
+        ...,
+        description="Дата и время, на которую нужно проверить актуальность отключений.",
+        example="2024-01-20T12:00:00"
+    )
+    limit_neighbors: int | None = Field(
+        None,
+        description="Максимальное количество соседних адресов с отключениями для каждого здания.",
+        example=10
+    )
+
+class BlackoutChangesFilterSchema(BaseModel):
+    """Схема запроса изменений отключений после токена."""
+    since: str = Field(
+        ...,
+        description="Токен из заголовка X-Change-Token списка отключений или поля token предыдущего ответа (непрозрачная строка: число для одной базы, «город:номер,...» для шардов).",
+        example="1520"
+    )
+    limit: int = Field(
+        CHANGES_MAX_LIMIT,
+        ge=1,
+        le=CHANGES_MAX_LIMIT,
+        description="Максимум записей журнала за один запрос (для каждого шарда); при has_more=true запросите следующую порцию с новым токеном.",
+        example=1000
+    )
+
 class BlackoutInfoSchema(BaseModel):
     """Базовая информация об отключении коммунальной услуги."""
     id: str = Field(
@@ -119,6 +156,11 @@ class BlackoutByAddressInfoSchema(BlackoutInfoSchema):
         description="Прогнозируемая дата и время окончания отключения (на основе модели).",
         example="2018-01-01T05:30:00"
     )
+    prediction_degraded: bool = Field(
+        False,
+        description="Прогноз упрощенный: сервис перегружен, вместо модели использована статистическая оценка или фактическая дата окончания.",
+        example=False
+    )
 
 class BlackoutByAddressListSchema(BaseModel):
     """Список отключений по адресу и соседству."""
@@ -130,3 +172,91 @@ class BlackoutByAddressListSchema(BaseModel):
         ...,
         description="Список соседних адресов с актуальными отключениями."
     )
+
+class BlackoutByAddressBulkItemSchema(BlackoutByAddressListSchema):
+    """Строка потокового ответа bulk-запроса: отключения одного здания."""
+    building_id: str = Field(
+        ...,
+        description="ID здания из запроса.",
+        example="b428b92bb123994a56234bb6eeeed414"
+    )
+    found: bool = Field(
+        ...,
+        description="Найдено ли здание в базе.",
+        example=True
+    )
+
+ColumnarExtraField = Literal["street", "district"]
+
+
+class BlackoutColumnarSchema(BaseModel):
+    """
+    Колоночное представление списка отключений (format=columnar или msgpack).
+    i-я строка — значения i-х элементов всех массивов (пара отключение-здание);
+    type, street и district — индексы в `strings`. street и district есть, только если запрошены в columns.
+    В MessagePack lat/lon упакованы как little-endian float64, start_ts/end_ts — int64,
+    индексы словаря — uint32 (4294967295 вместо пустого значения), blackout_id — по 16 байт на строку
+    (если все id — 32 шестнадцатеричных символа, иначе массив строк).
+    """
+    count: int = Field(..., description="Количество строк.", example=2)
+    strings: list[str | None] = Field(
+        ...,
+        description="Словарь строк для полей-индексов.",
+        example=["electricity", "Светланская ул.", "Ленинский район"]
+    )
+    blackout_id: list[str] = Field(
+        ...,
+        description="ID отключения.",
+        example=["f88cefa506f44ebf8f010b8681b5449e", "f88cefa506f44ebf8f010b8681b5449e"]
+    )
+    type: list[int] = Field(..., description="Тип отключения (индекс в strings).", example=[0, 0])
+    lat: list[float | None] = Field(..., description="Широта здания.", example=[43.11659, 43.11702])
+    lon: list[float | None] = Field(..., description="Долгота здания.", example=[131.88234, 131.88311])
+    start_ts: list[int | None] = Field(
+        ...,
+        description="Начало отключения: секунды эпохи, местное время без часового пояса, записанное как UTC.",
+        example=[1551434700, 1551434700]
+    )
+    end_ts: list[int | None] = Field(..., description="Фактическое окончание, в том же формате, что start_ts.", example=[1551443400, 1551443400])
+    street: list[int | None] | None = Field(None, description="Улица (индекс в strings), только с columns=street.", example=[1, 1])
+    district: list[int | None] | None = Field(None, description="Официальный район (индекс в strings), только с columns=district.", example=[2, 2])
+
+
+class BlackoutDeletedSchema(BaseModel):
+    """Удаленная пара (отключение, здание); building_id = null — удалено отключение целиком."""
+    blackout_id: str = Field(
+        ...,
+        description="Уникальный идентификатор отключения.",
+        example="f88cefa506f44ebf8f010b8681b5449e"
+    )
+    building_id: str | None = Field(
+        None,
+        description="ID здания или null, если удалены все здания отключения.",
+        example="b428b92bb123994a56234bb6eeeed414"
+    )
+
+class BlackoutChangesSchema(BaseModel):
+    """Изменения списка отключений после токена since."""
+    token: str = Field(
+        ...,
+        description="Новый токен для следующего запроса.",
+        example="1544"
+    )
+    upserts: list[BlackoutInfoSchema] = Field(
+        ...,
+        description="Добавленные или измененные строки (отключение, здание) в текущем состоянии — заменяют строки с тем же id и building_id."
+    )
+    deletes: list[BlackoutDeletedSchema] = Field(
+        ...,
+        description="Строки, которых больше нет."
+    )
+    has_more: bool = Field(
+        ...,
+        description="В журнале остались изменения после token — запросите следующую порцию.",
+        example=False
+    )
+    reset: bool = Field(
+        False,
+        description="Токен устарел (журнал очищен) или неизвестен: перезагрузите список целиком и продолжайте с его X-Change-Token.",
+        example=False
+    )
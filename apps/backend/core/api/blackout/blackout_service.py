@@ -1,35 +1,191 @@
+import heapq
+import math
+import time
 from datetime import datetime, timedelta
+from typing import AsyncIterator
 
 from core.common.common_exceptions import NotFoundHttpException
-from core.nn.prediction_service import predict_duration
+from core.config.settings import (
+    BULK_CHUNK_SIZE,
+    COALESCE_DATE_BUCKET_S,
+    COORD_DELTA,
+    INFERENCE_DEADLINE_MS,
+    INFERENCE_MAX_CONCURRENCY,
+    INFERENCE_MAX_QUEUE,
+    PREDICTION_MAX_IN_FLIGHT,
+    PREDICTION_MODE,
+)
+from core.utils.coalesce_util import SingleFlight, time_bucket
+from core.utils.columnar_util import pack_msgpack, to_columns
+from core.utils.common_util import logger
+from core.utils.limiter_util import ConcurrencyLimiter, OverloadedError
+from core.utils.metrics_util import metrics
+from core.utils.prediction_client import PredictionClient, PredictionWorkerError
+from core.utils.shard_util import decode_change_token, encode_change_token, shard_router
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..address.address_service import AddressService
 from ..weather.weather_service import WeatherService
-from .blackout_repo import BlackoutRepository
+from .blackout_repo import COLUMNAR_FIELDS, BlackoutRepository, BlackoutRepositoryRouter
 from .blackout_schema import (
+    BlackoutByAddressBulkFilterSchema,
+    BlackoutByAddressBulkItemSchema,
     BlackoutByAddressFilterSchema,
     BlackoutByAddressInfoSchema,
     BlackoutByAddressListSchema,
+    BlackoutChangesFilterSchema,
+    BlackoutChangesSchema,
+    BlackoutDeletedSchema,
     BlackoutListFilterSchema,
+    NeighborBlackoutSchema,
 )
 
+# Строковые поля колоночного ответа, кодируемые словарем, и упаковка числовых полей и id в MessagePack
+COLUMNAR_DICTIONARY_FIELDS = {"type", "street", "district"}
+COLUMNAR_PACKED_DTYPES = {"lat": "<f8", "lon": "<f8", "start_ts": "<i8", "end_ts": "<i8"}
+COLUMNAR_HEX_ID_FIELDS = {"blackout_id"}
+
+if PREDICTION_MODE == "worker":
+    # Модели — в отдельном процессе, который батчит запросы всех API-воркеров;
+    # здесь только клиент и таблица запасного предсказателя (numpy) на случай его недоступности
+    from core.nn.fallback_predictor import load_fallback_predictor
+
+    prediction_client = PredictionClient(timeout=INFERENCE_DEADLINE_MS / 1000)
+    fallback_predictor = load_fallback_predictor()
+
+    # Запросы к процессу инференса в полете ограничены: если он не успевает, лишние не копятся
+    # в сокете, а сразу получают упрощенный прогноз (метрики prediction_requests_shed_*)
+    inference_limiter = ConcurrencyLimiter(
+        name="prediction_requests",
+        max_concurrency=PREDICTION_MAX_IN_FLIGHT,
+        max_queue=INFERENCE_MAX_QUEUE,
+        deadline=INFERENCE_DEADLINE_MS / 1000,
+    )
+
+    def predict_fallback(row: dict) -> float | None:
+        return fallback_predictor.predict_row(row) if fallback_predictor is not None else None
+else:
+    from core.nn.fused_inference import fallback_predictor, predict_durations, predict_fallback
+
+    # Общий для процесса ограничитель: инференс CPU-bound, поэтому при всплеске запросов
+    # лишние не ждут в очереди, а получают упрощенный прогноз
+    inference_limiter = ConcurrencyLimiter(
+        name="inference",
+        max_concurrency=INFERENCE_MAX_CONCURRENCY,
+        max_queue=INFERENCE_MAX_QUEUE,
+        deadline=INFERENCE_DEADLINE_MS / 1000,
+    )
+
+# Без таблицы квантилей сервис деградирован: при перегрузке или недоступном процессе инференса
+# (и всегда для hot_water) прогноз пустой, и predicted_end_date равен фактическому окончанию
+metrics.gauge("fallback_predictor_loaded", lambda: float(fallback_predictor is not None))
+if fallback_predictor is None:
+    logger.warning("Прогноз длительности работает без запасного предсказателя: сброшенные запросы получат пустой прогноз")
+
+# Одинаковые одновременные запросы by_address (жители одного дома во время аварии)
+# выполняются один раз: ключ — здание, дата с точностью до COALESCE_DATE_BUCKET_S и limit_neighbors
+by_address_flight = SingleFlight(name="by_address")
+
+
+def inference_deadline() -> float:
+    """Дедлайн инференса (time.monotonic), отсчитанный один раз от начала обработки запроса."""
+    return time.monotonic() + INFERENCE_DEADLINE_MS / 1000
+
+
+def grid_cell(lat: float, lon: float) -> tuple[int, int]:
+    """Клетка сетки со стороной COORD_DELTA: соседи здания лежат в его клетке и восьми соседних."""
+    return math.floor(lat / COORD_DELTA), math.floor(lon / COORD_DELTA)
+
 
 class BlackoutService:
 
-    def __init__(self, session: AsyncSession, weather_session: AsyncSession | None = None):
-        self.session = session
-        self.blackout_repo = BlackoutRepository(session=self.session)
-        self.address_service = AddressService(session=self.session)
+    def __init__(self, sessions: dict[str | None, AsyncSession], weather_session: AsyncSession | None = None):
+        self.sessions = sessions
+        self.blackout_repo = BlackoutRepositoryRouter(sessions=self.sessions)
+        self.address_service = AddressService(sessions=self.sessions)
         self.weather_service = WeatherService(session=weather_session)
         
 
     async def get_blackout_list(self, filter: BlackoutListFilterSchema):
         blackouts = await self.blackout_repo.get_blackout_list(filter=filter)
         return blackouts
+
+    async def get_blackout_list_columnar(self, filter: BlackoutListFilterSchema, extra_fields: list[str] | None = None) -> dict:
+        fields = COLUMNAR_FIELDS + tuple(dict.fromkeys(extra_fields or []))
+        rows = await self.blackout_repo.get_blackout_list_rows(filter=filter, fields=fields)
+        return to_columns(rows, fields, COLUMNAR_DICTIONARY_FIELDS)
+
+    async def get_blackout_list_msgpack(self, filter: BlackoutListFilterSchema, extra_fields: list[str] | None = None) -> bytes:
+        columns = await self.get_blackout_list_columnar(filter=filter, extra_fields=extra_fields)
+        return pack_msgpack(columns, COLUMNAR_PACKED_DTYPES, COLUMNAR_DICTIONARY_FIELDS, COLUMNAR_HEX_ID_FIELDS)
     
+    async def get_change_token(self) -> str:
+        return await self.blackout_repo.get_change_token()
+
+    async def get_changes(self, filter: BlackoutChangesFilterSchema) -> BlackoutChangesSchema:
+        repos = self.blackout_repo.repos
+        since = decode_change_token(filter.since, list(repos))
+        if since is None:
+            # Токен от другой базы или другого набора шардов
+            tokens = await shard_router.fan_out(repos, lambda key, repo: repo.get_change_token())
+            return BlackoutChangesSchema(token=encode_change_token(dict(zip(repos, tokens))), upserts=[], deletes=[], has_more=False, reset=True)
+
+        # У каждого шарда свой журнал; limit действует на каждый шард отдельно
+        parts = await shard_router.fan_out(repos, lambda key, repo: self._get_shard_changes(repo, since[key], filter.limit))
+        token = encode_change_token({key: part["token"] for key, part in zip(repos, parts)})
+        if any(part["reset"] for part in parts):
+            return BlackoutChangesSchema(token=token, upserts=[], deletes=[], has_more=False, reset=True)
+
+        deletes = sorted((delete for part in parts for delete in part["deletes"]), key=lambda d: (d[0], d[1] or ""))
+        return BlackoutChangesSchema(
+            token=token,
+            upserts=[upsert for part in parts for upsert in part["upserts"]],
+            deletes=[BlackoutDeletedSchema(blackout_id=blackout_id, building_id=building_id) for blackout_id, building_id in deletes],
+            has_more=any(part["has_more"] for part in parts),
+        )
+
+    @staticmethod
+    async def _get_shard_changes(repo: BlackoutRepository, since: int, limit: int) -> dict:
+        token = await repo.get_change_token()
+        pruned_through = await repo.get_changes_pruned_through()
+        if since < pruned_through or since > token:
+            # Нужные записи журнала удалены, или токен от другой базы — дельту не восстановить
+            return {"token": token, "upserts": [], "deletes": [], "has_more": False, "reset": True}
+
+        changes = await repo.get_changes(since=since, limit=limit + 1)
+        has_more = len(changes) > limit
+        changes = changes[:limit]
+
+        # Несколько изменений одной строки схлопываются: клиенту отдается только ее текущее состояние
+        blackout_ids = {blackout_id for _, blackout_id, building_id in changes if building_id is None}
+        pairs = {(blackout_id, building_id) for _, blackout_id, building_id in changes if building_id is not None}
+        # Строки отключений из blackout_ids читаются целиком, отдельно запрашиваются только пары остальных
+        upserts = await repo.get_blackouts_by_keys(
+            blackout_ids=blackout_ids,
+            pairs={pair for pair in pairs if pair[0] not in blackout_ids},
+        )
+
+        present_blackouts = {blackout["id"] for blackout in upserts}
+        present_pairs = {(blackout["id"], blackout["building_id"]) for blackout in upserts}
+        deleted_blackouts = blackout_ids - present_blackouts
+        deletes = [(blackout_id, None) for blackout_id in deleted_blackouts]
+        # Пары, удаленные в том же окне, что и изменение их отключения, тоже удаляются явно
+        deletes += [pair for pair in pairs - present_pairs if pair[0] not in deleted_blackouts]
+
+        return {
+            "token": changes[-1][0] if changes else since,
+            "upserts": upserts,
+            "deletes": deletes,
+            "has_more": has_more,
+            "reset": False,
+        }
+
     async def get_blackouts_by_address(self, filter: BlackoutByAddressFilterSchema) -> BlackoutByAddressListSchema:
-        
+        key = (filter.building_id, time_bucket(filter.date, COALESCE_DATE_BUCKET_S), filter.limit_neighbors)
+        return await by_address_flight.run(key, lambda: self._get_blackouts_by_address(filter))
+
+    async def _get_blackouts_by_address(self, filter: BlackoutByAddressFilterSchema) -> BlackoutByAddressListSchema:
+        deadline = inference_deadline()
         building = await self.address_service.get_building(building_id=filter.building_id)
         print(building)
         if building is None:
@@ -56,40 +212,165 @@ class BlackoutService:
                 limit = filter.limit_neighbors
             )
 
-        blackouts_with_prediction = []
-        
+        blackouts_with_prediction = await self._predict_blackouts(target_blackouts, deadline=deadline)
+
+        return BlackoutByAddressListSchema(
+            blackouts=blackouts_with_prediction,
+            neighbor_blackouts=neighbor_blackouts,
+        )
+
+    async def stream_blackouts_by_addresses(self, filter: BlackoutByAddressBulkFilterSchema) -> AsyncIterator[str]:
+        """Отдает NDJSON: по строке на здание, порциями по BULK_CHUNK_SIZE зданий."""
+        building_ids = list(dict.fromkeys(filter.building_ids))
+
+        for i in range(0, len(building_ids), BULK_CHUNK_SIZE):
+            items = await self.get_blackouts_by_addresses(
+                building_ids=building_ids[i:i + BULK_CHUNK_SIZE],
+                date=filter.date,
+                limit_neighbors=filter.limit_neighbors,
+            )
+            for item in items:
+                yield item.model_dump_json() + "\n"
+
+    async def get_blackouts_by_addresses(self, building_ids: list[str], date: datetime, limit_neighbors: int | None) -> list[BlackoutByAddressBulkItemSchema]:
+        """
+        Те же данные, что и get_blackouts_by_address, но для набора зданий фиксированным числом запросов.
+        Дедлайн инференса отсчитывается от начала порции: при потоковой отдаче каждая порция — отдельный ответ.
+        """
+        deadline = inference_deadline()
+        existing_ids = await self.address_service.get_existing_building_ids(building_ids=building_ids)
+        target_blackouts = await self.blackout_repo.get_blackouts_by_addresses(building_ids=building_ids, date=date)
+
+        blackouts_by_building: dict[str, list] = {building_id: [] for building_id in building_ids}
         for blackout in target_blackouts:
-            
-            blackout_data = dict(blackout)
-            blackout_type = blackout_data["type"]
-            start_date = datetime.fromisoformat(blackout_data["start_date"])
-            end_date: datetime = datetime.fromisoformat(blackout_data["end_date"])
-            
+            blackouts_by_building[blackout["building_id"]].append(blackout)
+
+        # Соседи: одна выборка по прямоугольникам вокруг занятых зданиями клеток сетки COORD_DELTA,
+        # дальше каждое здание просматривает только строки своей и восьми соседних клеток
+        targets = {}
+        for building_id, blackouts in blackouts_by_building.items():
+            coords_data = blackouts[0]["coordinates"] if blackouts else None
+            if coords_data and coords_data.get("latitude") is not None and coords_data.get("longitude") is not None:
+                targets[building_id] = (coords_data["latitude"], coords_data["longitude"])
+
+        neighbors_by_building: dict[str, list[NeighborBlackoutSchema]] = {building_id: [] for building_id in building_ids}
+        if targets:
+            target_cells: dict[tuple[int, int], list[tuple[float, float]]] = {}
+            for lat, lon in targets.values():
+                target_cells.setdefault(grid_cell(lat, lon), []).append((lat, lon))
+            boxes = [
+                (
+                    min(lat for lat, _ in points) - COORD_DELTA,
+                    max(lat for lat, _ in points) + COORD_DELTA,
+                    min(lon for _, lon in points) - COORD_DELTA,
+                    max(lon for _, lon in points) + COORD_DELTA,
+                )
+                for points in target_cells.values()
+            ]
+            area_rows = await self.blackout_repo.get_neighbor_blackouts_in_areas(boxes=boxes, date=date)
+
+            # Одиночный запрос соседей идет по индексу (lat, lon) — в том же порядке отбираются и здесь
+            # (сортировка устойчивая: при равных координатах остается порядок индекса)
+            rows_by_cell: dict[tuple[int, int], list[tuple[int, dict]]] = {}
+            for number, row in enumerate(sorted(area_rows, key=lambda row: (row["lat"], row["lon"]))):
+                rows_by_cell.setdefault(grid_cell(row["lat"], row["lon"]), []).append((number, row))
+
+            for building_id, (target_lat, target_lon) in targets.items():
+                neighbors = neighbors_by_building[building_id]
+                cell_lat, cell_lon = grid_cell(target_lat, target_lon)
+                cells = [
+                    rows_by_cell.get((cell_lat + d_lat, cell_lon + d_lon), [])
+                    for d_lat in (-1, 0, 1)
+                    for d_lon in (-1, 0, 1)
+                ]
+                for _, row in heapq.merge(*cells, key=lambda item: item[0]):
+                    if limit_neighbors is not None and len(neighbors) >= limit_neighbors:
+                        break
+                    if (
+                        row["building_id"] != building_id
+                        and abs(row["lat"] - target_lat) <= COORD_DELTA
+                        and abs(row["lon"] - target_lon) <= COORD_DELTA
+                    ):
+                        neighbors.append(
+                            NeighborBlackoutSchema(street=row["street"], building=row["building"], building_id=row["building_id"], type=row["type"])
+                        )
+
+        # Погода и инференс — одним батчем на всю порцию зданий
+        predicted = iter(await self._predict_blackouts(target_blackouts, deadline=deadline))
+        predicted_by_building: dict[str, list[BlackoutByAddressInfoSchema]] = {building_id: [] for building_id in building_ids}
+        for blackout in target_blackouts:
+            predicted_by_building[blackout["building_id"]].append(next(predicted))
+
+        return [
+            BlackoutByAddressBulkItemSchema(
+                building_id=building_id,
+                found=building_id in existing_ids,
+                blackouts=predicted_by_building[building_id],
+                neighbor_blackouts=neighbors_by_building[building_id],
+            )
+            for building_id in building_ids
+        ]
+
+    async def _predict_blackouts(self, target_blackouts, deadline: float) -> list[BlackoutByAddressInfoSchema]:
+        """
+        Добавляет к отключениям прогнозную дату окончания: погода одним запросом, инференс одним проходом.
+        deadline — из inference_deadline() в начале запроса: чтение базы и погоды тоже расходуют его.
+        """
+        blackouts_data = [dict(blackout) for blackout in target_blackouts]
+        start_dates = [datetime.fromisoformat(blackout_data["start_date"]) for blackout_data in blackouts_data]
+
+        weather_by_date = {}
+        if self.weather_service.session is not None and start_dates:
+            weather_by_date = await self.weather_service.get_weather_by_dates(
+                dates=list({start_date.date() for start_date in start_dates})
+            )
+
+        prediction_inputs = []
+
+        for blackout_data, start_date in zip(blackouts_data, start_dates):
             weather_data = {}
+            weather_info = weather_by_date.get(start_date.date())
 
-            if self.weather_service:
-                weather_info = await self.weather_service.get_weather(date=start_date) 
-                
-                if weather_info:
-                    weather_data = {
-                        "temp_max": weather_info.temp_max,
-                        "temp_min": weather_info.temp_min,
-                        "weather_description": weather_info.weather_type,
-                    }
-
-            prediction_input = {
+            if weather_info:
+                weather_data = {
+                    "temp_max": weather_info.temp_max,
+                    "temp_min": weather_info.temp_min,
+                    "weather_description": weather_info.weather_type,
+                }
+
+            prediction_inputs.append({
                 "start_date": start_date, 
                 "description": blackout_data.get("description"),
-                "type": blackout_type,
+                "type": blackout_data["type"],
                 "city": blackout_data.get("city"),
                 "street": blackout_data.get("street"),
                 "house_number": blackout_data.get("building_number"),
-                "district": blackout_data.get("district"),
+                # Как COALESCE(fd.name, bfd.name, d.name) в core.nn.training_data: на этих именах обучены district_mapping
+                "district": blackout_data.get("folk_district") or blackout_data.get("big_folk_district") or blackout_data.get("district"),
                 **weather_data,
-            }
+            })
+
+        # Все отключения (разных типов) предсказываются одним проходом
+        prediction_degraded = False
+        try:
+            if PREDICTION_MODE == "worker":
+                predicted_hours_list = (
+                    await inference_limiter.run_async(prediction_client.predict, prediction_inputs, deadline, deadline=deadline)
+                    if prediction_inputs else []
+                )
+            else:
+                predicted_hours_list = await inference_limiter.run(predict_durations, prediction_inputs, deadline=deadline)
+        except (OverloadedError, PredictionWorkerError):
+            prediction_degraded = True
+            predicted_hours_list = [predict_fallback(prediction_input) for prediction_input in prediction_inputs]
+            if fallback_predictor is None:
+                metrics.inc("prediction_shed_without_fallback")
+
+        blackouts_with_prediction = []
+
+        for blackout_data, start_date, predicted_hours in zip(blackouts_data, start_dates, predicted_hours_list):
+            end_date: datetime = datetime.fromisoformat(blackout_data["end_date"])
 
-            predicted_hours = predict_duration(prediction_input)
-            
             predicted_end_date = None
 
             if predicted_hours is not None:
@@ -101,10 +382,8 @@ class BlackoutService:
                 BlackoutByAddressInfoSchema(
                     **blackout_data,
                     predicted_end_date=predicted_end_date,
+                    prediction_degraded=prediction_degraded,
                 )
             )
 
-        return BlackoutByAddressListSchema(
-            blackouts=blackouts_with_prediction,
-            neighbor_blackouts=neighbor_blackouts,
-        )
\ No newline at end of file
+        return blackouts_with_prediction
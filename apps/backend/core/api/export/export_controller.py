@@ -0,0 +1,71 @@
+from typing import Literal
+
+from fastapi import APIRouter, Path, Query, status
+from fastapi.responses import FileResponse, StreamingResponse
+from core.export.snapshot import SCHEMA
+from core.utils.common_util import exception_handler
+
+from .export_schema import ExportManifestSchema
+from .export_service import ExportService
+
+export_controller = APIRouter()
+
+MEDIA_TYPES = {
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+}
+ARROW_FILE_MEDIA_TYPE = "application/vnd.apache.arrow.file"
+
+ExportFormat = Literal["parquet", "arrow"]
+ExportColumn = Literal[tuple(SCHEMA.names)]
+MONTH_PATTERN = r"^\d{4}-\d{2}$"
+
+
+@export_controller.get(
+    "/",
+    summary="Состав колоночного снапшота отключений",
+    response_description="Месяцы снапшота с числом строк, подписью данных и файлами по форматам.",
+)
+@exception_handler
+async def get_export_manifest() -> ExportManifestSchema:
+    return ExportService().get_manifest()
+
+
+@export_controller.get(
+    "/blackouts",
+    summary="Потоковая выгрузка снапшота отключений за диапазон месяцев",
+    response_description="Один поток Arrow IPC или один Parquet-файл; отдается по батчам, без сборки в памяти.",
+    response_class=StreamingResponse,
+    responses={status.HTTP_200_OK: {"content": {media_type: {} for media_type in MEDIA_TYPES.values()}}},
+)
+@exception_handler
+async def stream_blackouts(
+    format: ExportFormat = Query("arrow", description="arrow — поток Arrow IPC, parquet — Parquet-файл"),
+    from_month: str | None = Query(None, pattern=MONTH_PATTERN, description="С месяца начала (включительно), YYYY-MM", example="2019-01"),
+    to_month: str | None = Query(None, pattern=MONTH_PATTERN, description="По месяц начала (включительно), YYYY-MM", example="2019-06"),
+    columns: list[ExportColumn] | None = Query(None, description="Только эти колонки (по умолчанию все)"),
+) -> StreamingResponse:
+    export_service = ExportService()
+    paths = export_service.get_range_paths(format=format, from_month=from_month, to_month=to_month)
+    filename = f"blackouts_{from_month or 'start'}_{to_month or 'end'}.{format}"
+    return StreamingResponse(
+        export_service.stream_range(format=format, paths=paths, columns=columns),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@export_controller.get(
+    "/blackouts/{month}",
+    summary="Файл снапшота отключений за один месяц",
+    response_description="Готовый файл месяца (отдается с диска через sendfile).",
+    response_class=FileResponse,
+)
+@exception_handler
+async def get_blackouts_partition(
+    month: str = Path(..., pattern=MONTH_PATTERN, example="2019-03"),
+    format: ExportFormat = Query("parquet", description="parquet или arrow (Arrow IPC file)"),
+) -> FileResponse:
+    path = ExportService().get_partition_path(month=month, format=format)
+    media_type = ARROW_FILE_MEDIA_TYPE if format == "arrow" else MEDIA_TYPES[format]
+    return FileResponse(path, media_type=media_type, filename=f"blackouts_{month}.{format}")
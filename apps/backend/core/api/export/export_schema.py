@@ -0,0 +1,21 @@
+from pydantic import BaseModel, Field
+
+
+class ExportFileSchema(BaseModel):
+    path: str = Field(..., description="Путь к файлу относительно папки снапшота")
+    bytes: int = Field(..., description="Размер файла в байтах")
+
+
+class ExportPartitionSchema(BaseModel):
+    """Месяц снапшота отключений."""
+    month: str = Field(..., description="Месяц начала отключений, YYYY-MM", example="2019-03")
+    rows: int = Field(..., description="Строк (пар отключение-здание) в месяце")
+    signature: str = Field(..., description="Подпись данных месяца — меняется при любом изменении")
+    exported_at: str = Field(..., description="Когда месяц был выгружен")
+    files: dict[str, ExportFileSchema] = Field(..., description="Файлы по форматам: parquet, arrow")
+
+
+class ExportManifestSchema(BaseModel):
+    schema_version: int
+    updated_at: str | None = None
+    partitions: list[ExportPartitionSchema]
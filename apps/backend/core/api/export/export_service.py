@@ -0,0 +1,112 @@
+import os
+from typing import Iterator
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from core.common.common_exceptions import NotFoundHttpException
+from core.config.settings import EXPORT_DIR
+from core.export.snapshot import SCHEMA, read_manifest
+
+from .export_schema import ExportManifestSchema, ExportPartitionSchema
+
+# Отдача снапшота из core.export.snapshot. Файлы месяцев открываются через memory map:
+# батчи Arrow ссылаются прямо на страницы файла, в ответ они пишутся по одному,
+# так что выгрузка любого размера не собирается в памяти процесса API.
+
+
+class ChunkSink:
+    """Файлоподобный приемник для писателей pyarrow: накопленные байты забираются после каждого батча."""
+
+    def __init__(self):
+        self.chunks: list[bytes] = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+class ExportService:
+
+    def __init__(self, export_dir: str = EXPORT_DIR):
+        self.export_dir = export_dir
+
+    def get_manifest(self) -> ExportManifestSchema:
+        manifest = read_manifest(self.export_dir)
+        return ExportManifestSchema(
+            schema_version=manifest["schema_version"],
+            updated_at=manifest.get("updated_at"),
+            partitions=[
+                ExportPartitionSchema(month=month, **partition)
+                for month, partition in sorted(manifest["partitions"].items())
+            ],
+        )
+
+    def get_partition_path(self, month: str, format: str) -> str:
+        partition = read_manifest(self.export_dir)["partitions"].get(month)
+        if partition is None or format not in partition["files"]:
+            raise NotFoundHttpException(name=f"месяц {month} в формате {format}")
+        return os.path.join(self.export_dir, partition["files"][format]["path"])
+
+    def get_range_paths(self, format: str, from_month: str | None, to_month: str | None) -> list[str]:
+        partitions = read_manifest(self.export_dir)["partitions"]
+        return [
+            os.path.join(self.export_dir, partition["files"][format]["path"])
+            for month, partition in sorted(partitions.items())
+            if format in partition["files"]
+            and (from_month is None or month >= from_month)
+            and (to_month is None or month <= to_month)
+        ]
+
+    def stream_range(self, format: str, paths: list[str], columns: list[str] | None = None) -> Iterator[bytes]:
+        """
+        Один поток Arrow IPC (stream) или один Parquet-файл из нескольких месяцев, батч за батчем.
+        Синхронный генератор — StreamingResponse выполняет его в пуле потоков.
+        """
+        schema = SCHEMA if not columns else pa.schema([SCHEMA.field(column) for column in columns])
+        sink = ChunkSink()
+        if format == "arrow":
+            writer = pa.ipc.new_stream(sink, schema)
+        else:
+            writer = pq.ParquetWriter(sink, schema, compression="zstd")
+
+        for batch in self._iter_batches(format, paths, columns):
+            # Файлы прежних версий схемы (и чтение Parquet) могут отличаться типами — приводим к схеме ответа
+            if not batch.schema.equals(schema):
+                batch = batch.cast(schema)
+            writer.write_batch(batch)
+            if data := sink.drain():
+                yield data
+        writer.close()
+        yield sink.drain()
+
+    @staticmethod
+    def _iter_batches(format: str, paths: list[str], columns: list[str] | None) -> Iterator[pa.RecordBatch]:
+        for path in paths:
+            if format == "arrow":
+                with pa.memory_map(path) as source:
+                    reader = pa.ipc.open_file(source)
+                    for i in range(reader.num_record_batches):
+                        batch = reader.get_batch(i)
+                        yield batch.select(columns) if columns else batch
+            else:
+                parquet_file = pq.ParquetFile(path, memory_map=True)
+                yield from parquet_file.iter_batches(columns=columns)
@@ -0,0 +1,13 @@
+from fastapi import APIRouter
+from core.utils.metrics_util import metrics
+
+metrics_controller = APIRouter()
+
+
+@metrics_controller.get(
+    "/",
+    summary="Метрики процесса API",
+    response_description="Счетчики и текущие значения: очередь инференса, отброшенные запросы и т.п.",
+)
+async def get_metrics() -> dict[str, float]:
+    return metrics.snapshot()
@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import date, datetime
 
 from core.models.weather import WeatherInfoOrm
 from sqlalchemy import func, select
@@ -19,3 +19,13 @@ class WeatherRepository:
         weather = (await self.session.execute(stmt)).scalar_one_or_none()
         
         return weather
+
+    async def get_weather_by_dates(self, dates: list[date]) -> dict[date, WeatherInfoOrm]:
+        if not dates:
+            return {}
+
+        stmt = select(WeatherInfoOrm).where(func.date(WeatherInfoOrm.date).in_([d.isoformat() for d in dates]))
+
+        weather = (await self.session.execute(stmt)).scalars().all()
+
+        return {item.date.date(): item for item in weather}
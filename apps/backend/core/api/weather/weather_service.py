@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import date, datetime
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -14,3 +14,7 @@ class WeatherService:
     async def get_weather(self, date: datetime):
         weather = await self.weather_repo.get_weather(date=date)
         return weather
+
+    async def get_weather_by_dates(self, dates: list[date]):
+        weather = await self.weather_repo.get_weather_by_dates(dates=dates)
+        return weather
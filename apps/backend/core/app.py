@@ -1,9 +1,54 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from .api.api import api_controller
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from core.config.settings import WEB_URL
+from core.config.settings import (
+    IN_MEMORY_SNAPSHOT,
+    PROFILING_DIR,
+    PROFILING_DRAIN_TIMEOUT_MS,
+    PROFILING_ENABLED,
+    PROFILING_INTERVAL_MS,
+    PROFILING_MODE,
+    SNAPSHOT_RETIRE_AFTER_S,
+    SNAPSHOT_WATCH_INTERVAL_S,
+    WEB_URL,
+)
+from core.read_model.blackout_view import check_view
+from core.read_model.change_log import check_change_log
+from core.utils.address_index_util import address_index
+from core.utils.shard_util import shard_router
+from core.utils.snapshot_util import create_snapshots, watch_snapshots
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    for shard in shard_router.shards.values():
+        # Read-модель отключений собирается при развертывании (core.read_model.blackout_view), здесь только проверяется
+        await asyncio.to_thread(check_view, shard.path)
+        # Журнал изменений для GET /api/blackout/changes ставится так же (core.read_model.change_log)
+        await asyncio.to_thread(check_change_log, shard.path)
+    # Базы копируются в память после проверки файлов; наблюдатель подменяет копию при изменении файла
+    snapshots, watcher = [], None
+    if IN_MEMORY_SNAPSHOT:
+        snapshots = create_snapshots()
+        for snapshot in snapshots:
+            await snapshot.load()
+        watcher = asyncio.create_task(watch_snapshots(snapshots, SNAPSHOT_WATCH_INTERVAL_S, SNAPSHOT_RETIRE_AFTER_S))
+    # Справочники и индекс поиска адресов загружаются до первого запроса, дальше только проверяется их версия
+    async with shard_router.sessions() as sessions:
+        for key, session in sessions.items():
+            await shard_router.shards[key].dimensions.ensure_fresh(session)
+        await address_index.ensure_fresh(list(sessions.values()))
+    yield
+    if watcher is not None:
+        watcher.cancel()
+    for snapshot in snapshots:
+        await snapshot.close()
 
-app = FastAPI()
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -11,6 +56,18 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Change-Token"],
 )
 
+if PROFILING_ENABLED:
+    from core.utils.profiling_util import ProfilingMiddleware
+
+    app.add_middleware(
+        ProfilingMiddleware,
+        output_dir=PROFILING_DIR,
+        default_mode=PROFILING_MODE,
+        interval_ms=PROFILING_INTERVAL_MS,
+        drain_timeout_ms=PROFILING_DRAIN_TIMEOUT_MS,
+    )
+
 app.include_router(api_controller, prefix="/api")
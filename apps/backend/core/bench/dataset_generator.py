@@ -0,0 +1,329 @@
+import argparse
+import json
+import os
+import sqlite3
+from datetime import datetime
+
+import joblib
+import numpy as np
+
+# Генератор синтетического dataset.db.
+# Схема совпадает с таблицами из core/models/geo.py и core/models/blackout.py,
+# поэтому сгенерированный файл можно сразу подложить в DATABASE_PATH.
+#
+# Запуск из папки backend:
+#   python -m core.bench.dataset_generator --buildings 100000 --years 2 --output ../../databases/dataset.db
+
+NN_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "nn")
+
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Центры городов и разброс координат (в градусах)
+CITIES = {
+    "Владивосток": {"lat": 43.1155, "lon": 131.8855, "spread_lat": 0.045, "spread_lon": 0.055, "share": 0.8},
+    "Артем": {"lat": 43.3595, "lon": 132.1890, "spread_lat": 0.025, "spread_lon": 0.030, "share": 0.2},
+}
+
+OFFICIAL_DISTRICTS = {
+    "Владивосток": [
+        "Ленинский район",
+        "Первомайский район",
+        "Первореченский район",
+        "Советский район",
+        "Фрунзенский район",
+    ],
+    "Артем": ["Артемовский городской округ"],
+}
+
+# Медиана (часы) и sigma логнормального распределения длительности по типам
+TYPE_DURATIONS = {
+    "electricity": {"share": 0.45, "median": 4.0, "sigma": 0.9},
+    "cold_water": {"share": 0.25, "median": 8.0, "sigma": 1.0},
+    "hot_water": {"share": 0.15, "median": 96.0, "sigma": 1.2},
+    "heat": {"share": 0.15, "median": 10.0, "sigma": 1.0},
+}
+
+DESCRIPTIONS = {
+    "electricity": [
+        "Аварийные работы на линии электроснабжения",
+        "Плановые работы по замене оборудования на подстанции",
+        "Авария на сети электроснабжения, ведутся восстановительные работы",
+        "Ремонт кабельной линии",
+    ],
+    "cold_water": [
+        "Замена участка трубы холодного водоснабжения",
+        "Аварийные работы на водопроводе",
+        "Плановая промывка сетей водоснабжения",
+    ],
+    "hot_water": [
+        "Плановые гидравлические испытания тепловых сетей",
+        "Ремонт сетей горячего водоснабжения",
+        "Аварийные работы на сетях горячего водоснабжения",
+    ],
+    "heat": [
+        "Аварийные работы на тепловой сети",
+        "Замена запорной арматуры на теплотрассе",
+        "Ремонт тепловой камеры",
+    ],
+}
+
+INITIATORS = {
+    "electricity": ["АО «ДРСК»", "ООО «Оборонэнерго»"],
+    "cold_water": ["КГУП «Приморский водоканал»"],
+    "hot_water": ["АО «ДГК»", "КГУП «Примтеплоэнерго»"],
+    "heat": ["АО «ДГК»", "КГУП «Примтеплоэнерго»"],
+}
+
+HOUSE_LETTERS = ["", "", "", "", "", "", "А", "Б", "В"]
+
+# Запасные названия на случай, если артефакты nn недоступны
+FALLBACK_STREETS = [
+    "Светланская ул.", "Алеутская ул.", "Океанский пр-кт", "Русская ул.", "Некрасовская ул.",
+    "Гоголя ул.", "Борисенко ул.", "Луговая ул.", "Адмирала Фокина ул.", "Пограничная ул.",
+    "100-летия Владивостока пр-кт", "Красного Знамени пр-кт", "Калинина ул.", "Фонтанная ул.",
+]
+FALLBACK_FOLK_DISTRICTS = [
+    "Центр", "Вторая Речка", "Первая речка", "Луговая", "Баляева", "Некрасовская",
+    "Эгершельд", "Чуркин", "Тихая", "Заря", "Садгород", "Патрокл", "Снеговая падь",
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cities (id TEXT PRIMARY KEY, name TEXT);
+CREATE TABLE IF NOT EXISTS districts (id TEXT PRIMARY KEY, name TEXT);
+CREATE TABLE IF NOT EXISTS folk_districts (id TEXT PRIMARY KEY, name TEXT);
+CREATE TABLE IF NOT EXISTS big_folk_districts (id TEXT PRIMARY KEY, name TEXT);
+CREATE TABLE IF NOT EXISTS streets (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    city_id TEXT REFERENCES cities(id)
+);
+CREATE TABLE IF NOT EXISTS buildings (
+    id TEXT PRIMARY KEY,
+    number TEXT,
+    is_fake INTEGER,
+    type TEXT,
+    coordinates TEXT,
+    street_id TEXT REFERENCES streets(id),
+    district_id TEXT REFERENCES districts(id),
+    folk_district_id TEXT REFERENCES folk_districts(id),
+    big_folk_district_id TEXT REFERENCES big_folk_districts(id),
+    city_id TEXT REFERENCES cities(id)
+);
+CREATE TABLE IF NOT EXISTS blackouts (
+    id TEXT PRIMARY KEY,
+    start_date TEXT,
+    end_date TEXT,
+    description TEXT,
+    type TEXT,
+    initiator_name TEXT,
+    source TEXT
+);
+CREATE TABLE IF NOT EXISTS blackouts_buildings (
+    blackout_id TEXT REFERENCES blackouts(id),
+    building_id TEXT REFERENCES buildings(id),
+    PRIMARY KEY (blackout_id, building_id)
+);
+"""
+
+
+def load_names(filename, fallback):
+    """Берет реальные названия из маппингов nn, чтобы модель узнавала улицы и районы."""
+    try:
+        names = list(joblib.load(os.path.join(NN_DIR, filename)).keys())
+    except FileNotFoundError:
+        names = []
+    return names or list(fallback)
+
+
+def generate_dataset(
+    output: str,
+    buildings: int = 10_000,
+    years: int = 2,
+    start_year: int = 2018,
+    blackouts_per_year: int = 20_000,
+    buildings_per_street: int = 40,
+    max_buildings_per_blackout: int = 30,
+    seed: int = 42,
+    batch_size: int = 50_000,
+):
+    """Создает schema-compatible dataset.db заданного масштаба."""
+    rng = np.random.default_rng(seed)
+    # Идентификаторы в формате исходного датасета (32 hex-символа), но воспроизводимые по seed
+    id_rng = np.random.default_rng(seed + 1)
+
+    def ids(count):
+        raw = id_rng.integers(0, 2**63, size=(count, 2), dtype=np.int64)
+        return [f"{a:016x}{b:016x}" for a, b in raw]
+
+    if os.path.exists(output):
+        os.remove(output)
+
+    conn = sqlite3.connect(output)
+    conn.executescript(SCHEMA)
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+
+    # --- Справочники ---
+    city_names = list(CITIES)
+    city_ids = dict(zip(city_names, ids(len(city_names))))
+    conn.executemany("INSERT INTO cities VALUES (?, ?)", [(i, n) for n, i in city_ids.items()])
+
+    district_rows = []
+    district_ids_by_city = {}
+    for city, names in OFFICIAL_DISTRICTS.items():
+        district_ids_by_city[city] = ids(len(names))
+        district_rows.extend(zip(district_ids_by_city[city], names))
+    conn.executemany("INSERT INTO districts VALUES (?, ?)", district_rows)
+
+    folk_names = load_names("district_mapping.joblib", FALLBACK_FOLK_DISTRICTS)
+    folk_names = [name for name in folk_names if name not in {n for _, n in district_rows}]
+    folk_ids = ids(len(folk_names))
+    conn.executemany("INSERT INTO folk_districts VALUES (?, ?)", list(zip(folk_ids, folk_names)))
+
+    # Крупные народные районы — укрупнение народных: берем каждый четвертый
+    big_folk_names = folk_names[::4] or folk_names
+    big_folk_ids = ids(len(big_folk_names))
+    conn.executemany("INSERT INTO big_folk_districts VALUES (?, ?)", list(zip(big_folk_ids, big_folk_names)))
+
+    street_pool = load_names("street_mapping.joblib", FALLBACK_STREETS)
+    streets_count = max(1, buildings // buildings_per_street)
+    street_ids = ids(streets_count)
+    street_names = [
+        street_pool[i % len(street_pool)] if i < len(street_pool) else f"{street_pool[i % len(street_pool)]} ({i // len(street_pool)})"
+        for i in range(streets_count)
+    ]
+    city_shares = np.array([CITIES[c]["share"] for c in city_names])
+    street_city = rng.choice(len(city_names), size=streets_count, p=city_shares / city_shares.sum())
+    conn.executemany(
+        "INSERT INTO streets VALUES (?, ?, ?)",
+        [(street_ids[i], street_names[i], city_ids[city_names[street_city[i]]]) for i in range(streets_count)],
+    )
+
+    # Центр каждой улицы и ее районы; дома улицы лежат рядом с центром,
+    # поэтому соседний поиск по COORD_DELTA находит реалистичное число зданий
+    centers_lat = np.empty(streets_count)
+    centers_lon = np.empty(streets_count)
+    for idx, city in enumerate(city_names):
+        mask = street_city == idx
+        count = int(mask.sum())
+        cfg = CITIES[city]
+        centers_lat[mask] = rng.normal(cfg["lat"], cfg["spread_lat"], count)
+        centers_lon[mask] = rng.normal(cfg["lon"], cfg["spread_lon"], count)
+
+    street_district = np.array([
+        rng.integers(len(district_ids_by_city[city_names[c]])) for c in street_city
+    ])
+    street_folk = rng.integers(len(folk_ids), size=streets_count)
+    street_big_folk = street_folk // 4 % len(big_folk_ids)
+
+    # --- Здания ---
+    building_street = np.sort(rng.integers(streets_count, size=buildings))
+    building_lat = centers_lat[building_street] + rng.normal(0, 0.002, buildings)
+    building_lon = centers_lon[building_street] + rng.normal(0, 0.002, buildings)
+    building_numbers = rng.integers(1, 200, size=buildings)
+    building_letters = rng.choice(HOUSE_LETTERS, size=buildings)
+    building_ids = ids(buildings)
+
+    for start in range(0, buildings, batch_size):
+        rows = []
+        for i in range(start, min(start + batch_size, buildings)):
+            s = building_street[i]
+            city = city_names[street_city[s]]
+            rows.append((
+                building_ids[i],
+                f"{building_numbers[i]}{building_letters[i]}",
+                0,
+                "house",
+                json.dumps([{"lat": round(float(building_lat[i]), 6), "lon": round(float(building_lon[i]), 6)}]),
+                street_ids[s],
+                district_ids_by_city[city][street_district[s]],
+                folk_ids[street_folk[s]],
+                big_folk_ids[street_big_folk[s]],
+                city_ids[city],
+            ))
+        conn.executemany("INSERT INTO buildings VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    conn.commit()
+
+    # --- Отключения ---
+    # Отключение затрагивает непрерывный диапазон зданий одной улицы (здания отсортированы по улице)
+    total_blackouts = blackouts_per_year * years
+    type_names = list(TYPE_DURATIONS)
+    type_shares = np.array([TYPE_DURATIONS[t]["share"] for t in type_names])
+    blackout_types = rng.choice(len(type_names), size=total_blackouts, p=type_shares / type_shares.sum())
+
+    period_start = datetime(start_year, 1, 1).timestamp()
+    period_end = datetime(start_year + years, 1, 1).timestamp()
+    starts = rng.uniform(period_start, period_end, total_blackouts)
+    # Окно в 15 минут, как в исходных данных
+    starts = np.floor(starts / 900) * 900
+
+    medians = np.array([TYPE_DURATIONS[type_names[t]]["median"] for t in blackout_types])
+    sigmas = np.array([TYPE_DURATIONS[type_names[t]]["sigma"] for t in blackout_types])
+    durations_h = rng.lognormal(np.log(medians), sigmas)
+    ends = starts + np.round(durations_h * 4) * 900
+
+    affected = rng.integers(1, max_buildings_per_blackout + 1, size=total_blackouts)
+    first_building = rng.integers(buildings, size=total_blackouts)
+    blackout_ids = ids(total_blackouts)
+
+    for start in range(0, total_blackouts, batch_size):
+        blackout_rows = []
+        link_rows = []
+        for i in range(start, min(start + batch_size, total_blackouts)):
+            type_name = type_names[blackout_types[i]]
+            blackout_rows.append((
+                blackout_ids[i],
+                datetime.fromtimestamp(starts[i]).strftime(DATE_FORMAT),
+                datetime.fromtimestamp(ends[i]).strftime(DATE_FORMAT),
+                DESCRIPTIONS[type_name][rng.integers(len(DESCRIPTIONS[type_name]))],
+                type_name,
+                INITIATORS[type_name][rng.integers(len(INITIATORS[type_name]))],
+                "synthetic",
+            ))
+            street = building_street[first_building[i]]
+            last = min(first_building[i] + affected[i], buildings)
+            for b in range(first_building[i], last):
+                if building_street[b] != street:
+                    break
+                link_rows.append((blackout_ids[i], building_ids[b]))
+        conn.executemany("INSERT INTO blackouts VALUES (?, ?, ?, ?, ?, ?, ?)", blackout_rows)
+        conn.executemany("INSERT INTO blackouts_buildings VALUES (?, ?)", link_rows)
+    conn.commit()
+
+    stats = {
+        table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        for table in ("cities", "districts", "folk_districts", "big_folk_districts", "streets", "buildings", "blackouts", "blackouts_buildings")
+    }
+    conn.close()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Генерация синтетического dataset.db")
+    parser.add_argument("--output", default="dataset.db", help="Путь к создаваемой базе")
+    parser.add_argument("--buildings", type=int, default=10_000, help="Количество зданий (10k–1M)")
+    parser.add_argument("--years", type=int, default=2, help="Сколько лет истории отключений")
+    parser.add_argument("--start-year", type=int, default=2018, help="Первый год истории (weather.db покрывает 2018–2019)")
+    parser.add_argument("--blackouts-per-year", type=int, default=20_000)
+    parser.add_argument("--buildings-per-street", type=int, default=40)
+    parser.add_argument("--max-buildings-per-blackout", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    stats = generate_dataset(
+        output=args.output,
+        buildings=args.buildings,
+        years=args.years,
+        start_year=args.start_year,
+        blackouts_per_year=args.blackouts_per_year,
+        buildings_per_street=args.buildings_per_street,
+        max_buildings_per_blackout=args.max_buildings_per_blackout,
+        seed=args.seed,
+    )
+    print(f"База создана: {args.output}")
+    for table, count in stats.items():
+        print(f"  {table}: {count:,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import subprocess
+import time
+from datetime import datetime
+
+import httpx
+import numpy as np
+
+# Нагрузочный тест API: гоняет каждый эндпоинт с фиксированной конкурентностью
+# и считает throughput и p50/p95/p99. Результаты пишутся в core/bench/results,
+# чтобы регрессии можно было сравнить между коммитами (--compare).
+#
+# Запуск из папки backend (поднятый сервер):
+#   python -m core.bench.load_test --dataset ../../databases/dataset.db --base-url http://localhost:8000
+# Или без сервера, прямо через ASGI-приложение:
+#   python -m core.bench.load_test --dataset ../../databases/dataset.db --in-process
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+SEARCH_INPUTS = ["светланская", "алеутская 1", "океанский", "луговая 2", "русская", "гоголя 10"]
+TYPES = ["electricity", "cold_water", "hot_water", "heat"]
+
+
+def load_samples(dataset_path: str, count: int = 500, seed: int = 42):
+    """Выбирает из датасета реальные здания с активными отключениями и даты, на которые они активны."""
+    conn = sqlite3.connect(dataset_path)
+    rows = conn.execute(
+        """
+        SELECT bb.building_id, b.start_date, b.end_date
+        FROM blackouts b
+        JOIN blackouts_buildings bb ON bb.blackout_id = b.id
+        ORDER BY RANDOM()
+        LIMIT ?
+        """,
+        (count,),
+    ).fetchall()
+    districts = [row[0] for row in conn.execute("SELECT name FROM folk_districts")]
+    conn.close()
+
+    random.seed(seed)
+    by_address = []
+    for building_id, start_date, end_date in rows:
+        start = datetime.fromisoformat(start_date)
+        end = datetime.fromisoformat(end_date)
+        moment = start + (end - start) * random.random()
+        by_address.append({"building_id": building_id, "date": moment.isoformat(timespec="seconds")})
+
+    dates = [sample["date"] for sample in by_address]
+    return {"by_address": by_address, "dates": dates, "districts": districts}
+
+
+def build_scenarios(samples: dict, limit_neighbors: int):
+    """Сценарии: имя -> генератор (path, params) для очередного запроса."""
+    return {
+        "blackout_list": lambda: ("/api/blackout/", {"date": random.choice(samples["dates"])}),
+        "blackout_list_filtered": lambda: (
+            "/api/blackout/",
+            {
+                "date": random.choice(samples["dates"]),
+                "type": random.choice(TYPES),
+                "district": random.choice(samples["districts"]),
+            },
+        ),
+        "blackout_by_address": lambda: (
+            "/api/blackout/by_address",
+            {**random.choice(samples["by_address"]), "limit_neighbors": limit_neighbors},
+        ),
+        "address_search": lambda: ("/api/address/", {"input": random.choice(SEARCH_INPUTS)}),
+        "districts": lambda: ("/api/address/districts", {}),
+    }
+
+
+async def run_scenario(client: httpx.AsyncClient, next_request, concurrency: int, duration: float, warmup: int):
+    """Держит `concurrency` одновременных запросов в течение `duration` секунд."""
+    for _ in range(warmup):
+        path, params = next_request()
+        await client.get(path, params=params)
+
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            path, params = next_request()
+            started = time.perf_counter()
+            try:
+                response = await client.get(path, params=params)
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies_ms = np.array(latencies) * 1000
+    if latencies_ms.size == 0:
+        latencies_ms = np.array([0.0])
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(float(np.percentile(latencies_ms, 50)), 2),
+        "p95_ms": round(float(np.percentile(latencies_ms, 95)), 2),
+        "p99_ms": round(float(np.percentile(latencies_ms, 99)), 2),
+        "max_ms": round(float(latencies_ms.max()), 2),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def save_results(report: dict, label: str | None):
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    name = f"{report['commit']}_{label}" if label else report["commit"]
+    path = os.path.join(RESULTS_DIR, f"{name}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    return path
+
+
+def print_report(report: dict, baseline: dict | None = None):
+    header = f"{'scenario':<24}{'rps':>10}{'p50':>10}{'p95':>10}{'p99':>10}{'err':>6}"
+    print(header)
+    print("-" * len(header))
+    for name, result in report["scenarios"].items():
+        print(
+            f"{name:<24}{result['throughput_rps']:>10}{result['p50_ms']:>10}"
+            f"{result['p95_ms']:>10}{result['p99_ms']:>10}{result['errors']:>6}"
+        )
+        if baseline and name in baseline["scenarios"]:
+            base = baseline["scenarios"][name]
+            deltas = []
+            for key in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms"):
+                if base[key]:
+                    deltas.append(f"{key}: {(result[key] - base[key]) / base[key] * 100:+.1f}%")
+            print(f"{'':<24}vs {baseline['commit']}: " + ", ".join(deltas))
+
+
+async def run(args):
+    samples = load_samples(args.dataset, seed=args.seed)
+    scenarios = build_scenarios(samples, args.limit_neighbors)
+    selected = args.scenarios.split(",") if args.scenarios else list(scenarios)
+
+    if args.in_process:
+        from core.app import app
+
+        transport = httpx.ASGITransport(app=app)
+        client = httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=args.timeout)
+    else:
+        client = httpx.AsyncClient(
+            base_url=args.base_url,
+            timeout=args.timeout,
+            limits=httpx.Limits(max_connections=args.concurrency),
+        )
+
+    report = {
+        "commit": git_commit(),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "concurrency": args.concurrency,
+        "duration_s": args.duration,
+        "dataset": os.path.abspath(args.dataset),
+        "scenarios": {},
+    }
+    async with client:
+        for name in selected:
+            print(f"Сценарий {name}...")
+            report["scenarios"][name] = await run_scenario(
+                client, scenarios[name], args.concurrency, args.duration, args.warmup
+            )
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный тест API отключений")
+    parser.add_argument("--dataset", required=True, help="Путь к dataset.db, из которого берутся здания и даты")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--in-process", action="store_true", help="Гонять core.app:app через ASGI без сервера")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=15.0, help="Секунд на сценарий")
+    parser.add_argument("--warmup", type=int, default=5, help="Запросов прогрева на сценарий")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--limit-neighbors", type=int, default=10)
+    parser.add_argument("--scenarios", help="Список сценариев через запятую (по умолчанию все)")
+    parser.add_argument("--label", help="Суффикс имени файла результатов")
+    parser.add_argument("--compare", help="JSON с результатами прошлого прогона для сравнения")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    path = save_results(report, args.label)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    print(f"\nРезультаты сохранены: {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,3 +6,62 @@ load_dotenv()
 
 COORD_DELTA = float(os.getenv('COORD_DELTA'))
 WEB_URL = os.getenv('WEB_URL')
+
+# Профилирование запросов по заголовку X-Profile (только при PROFILING_ENABLED=true)
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'false').lower() == 'true'
+PROFILING_DIR = os.getenv('PROFILING_DIR', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'logs', 'profiles'))
+PROFILING_MODE = os.getenv('PROFILING_MODE', 'sample')
+PROFILING_INTERVAL_MS = float(os.getenv('PROFILING_INTERVAL_MS', '1'))
+# Сколько профилируемый запрос ждет завершения уже начатых (новые ждут его самого)
+PROFILING_DRAIN_TIMEOUT_MS = float(os.getenv('PROFILING_DRAIN_TIMEOUT_MS', '5000'))
+
+# Где считать прогнозы длительности: local — в процессе API, worker — в отдельном процессе
+# python -m core.nn.prediction_worker (API-воркеры тогда не загружают torch, gensim и pandas)
+PREDICTION_MODE = os.getenv('PREDICTION_MODE', 'local').lower()
+PREDICTION_SOCKET = os.getenv('PREDICTION_SOCKET', '/tmp/blackout_prediction.sock')
+# Батчи процесса инференса: максимум строк и сколько ждать попутные запросы
+PREDICTION_BATCH_MAX_ROWS = int(os.getenv('PREDICTION_BATCH_MAX_ROWS', '4096'))
+PREDICTION_BATCH_WAIT_MS = float(os.getenv('PREDICTION_BATCH_WAIT_MS', '2'))
+# Сколько запросов одного API-процесса может одновременно ждать процесс инференса (очередь — INFERENCE_MAX_QUEUE)
+PREDICTION_MAX_IN_FLIGHT = int(os.getenv('PREDICTION_MAX_IN_FLIGHT', '16'))
+
+# Точность инференса: fp32 (по умолчанию) или int8 (динамически квантованные модели, см. quantize_model.py)
+MODEL_PRECISION = os.getenv('MODEL_PRECISION', 'fp32').lower()
+# Бандл моделей, собранный python -m core.nn.train; пусто — артефакты из core/nn
+MODEL_BUNDLE_DIR = os.getenv('MODEL_BUNDLE_DIR')
+
+# Ограничение нагрузки на инференс в /api/blackout/by_address
+INFERENCE_MAX_CONCURRENCY = int(os.getenv('INFERENCE_MAX_CONCURRENCY', '2'))
+INFERENCE_MAX_QUEUE = int(os.getenv('INFERENCE_MAX_QUEUE', '32'))
+INFERENCE_DEADLINE_MS = float(os.getenv('INFERENCE_DEADLINE_MS', '2000'))
+
+# Сколько зданий обрабатывается одним набором запросов в /api/blackout/by_address/bulk
+BULK_MAX_BUILDINGS = int(os.getenv('BULK_MAX_BUILDINGS', '1000'))
+BULK_CHUNK_SIZE = int(os.getenv('BULK_CHUNK_SIZE', '200'))
+
+# Как часто (секунды) проверять версию справочников улиц, районов и городов в памяти
+DIMENSION_CHECK_INTERVAL_S = float(os.getenv('DIMENSION_CHECK_INTERVAL_S', '30'))
+
+# Окно (секунды), в пределах которого одновременные by_address с одним зданием и limit_neighbors объединяются; 0 — только одинаковая дата
+COALESCE_DATE_BUCKET_S = float(os.getenv('COALESCE_DATE_BUCKET_S', '60'))
+
+# Максимум записей журнала изменений за один запрос GET /api/blackout/changes
+CHANGES_MAX_LIMIT = int(os.getenv('CHANGES_MAX_LIMIT', '5000'))
+
+# Сколько адресов возвращает нечеткий поиск GET /api/address/
+ADDRESS_SEARCH_LIMIT = int(os.getenv('ADDRESS_SEARCH_LIMIT', '50'))
+
+# Чтение dataset.db и weather.db из копии в памяти с горячей заменой при изменении файла на диске
+IN_MEMORY_SNAPSHOT = os.getenv('IN_MEMORY_SNAPSHOT', 'false').lower() == 'true'
+SNAPSHOT_WATCH_INTERVAL_S = float(os.getenv('SNAPSHOT_WATCH_INTERVAL_S', '2'))
+# Сколько секунд старая копия живет после замены, чтобы начатые на ней запросы успели завершиться
+SNAPSHOT_RETIRE_AFTER_S = float(os.getenv('SNAPSHOT_RETIRE_AFTER_S', '60'))
+
+# Кэш результатов core.analytics
+ANALYTICS_CACHE_DIR = os.getenv('ANALYTICS_CACHE_DIR', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'logs', 'analytics_cache'))
+
+# Папка колоночного снапшота core.export.snapshot
+EXPORT_DIR = os.getenv('EXPORT_DIR', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '..', '..', '..', 'databases', 'exports'))
+
+# Карта шардов по городам shards.json из python -m core.shard.split; пусто — одна база DATABASE_PATH
+DATASET_SHARDS = os.getenv('DATASET_SHARDS')
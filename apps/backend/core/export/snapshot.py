@@ -0,0 +1,291 @@
+import argparse
+import calendar
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from core.config.settings import EXPORT_DIR
+from core.read_model.blackout_view import VIEW_TABLE, ensure_view
+
+# Колоночные снапшоты отключений для аналитики и обучения: одна строка на пару (отключение, здание)
+# с адресом, районами, координатами и погодой в день начала. Данные читаются из read-модели
+# blackout_building_view и раскладываются по месяцам начала (Hive-разметка start_month=YYYY-MM)
+# в Parquet (zstd) и/или Arrow IPC (без сжатия — читается через memory map без копирования).
+# Экспорт инкрементальный: в manifest.json хранится подпись каждого месяца, и переписываются
+# только месяцы, в которых изменились отключения, здания, справочники или погода.
+#
+# Запуск из папки backend:
+#   python -m core.export.snapshot --dataset ../../databases/dataset.db --weather ../../databases/weather.db
+# Чтение: pandas.read_parquet("<EXPORT_DIR>/parquet/blackouts")
+# или pyarrow.dataset.dataset("<EXPORT_DIR>/arrow/blackouts", format="arrow", partitioning="hive")
+
+DATASET_NAME = "blackouts"
+MANIFEST_FILE = "manifest.json"
+# Меняется при изменении состава или типов колонок — тогда все месяцы переписываются
+SCHEMA_VERSION = 2
+FORMATS = {"parquet": "part.parquet", "arrow": "part.arrow"}
+BATCH_ROWS = 50_000
+# В Parquet нет секундных меток времени (файл хранил бы миллисекунды), поэтому в обоих форматах ms
+TIMESTAMP_TYPE = pa.timestamp("ms")
+
+SCHEMA = pa.schema([
+    ("blackout_id", pa.string()),
+    ("building_id", pa.string()),
+    ("type", pa.string()),
+    ("description", pa.string()),
+    ("start_date", TIMESTAMP_TYPE),
+    ("end_date", TIMESTAMP_TYPE),
+    ("duration_hours", pa.float64()),
+    ("building_number", pa.string()),
+    ("lat", pa.float64()),
+    ("lon", pa.float64()),
+    ("street", pa.string()),
+    ("district", pa.string()),
+    ("folk_district", pa.string()),
+    ("big_folk_district", pa.string()),
+    ("city", pa.string()),
+    ("temp_max", pa.float64()),
+    ("temp_min", pa.float64()),
+    ("weather_type", pa.string()),
+])
+
+VIEW_COLUMNS = [
+    "blackout_id", "building_id", "type", "description", "start_ts", "end_ts", "building_number",
+    "lat", "lon", "street", "district", "folk_district", "big_folk_district", "city", "substr(start_date, 1, 10)",
+]
+
+# Подпись месяца: дешевые агрегаты по строкам read-модели, меняющиеся при любой правке отключения, здания или имени
+SIGNATURE_SQL = f"""
+SELECT substr(start_date, 1, 7) AS month, COUNT(*),
+    TOTAL(start_ts), TOTAL(end_ts), TOTAL(lat), TOTAL(lon),
+    TOTAL(length(blackout_id) + length(building_id) + length(type) + length(description) + length(building_number)
+        + length(street) + length(district) + length(folk_district) + length(big_folk_district) + length(city))
+FROM {VIEW_TABLE}
+WHERE start_ts IS NOT NULL
+GROUP BY month
+"""
+
+PARTITION_SQL = f"SELECT {', '.join(VIEW_COLUMNS)} FROM {VIEW_TABLE} WHERE start_ts >= ? AND start_ts < ? ORDER BY start_ts, blackout_id, building_id"
+
+
+def month_range(month: str) -> tuple[int, int]:
+    """Границы месяца YYYY-MM в epoch-секундах (как start_ts в read-модели)."""
+    year, number = map(int, month.split("-"))
+    next_year, next_number = (year + 1, 1) if number == 12 else (year, number + 1)
+    return calendar.timegm((year, number, 1, 0, 0, 0)), calendar.timegm((next_year, next_number, 1, 0, 0, 0))
+
+
+def partition_path(output_dir: str, fmt: str, month: str) -> str:
+    """<output>/<формат>/blackouts/start_month=YYYY-MM/part.<формат> — у каждого формата свое дерево для чтения датасетом."""
+    return os.path.join(output_dir, fmt, DATASET_NAME, f"start_month={month}", FORMATS[fmt])
+
+
+def load_weather(weather_path: str | None) -> dict[str, tuple]:
+    """Погода по дням {YYYY-MM-DD: (temp_max, temp_min, weather_type)} — таблица маленькая."""
+    if not weather_path:
+        return {}
+    conn = sqlite3.connect(weather_path)
+    rows = conn.execute("SELECT substr(date, 1, 10), temp_max, temp_min, weather_type FROM weather").fetchall()
+    conn.close()
+    return {day: (_to_float(temp_max), _to_float(temp_min), weather_type) for day, temp_max, temp_min, weather_type in rows}
+
+
+def _to_float(value) -> float | None:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def partition_signatures(conn: sqlite3.Connection, weather: dict[str, tuple]) -> dict[str, dict]:
+    """{месяц: {"signature", "rows"}} для всех месяцев датасета."""
+    signatures = {}
+    for month, rows, *aggregates in conn.execute(SIGNATURE_SQL):
+        month_weather = sorted((day, values) for day, values in weather.items() if day.startswith(month))
+        digest = hashlib.sha1(repr((SCHEMA_VERSION, rows, aggregates, month_weather)).encode()).hexdigest()
+        signatures[month] = {"signature": digest, "rows": rows}
+    return signatures
+
+
+def iter_partition_batches(conn: sqlite3.Connection, month: str, weather: dict[str, tuple], batch_rows: int = BATCH_ROWS):
+    """RecordBatch-и месяца порциями по batch_rows строк — весь месяц в памяти не держится."""
+    cursor = conn.execute(PARTITION_SQL, month_range(month))
+    while rows := cursor.fetchmany(batch_rows):
+        (blackout_id, building_id, type_, description, start_ts, end_ts, building_number,
+         lat, lon, street, district, folk_district, big_folk_district, city, start_day) = zip(*rows)
+        day_weather = [weather.get(day, (None, None, None)) for day in start_day]
+        duration = [(end - start) / 3600 if end is not None else None for start, end in zip(start_ts, end_ts)]
+        yield pa.RecordBatch.from_arrays([
+            pa.array(blackout_id, pa.string()),
+            pa.array(building_id, pa.string()),
+            pa.array(type_, pa.string()),
+            pa.array(description, pa.string()),
+            pa.array(start_ts, pa.int64()).cast(pa.timestamp("s")).cast(TIMESTAMP_TYPE),
+            pa.array(end_ts, pa.int64()).cast(pa.timestamp("s")).cast(TIMESTAMP_TYPE),
+            pa.array(duration, pa.float64()),
+            pa.array(building_number, pa.string()),
+            pa.array(lat, pa.float64()),
+            pa.array(lon, pa.float64()),
+            pa.array(street, pa.string()),
+            pa.array(district, pa.string()),
+            pa.array(folk_district, pa.string()),
+            pa.array(big_folk_district, pa.string()),
+            pa.array(city, pa.string()),
+            pa.array([values[0] for values in day_weather], pa.float64()),
+            pa.array([values[1] for values in day_weather], pa.float64()),
+            pa.array([values[2] for values in day_weather], pa.string()),
+        ], schema=SCHEMA)
+
+
+def write_partition(conn: sqlite3.Connection, output_dir: str, month: str, weather: dict[str, tuple], formats: list[str]) -> dict:
+    """Пишет месяц во временные файлы и атомарно подменяет старые; возвращает {формат: {"path", "bytes"}}."""
+    paths = {fmt: partition_path(output_dir, fmt, month) for fmt in formats}
+    # Имя с точкой: читатели датасета (pyarrow, pandas) пропускают такие файлы
+    tmp_paths = {fmt: os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.{os.getpid()}.tmp") for fmt, path in paths.items()}
+    for path in paths.values():
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    writers = {}
+    if "parquet" in formats:
+        writers["parquet"] = pq.ParquetWriter(tmp_paths["parquet"], SCHEMA, compression="zstd")
+    if "arrow" in formats:
+        writers["arrow"] = pa.ipc.new_file(tmp_paths["arrow"], SCHEMA)
+    try:
+        for batch in iter_partition_batches(conn, month, weather):
+            for writer in writers.values():
+                writer.write_batch(batch)
+    finally:
+        for writer in writers.values():
+            writer.close()
+
+    files = {}
+    for fmt, tmp_path in tmp_paths.items():
+        path = paths[fmt]
+        os.replace(tmp_path, path)
+        files[fmt] = {"path": os.path.relpath(path, output_dir), "bytes": os.path.getsize(path)}
+    return files
+
+
+def remove_file(output_dir: str, file: dict):
+    path = os.path.join(output_dir, file["path"])
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def read_manifest(output_dir: str) -> dict:
+    path = os.path.join(output_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {"schema_version": SCHEMA_VERSION, "partitions": {}}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_manifest(output_dir: str, manifest: dict):
+    path = os.path.join(output_dir, MANIFEST_FILE)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def export_snapshot(dataset_path: str, weather_path: str | None, output_dir: str = EXPORT_DIR, formats: list[str] = ("parquet",), full: bool = False) -> dict:
+    """
+    Обновляет снапшот в output_dir: переписывает новые и изменившиеся месяцы, удаляет исчезнувшие.
+    Возвращает {"written": [...], "skipped": [...], "removed": [...]}.
+    """
+    formats = list(formats)
+    ensure_view(dataset_path)
+    weather = load_weather(weather_path)
+
+    # SCHEMA_VERSION входит в подписи месяцев, так что после смены схемы переписываются все
+    manifest = {**read_manifest(output_dir), "schema_version": SCHEMA_VERSION}
+    partitions = manifest["partitions"]
+
+    conn = sqlite3.connect(dataset_path)
+    signatures = partition_signatures(conn, weather)
+    report = {"written": [], "skipped": [], "removed": []}
+    for month, signature in sorted(signatures.items()):
+        previous = partitions.get(month)
+        if not full and previous and previous["signature"] == signature["signature"] and set(formats) <= set(previous["files"]):
+            report["skipped"].append(month)
+            continue
+        files = write_partition(conn, output_dir, month, weather, formats)
+        # Файлы форматов, которые в этот раз не писались, устарели
+        for fmt, file in (previous or {}).get("files", {}).items():
+            if fmt not in files:
+                remove_file(output_dir, file)
+        partitions[month] = {**signature, "files": files, "exported_at": datetime.now().isoformat(timespec="seconds")}
+        # Манифест сохраняется после каждого месяца — прерванный экспорт продолжится с того же места
+        write_manifest(output_dir, {**manifest, "updated_at": datetime.now().isoformat(timespec="seconds")})
+        report["written"].append(month)
+    conn.close()
+
+    for month in sorted(set(partitions) - set(signatures)):
+        for file in partitions.pop(month)["files"].values():
+            remove_file(output_dir, file)
+        report["removed"].append(month)
+
+    manifest["updated_at"] = datetime.now().isoformat(timespec="seconds")
+    os.makedirs(output_dir, exist_ok=True)
+    write_manifest(output_dir, manifest)
+    return report
+
+
+def verify_snapshot(output_dir: str = EXPORT_DIR) -> dict[str, int]:
+    """
+    Проверка круга «снапшот -> потоковая выгрузка API -> чтение»: каждый формат выгружается целиком
+    так же, как GET /api/export/blackouts, читается обратно pyarrow и сверяется со схемой и числом строк манифеста.
+    """
+    from core.api.export.export_service import ExportService
+
+    export_service = ExportService(output_dir)
+    expected = sum(partition["rows"] for partition in read_manifest(output_dir)["partitions"].values())
+    rows = {}
+    for fmt in FORMATS:
+        paths = export_service.get_range_paths(format=fmt, from_month=None, to_month=None)
+        if not paths:
+            continue
+        data = b"".join(export_service.stream_range(format=fmt, paths=paths))
+        table = pq.read_table(pa.BufferReader(data)) if fmt == "parquet" else pa.ipc.open_stream(data).read_all()
+        if not table.schema.equals(SCHEMA):
+            raise ValueError(f"{fmt}: схема выгрузки не совпадает со SCHEMA:\n{table.schema}")
+        if table.num_rows != expected:
+            raise ValueError(f"{fmt}: в выгрузке {table.num_rows} строк, в manifest.json {expected}")
+        rows[fmt] = table.num_rows
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Колоночный снапшот отключений (Parquet / Arrow IPC) по месяцам начала")
+    parser.add_argument("--dataset", required=True, help="Путь к dataset.db")
+    parser.add_argument("--weather", help="Путь к weather.db (без него погодные колонки пустые)")
+    parser.add_argument("--output", default=EXPORT_DIR, help="Папка снапшота")
+    parser.add_argument("--format", default="parquet,arrow", help="Форматы через запятую: parquet, arrow")
+    parser.add_argument("--full", action="store_true", help="Переписать все месяцы, не глядя на manifest.json")
+    parser.add_argument("--verify", action="store_true", help="После экспорта прочитать обратно потоковую выгрузку каждого формата")
+    args = parser.parse_args()
+
+    formats = args.format.split(",")
+    unknown = [fmt for fmt in formats if fmt not in FORMATS]
+    if unknown:
+        parser.error(f"Неизвестные форматы: {', '.join(unknown)}")
+
+    started = time.perf_counter()
+    report = export_snapshot(args.dataset, args.weather, args.output, formats=formats, full=args.full)
+    print(
+        f"Месяцев записано: {len(report['written'])}, без изменений: {len(report['skipped'])}, "
+        f"удалено: {len(report['removed'])} за {time.perf_counter() - started:.1f} с -> {os.path.abspath(args.output)}"
+    )
+    if args.verify:
+        for fmt, rows in verify_snapshot(args.output).items():
+            print(f"Проверка {fmt}: выгрузка читается, строк {rows}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, ForeignKey, Text
+from sqlalchemy import Column, Float, ForeignKey, Integer, Text
 from .geo import BuildingOrm
 from core.utils.db_util import base as Base
 
@@ -18,4 +18,47 @@ class BlackoutBuildingOrm(Base):
     __tablename__ = "blackouts_buildings"
 
     blackout_id = Column(Text, ForeignKey(BlackoutOrm.id), primary_key=True)
-    building_id = Column(Text, ForeignKey(BuildingOrm.id), primary_key=True)
\ No newline at end of file
+    building_id = Column(Text, ForeignKey(BuildingOrm.id), primary_key=True)
+
+class BlackoutBuildingViewOrm(Base):
+    """Read-модель: плоская строка (отключение, здание), собирается core/read_model/blackout_view.py."""
+    __tablename__ = "blackout_building_view"
+
+    blackout_id = Column(Text, primary_key=True)
+    building_id = Column(Text, primary_key=True)
+    start_date = Column(Text)
+    end_date = Column(Text)
+    start_ts = Column(Integer)
+    end_ts = Column(Integer)
+    description = Column(Text)
+    type = Column(Text)
+    building_number = Column(Text)
+    lat = Column(Float)
+    lon = Column(Float)
+    street = Column(Text)
+    district = Column(Text)
+    folk_district = Column(Text)
+    big_folk_district = Column(Text)
+    city = Column(Text)
+    street_id = Column(Text)
+    district_id = Column(Text)
+    folk_district_id = Column(Text)
+    big_folk_district_id = Column(Text)
+    city_id = Column(Text)
+
+class BlackoutChangeOrm(Base):
+    """Журнал изменений blackouts и blackouts_buildings, ведется триггерами core/read_model/change_log.py."""
+    __tablename__ = "blackout_changes"
+
+    seq = Column(Integer, primary_key=True)
+    blackout_id = Column(Text)
+    building_id = Column(Text)
+    op = Column(Text)
+    changed_at = Column(Text)
+
+class BlackoutChangesStateOrm(Base):
+    """Граница удаленной части журнала изменений: записи с seq <= pruned_through удалены."""
+    __tablename__ = "blackout_changes_state"
+
+    id = Column(Integer, primary_key=True)
+    pruned_through = Column(Integer)
@@ -0,0 +1,39 @@
+import torch.nn as nn
+
+# Архитектура моделей длительности — общая для обучения (train.py) и инференса (prediction_service.py).
+
+
+class ResidualBlock(nn.Module):
+    def __init__(self, layers):
+        super(ResidualBlock, self).__init__()
+        self.layers = layers
+
+    def forward(self, x):
+        return x + self.layers(x)
+
+class ImprovedDurationPredictor(nn.Module):
+    def __init__(self, input_dim, hidden_dims=[256, 256, 128, 128, 64, 32], dropout_rate=0.4):
+        super(ImprovedDurationPredictor, self).__init__()
+        layers = []
+        prev_dim = input_dim
+        for i, hidden_dim in enumerate(hidden_dims):
+            block_layers = [
+                nn.Linear(prev_dim, hidden_dim),
+                nn.BatchNorm1d(hidden_dim),
+                nn.LeakyReLU(0.1),
+                nn.Dropout(dropout_rate),
+            ]
+            if i > 0 and prev_dim == hidden_dim:
+                layers.append(ResidualBlock(nn.Sequential(*block_layers)))
+            else:
+                layers.extend(block_layers)
+            prev_dim = hidden_dim
+        self.feature_extractor = nn.Sequential(*layers)
+        self.output_layer = nn.Sequential(
+            nn.Linear(prev_dim, 1),
+            nn.Softplus()
+        )
+
+    def forward(self, x):
+        features = self.feature_extractor(x)
+        return self.output_layer(features)
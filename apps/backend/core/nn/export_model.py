@@ -0,0 +1,152 @@
+import argparse
+import copy
+import os
+import time
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+from core.nn.architecture import ImprovedDurationPredictor, ResidualBlock
+from core.nn.prediction_service import DEVICE, FEATURE_COLS, TYPE_CONFIGS
+
+# Экспорт моделей длительности в TorchScript для CPU-инференса.
+# BatchNorm1d вклеивается в предшествующий Linear, Dropout выбрасывается,
+# результат трассируется, замораживается и сохраняется рядом с .pth
+# (improved_duration_predictor_<type>.pt). prediction_service подхватывает его, если файл есть.
+#
+# Запуск из папки backend:
+#   python -m core.nn.export_model --benchmark
+
+PARITY_ATOL = 1e-4
+
+
+def fuse_linear_bn(linear: nn.Linear, bn: nn.BatchNorm1d) -> nn.Linear:
+    """Возвращает Linear, эквивалентный Linear -> BatchNorm1d в режиме eval."""
+    scale = bn.weight / torch.sqrt(bn.running_var + bn.eps)
+    fused = nn.Linear(linear.in_features, linear.out_features)
+    with torch.no_grad():
+        fused.weight.copy_(linear.weight * scale[:, None])
+        bias = linear.bias if linear.bias is not None else torch.zeros_like(bn.running_mean)
+        fused.bias.copy_((bias - bn.running_mean) * scale + bn.bias)
+    return fused
+
+
+def fold_sequential(layers: nn.Sequential) -> nn.Sequential:
+    """Сворачивает Linear+BatchNorm, убирает Dropout; ResidualBlock обрабатывается рекурсивно."""
+    folded = []
+    modules = list(layers)
+    i = 0
+    while i < len(modules):
+        module = modules[i]
+        if isinstance(module, nn.Linear) and i + 1 < len(modules) and isinstance(modules[i + 1], nn.BatchNorm1d):
+            folded.append(fuse_linear_bn(module, modules[i + 1]))
+            i += 2
+            continue
+        if isinstance(module, ResidualBlock):
+            folded.append(ResidualBlock(fold_sequential(module.layers)))
+        elif not isinstance(module, nn.Dropout):
+            folded.append(copy.deepcopy(module))
+        i += 1
+    return nn.Sequential(*folded)
+
+
+class FoldedDurationPredictor(nn.Module):
+    """ImprovedDurationPredictor без BatchNorm и Dropout — только Linear, LeakyReLU и Softplus."""
+
+    def __init__(self, model: ImprovedDurationPredictor):
+        super(FoldedDurationPredictor, self).__init__()
+        self.feature_extractor = fold_sequential(model.feature_extractor)
+        self.output_layer = fold_sequential(model.output_layer)
+
+    def forward(self, x):
+        return self.output_layer(self.feature_extractor(x))
+
+
+def load_eager_model(model_path: str) -> ImprovedDurationPredictor:
+    model = ImprovedDurationPredictor(input_dim=len(FEATURE_COLS))
+    checkpoint = torch.load(model_path, map_location="cpu")
+    model.load_state_dict(checkpoint["model_state_dict"])
+    model.eval()
+    return model
+
+
+def export_scripted(model: ImprovedDurationPredictor, output_path: str) -> torch.jit.ScriptModule:
+    folded = FoldedDurationPredictor(model).eval()
+    example = torch.zeros(1, len(FEATURE_COLS))
+    with torch.no_grad():
+        scripted = torch.jit.freeze(torch.jit.trace(folded, example))
+    scripted.save(output_path)
+    return scripted
+
+
+def check_parity(eager, scripted, samples: int = 1024, seed: int = 0) -> float:
+    """Максимальное абсолютное расхождение (в часах) на случайных стандартизованных входах."""
+    generator = torch.Generator().manual_seed(seed)
+    x = torch.randn(samples, len(FEATURE_COLS), generator=generator)
+    with torch.no_grad():
+        diff = (eager(x) - scripted(x)).abs().max().item()
+    return diff
+
+
+def benchmark(model, iterations: int = 2000, warmup: int = 100) -> dict:
+    """Латентность одного вызова с батчем из одной строки — как в predict_duration."""
+    x = torch.randn(1, len(FEATURE_COLS))
+    timings = []
+    with torch.no_grad():
+        for _ in range(warmup):
+            model(x)
+        for _ in range(iterations):
+            started = time.perf_counter()
+            model(x)
+            timings.append(time.perf_counter() - started)
+    timings_us = np.array(timings) * 1e6
+    return {
+        "mean_us": float(timings_us.mean()),
+        "p50_us": float(np.percentile(timings_us, 50)),
+        "p99_us": float(np.percentile(timings_us, 99)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Экспорт моделей длительности в TorchScript со свертыванием BatchNorm")
+    parser.add_argument("--types", help="Типы через запятую (по умолчанию все из TYPE_CONFIGS)")
+    parser.add_argument("--benchmark", action="store_true", help="Сравнить латентность eager и TorchScript")
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    torch.set_num_threads(1)
+    type_names = args.types.split(",") if args.types else list(TYPE_CONFIGS)
+
+    for type_name in type_names:
+        config = TYPE_CONFIGS[type_name]
+        if not os.path.exists(config["model_path"]):
+            print(f"Пропуск {type_name}: нет файла {config['model_path']}")
+            continue
+
+        eager = load_eager_model(config["model_path"])
+        scripted = export_scripted(eager, config["scripted_model_path"])
+
+        diff = check_parity(eager, scripted)
+        if diff > PARITY_ATOL:
+            os.remove(config["scripted_model_path"])
+            raise SystemExit(
+                f"Расхождение для {type_name} {diff:.2e} больше допустимого {PARITY_ATOL:.0e}, экспорт отменен"
+            )
+        print(f"{type_name}: сохранено {config['scripted_model_path']} (max |diff| = {diff:.2e})")
+
+        if args.benchmark:
+            eager_stats = benchmark(eager, iterations=args.iterations)
+            scripted_stats = benchmark(scripted, iterations=args.iterations)
+            print(
+                f"  eager:       mean {eager_stats['mean_us']:.1f} мкс, p50 {eager_stats['p50_us']:.1f}, p99 {eager_stats['p99_us']:.1f}\n"
+                f"  torchscript: mean {scripted_stats['mean_us']:.1f} мкс, p50 {scripted_stats['p50_us']:.1f}, p99 {scripted_stats['p99_us']:.1f}\n"
+                f"  ускорение:   x{eager_stats['mean_us'] / scripted_stats['mean_us']:.2f}"
+            )
+
+    if DEVICE != "cpu":
+        print(f"Внимание: сервис работает на {DEVICE}, экспорт оптимизирован под CPU")
+
+
+if __name__ == "__main__":
+    main()
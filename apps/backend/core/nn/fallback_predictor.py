@@ -0,0 +1,174 @@
+import argparse
+import os
+import sqlite3
+from datetime import datetime
+
+import numpy as np
+
+from core.utils.common_util import logger
+
+# Быстрый статистический предсказатель длительности — запасной уровень для нейросетей.
+# Таблица квантилей длительности (часы) по (тип, район, час начала, месяц) строится офлайн
+# из исторических blackouts (одно наблюдение на отключение) и хранится в небольшом .npz. Ответ — одна индексация массива.
+# Разреженные ячейки заполняются на этапе сборки значениями более грубых уровней:
+# (тип) -> (тип, месяц) -> (тип, район, месяц) -> (тип, район, час, месяц);
+# для неизвестного района — (тип, час, месяц).
+#
+# Сборка из папки backend:
+#   python -m core.nn.fallback_predictor --dataset ../../databases/dataset.db
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+FALLBACK_TABLE_PATH = os.path.join(BASE_DIR, "duration_fallback.npz")
+
+TYPES = ["electricity", "cold_water", "hot_water", "heat"]
+QUANTILES = (0.5, 0.75, 0.9)
+# Индекс 0 по оси районов — «район неизвестен», заполняется уровнями без района
+UNKNOWN_DISTRICT = 0
+
+# Уровни от грубого к точному: (ключи группировки, заполнять ли ячейки конкретных районов, заполнять ли «неизвестный» район)
+LEVELS = [
+    (("type",), True, True),
+    (("type", "month"), True, True),
+    (("type", "hour", "month"), False, True),
+    (("type", "district", "month"), True, False),
+    (("type", "district", "hour", "month"), True, False),
+]
+AXES = ("type", "district", "hour", "month")
+
+
+class FallbackPredictor:
+
+    def __init__(self, table: np.ndarray, districts: list[str], quantiles: tuple = QUANTILES):
+        self.table = table
+        self.district_index = {name: i + 1 for i, name in enumerate(districts)}
+        self.type_index = {name: i for i, name in enumerate(TYPES)}
+        self.quantile_index = {q: i for i, q in enumerate(quantiles)}
+
+    @classmethod
+    def load(cls, path: str = FALLBACK_TABLE_PATH):
+        data = np.load(path, allow_pickle=False)
+        return cls(data["table"], data["districts"].tolist(), tuple(data["quantiles"].tolist()))
+
+    def predict(self, blackout_type: str, district: str | None, start_date: datetime, quantile: float = 0.5) -> float | None:
+        """Квантиль длительности (часы) или None, если тип неизвестен."""
+        type_idx = self.type_index.get(blackout_type)
+        if type_idx is None:
+            return None
+        district_idx = self.district_index.get(district, UNKNOWN_DISTRICT)
+        value = self.table[type_idx, district_idx, start_date.hour, start_date.month - 1, self.quantile_index[quantile]]
+        return None if np.isnan(value) else float(value)
+
+    def predict_row(self, row: dict) -> float | None:
+        """Медиана для входного словаря predict_duration (start_date — datetime или строка ISO)."""
+        start_date = row["start_date"]
+        if isinstance(start_date, str):
+            start_date = datetime.fromisoformat(start_date)
+        return self.predict(row.get("type"), row.get("district"), start_date)
+
+
+def load_fallback_predictor(path: str = FALLBACK_TABLE_PATH) -> FallbackPredictor | None:
+    if not os.path.exists(path):
+        logger.warning(
+            f"Таблица запасного предсказателя {path} не найдена — hot_water и перегруженные запросы останутся без прогноза. "
+            f"Соберите ее из папки backend: python -m core.nn.fallback_predictor --dataset ../../databases/dataset.db"
+        )
+        return None
+    return FallbackPredictor.load(path)
+
+
+def build_table(dataset_path: str, min_count: int = 5, max_duration_hours: float = 1000):
+    """Считает таблицу квантилей по всем отключениям датасета (район — как во входе моделей: народный, если есть)."""
+    # pandas нужен только для офлайн-сборки, в рантайме достаточно numpy
+    import pandas as pd
+
+    conn = sqlite3.connect(dataset_path)
+    df = pd.read_sql_query(
+        """
+        SELECT b.id AS blackout_id, b.type, b.start_date, b.end_date,
+            COALESCE(fd.name, bfd.name, d.name) AS district, COUNT(*) AS buildings
+        FROM blackouts b
+        JOIN blackouts_buildings bb ON bb.blackout_id = b.id
+        JOIN buildings bu ON bu.id = bb.building_id
+        LEFT JOIN folk_districts fd ON fd.id = bu.folk_district_id
+        LEFT JOIN big_folk_districts bfd ON bfd.id = bu.big_folk_district_id
+        LEFT JOIN districts d ON d.id = bu.district_id
+        GROUP BY b.id, district
+        """,
+        conn,
+    )
+    conn.close()
+
+    # Одно наблюдение на отключение (район — тот, где больше всего его зданий):
+    # иначе отключение на сотни зданий перевешивало бы квантили, а min_count считал бы здания, а не отключения
+    df = df.sort_values(["buildings", "district"], ascending=[False, True], kind="stable").drop_duplicates("blackout_id")
+
+    df["start_date"] = pd.to_datetime(df["start_date"], errors="coerce")
+    df["end_date"] = pd.to_datetime(df["end_date"], errors="coerce")
+    df["duration"] = (df["end_date"] - df["start_date"]).dt.total_seconds() / 3600
+    df = df[(df["duration"] >= 0) & (df["duration"] < max_duration_hours) & df["type"].isin(TYPES)]
+
+    districts = sorted(df["district"].dropna().unique().tolist())
+    district_codes = {name: i + 1 for i, name in enumerate(districts)}
+    codes = pd.DataFrame({
+        "type": df["type"].map({name: i for i, name in enumerate(TYPES)}).to_numpy(),
+        "district": df["district"].map(district_codes).fillna(UNKNOWN_DISTRICT).astype(int).to_numpy(),
+        "hour": df["start_date"].dt.hour.to_numpy(),
+        "month": df["start_date"].dt.month.to_numpy() - 1,
+        "duration": df["duration"].to_numpy(),
+    })
+
+    shape = (len(TYPES), len(districts) + 1, 24, 12, len(QUANTILES))
+    table = np.full(shape, np.nan, dtype=np.float32)
+    if codes.empty:
+        return table, districts
+
+    table[...] = np.quantile(codes["duration"], QUANTILES)
+
+    for keys, fill_known, fill_unknown in LEVELS:
+        grouped = codes.groupby(list(keys))["duration"]
+        counts = grouped.size()
+        quantiles = grouped.quantile(list(QUANTILES)).unstack()
+        # Самый грубый уровень берем при любом числе наблюдений, остальные — только при достаточной статистике
+        if keys != LEVELS[0][0]:
+            quantiles = quantiles[counts >= min_count]
+
+        for group_key, values in quantiles.iterrows():
+            group_key = group_key if isinstance(group_key, tuple) else (group_key,)
+            index = [slice(None)] * len(AXES)
+            for axis, value in zip(keys, group_key):
+                index[AXES.index(axis)] = value
+            values = values.to_numpy(dtype=np.float32)
+            if "district" in keys:
+                table[tuple(index)] = values
+                continue
+            if fill_known:
+                known = list(index)
+                known[AXES.index("district")] = slice(1, None)
+                table[tuple(known)] = values
+            if fill_unknown:
+                unknown = list(index)
+                unknown[AXES.index("district")] = UNKNOWN_DISTRICT
+                table[tuple(unknown)] = values
+
+    return table, districts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сборка таблицы запасного предсказателя длительности")
+    parser.add_argument("--dataset", required=True, help="Путь к dataset.db")
+    parser.add_argument("--output", default=FALLBACK_TABLE_PATH)
+    parser.add_argument("--min-count", type=int, default=5, help="Минимум наблюдений в ячейке, иначе берется более грубый уровень")
+    args = parser.parse_args()
+
+    table, districts = build_table(args.dataset, min_count=args.min_count)
+    np.savez_compressed(args.output, table=table, districts=np.array(districts, dtype=str), quantiles=np.array(QUANTILES))
+    print(f"Таблица {table.shape} сохранена: {args.output} ({os.path.getsize(args.output) / 1024:.0f} КБ)")
+
+    predictor = FallbackPredictor(table, districts)
+    for type_name in TYPES:
+        median = predictor.predict(type_name, None, datetime(2019, 1, 15, 10))
+        print(f"  {type_name}: медиана (январь, 10:00, район неизвестен) = {median}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+import os
+import re
+
+import joblib
+import numpy as np
+import pandas as pd
+from gensim.models import Word2Vec
+
+# Кодирование входа моделей длительности — общее для обучения (train.py) и инференса (prediction_service.py),
+# чтобы признаки при обучении и в сервисе строились одним и тем же кодом.
+
+type_mapping = {
+    "electricity": 1,
+    "cold_water": 2,
+    "hot_water": 3,
+    "heat": 4,
+}
+
+weather_type_mapping = {
+    "малооблачно без осадков": 1, "малооблачно гроза": 2, "малооблачно осадки": 3,
+    "малооблачно сильный снег": 4, "малооблачно сильный туман": 5, "малооблачно слабый дождь": 6,
+    "малооблачно слабый снег": 7, "малооблачно слабый туман": 8, "малооблачно снег": 9,
+    "малооблачно туман": 10, "облачно без осадков": 11, "облачно гроза": 12,
+    "облачно дождь": 13, "облачно сильный дождь": 14, "облачно сильный туман": 15,
+    "облачно слабые осадки": 16, "облачно слабый дождь": 17, "облачно слабый снег": 18,
+    "облачно слабый туман": 19, "облачно снег": 20, "пасмурно без осадков": 21,
+    "пасмурно гроза": 22, "пасмурно дождь": 23, "пасмурно сильный дождь": 24,
+    "пасмурно сильный снег": 25, "пасмурно сильный туман": 26, "пасмурно слабые осадки": 27,
+    "пасмурно слабый дождь": 28, "пасмурно слабый снег": 29, "пасмурно слабый туман": 30,
+    "пасмурно снег": 31, "ясно без осадков": 32
+}
+
+city_mapping = {"Владивосток": 1, "Артем": 2}
+
+russian_alphabet = "абвгдеёжзийклмнопрстуфхцчшщъыьэюя"
+letter_mapping = {letter: i + 1 for i, letter in enumerate(russian_alphabet)}
+
+W2V_VECTOR_SIZE = 100
+
+# Порядок признаков, как в feature_cols.joblib исходных моделей
+FEATURE_COLS = [
+    "type", "city", "street", "house_number", "district",
+    "start_month", "start_dayofweek", "start_hour",
+    *[f"desc_vec_{i}" for i in range(W2V_VECTOR_SIZE)],
+    "house_number_letter", "temp_max", "temp_min", "weather_description",
+]
+
+# Имена файлов артефактов кодировщика в папке модели
+STREET_MAPPING_FILE = "street_mapping.joblib"
+DISTRICT_MAPPING_FILE = "district_mapping.joblib"
+WORD2VEC_FILE = "word2vec.model"
+FEATURE_COLS_FILE = "feature_cols.joblib"
+
+
+def tokenize(description) -> list[str]:
+    return re.findall(r'\b\w+\b', (description or "").lower())
+
+
+def description_to_vector(description, model):
+    """Средний Word2Vec-вектор токенов описания (нулевой, если ни одного токена нет в словаре)."""
+    description_tokens = tokenize(description)
+    vectors = [model.wv[word] for word in description_tokens if word in model.wv]
+    if not vectors:
+        return np.zeros(model.vector_size)
+    return np.mean(vectors, axis=0)
+
+
+class FeatureEncoder:
+    """Маппинги улиц и районов, Word2Vec описаний и порядок признаков одной версии моделей."""
+
+    def __init__(self, street_mapping: dict, district_mapping: dict, w2v_model: Word2Vec, feature_cols: list[str] = FEATURE_COLS):
+        self.street_mapping = street_mapping
+        self.district_mapping = district_mapping
+        self.w2v_model = w2v_model
+        self.feature_cols = list(feature_cols)
+
+    @classmethod
+    def load(cls, directory: str):
+        return cls(
+            street_mapping=joblib.load(os.path.join(directory, STREET_MAPPING_FILE)),
+            district_mapping=joblib.load(os.path.join(directory, DISTRICT_MAPPING_FILE)),
+            w2v_model=Word2Vec.load(os.path.join(directory, WORD2VEC_FILE)),
+            feature_cols=joblib.load(os.path.join(directory, FEATURE_COLS_FILE)),
+        )
+
+    def save(self, directory: str) -> list[str]:
+        paths = [os.path.join(directory, name) for name in (STREET_MAPPING_FILE, DISTRICT_MAPPING_FILE, WORD2VEC_FILE, FEATURE_COLS_FILE)]
+        joblib.dump(self.street_mapping, paths[0])
+        joblib.dump(self.district_mapping, paths[1])
+        self.w2v_model.save(paths[2])
+        joblib.dump(self.feature_cols, paths[3])
+        return paths
+
+    def description_vectors(self, descriptions: pd.Series) -> np.ndarray:
+        """Векторы описаний; одинаковые описания (их в данных большинство) векторизуются один раз."""
+        codes, uniques = pd.factorize(descriptions.fillna(""))
+        if not len(uniques):
+            return np.zeros((len(descriptions), self.w2v_model.vector_size))
+        unique_vectors = np.vstack([description_to_vector(description, self.w2v_model) for description in uniques])
+        return unique_vectors[codes]
+
+    def transform(self, rows: list[dict] | pd.DataFrame) -> pd.DataFrame:
+        """
+        Строит матрицу признаков (до масштабирования) в порядке feature_cols.
+        Отсутствующие признаки (например, погода) заполняются -1, как при обучении.
+        """
+        df = pd.DataFrame(rows).reset_index(drop=True)
+        df["start_date"] = pd.to_datetime(df["start_date"])
+        df['start_month'] = df['start_date'].dt.month
+        df['start_dayofweek'] = df['start_date'].dt.dayofweek
+        df['start_hour'] = df['start_date'].dt.hour
+
+        description_vectors = self.description_vectors(df.get("description", pd.Series([None] * len(df))))
+        desc_vec_df = pd.DataFrame(description_vectors, columns=[f"desc_vec_{i}" for i in range(self.w2v_model.vector_size)])
+
+        df = pd.concat([df.drop(columns=["description"], errors="ignore"), desc_vec_df], axis=1)
+
+        house_number = df.get("house_number", pd.Series([None] * len(df))).astype("string")
+        df["house_number_letter"] = house_number.str.extract(r"(\D+)", expand=False).str.lower().fillna("").map(lambda x: letter_mapping.get(x, -1))
+        df["house_number"] = house_number.str.extract(r"(\d+)", expand=False).astype(float)
+
+        for column, mapping in (
+            ("type", type_mapping),
+            ("weather_description", weather_type_mapping),
+            ("city", city_mapping),
+            ("street", self.street_mapping),
+            ("district", self.district_mapping),
+        ):
+            if column in df:
+                df[column] = df[column].map(mapping)
+
+        X = df.reindex(columns=self.feature_cols).astype(float)
+        return X.fillna(-1)
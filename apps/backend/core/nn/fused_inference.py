@@ -0,0 +1,188 @@
+import os
+import time
+
+import numpy as np
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+
+from core.nn.architecture import ResidualBlock
+from core.nn.export_model import FoldedDurationPredictor, load_eager_model
+from core.nn.fallback_predictor import load_fallback_predictor
+from core.nn.prediction_service import (
+    DEVICE,
+    MODEL_PRECISION,
+    TYPE_CONFIGS,
+    build_feature_matrix,
+    inference_artifacts,
+)
+
+# Совмещенный инференс для всех типов отключений.
+# Веса трех моделей (со свернутым BatchNorm) складываются в тензоры [типы, in, out],
+# и один прямой проход через baddbmm считает смешанный батч: строки маршрутизируются по индексу типа.
+# Скейлеры типов применяются одним векторизованным шагом.
+
+
+class FusedDurationPredictor(nn.Module):
+    """Стек одинаковых по архитектуре моделей длительности, считаемых за один проход."""
+
+    def __init__(self, models: list[nn.Module], scalers: list, negative_slope: float = 0.1):
+        super(FusedDurationPredictor, self).__init__()
+        self.negative_slope = negative_slope
+
+        layer_stacks = [self._linear_layers(FoldedDurationPredictor(model).eval()) for model in models]
+        if len({tuple((lin.weight.shape, residual) for lin, residual in stack) for stack in layer_stacks}) != 1:
+            raise ValueError("Совмещать можно только модели с одинаковой архитектурой")
+
+        self.weights = nn.ParameterList()
+        self.biases = nn.ParameterList()
+        self.residual = []
+        for layers in zip(*layer_stacks):
+            # [типы, in, out] — сразу в виде для bmm(x, W^T)
+            self.weights.append(nn.Parameter(torch.stack([lin.weight.detach().T for lin, _ in layers]), requires_grad=False))
+            self.biases.append(nn.Parameter(torch.stack([lin.bias.detach() for lin, _ in layers])[:, None, :], requires_grad=False))
+            self.residual.append(layers[0][1])
+
+        self.register_buffer("scaler_mean", torch.tensor(np.stack([s.mean_ for s in scalers]), dtype=torch.float32)[:, None, :])
+        self.register_buffer("scaler_scale", torch.tensor(np.stack([s.scale_ for s in scalers]), dtype=torch.float32)[:, None, :])
+
+    @staticmethod
+    def _linear_layers(folded: FoldedDurationPredictor):
+        """Линейные слои свернутой модели по порядку с признаком residual-соединения."""
+        layers = []
+        for module in list(folded.feature_extractor) + list(folded.output_layer):
+            if isinstance(module, nn.Linear):
+                layers.append((module, False))
+            elif isinstance(module, ResidualBlock):
+                layers.append((module.layers[0], True))
+        return layers
+
+    def forward(self, x: torch.Tensor, type_index: torch.Tensor) -> torch.Tensor:
+        """
+        x — немасштабированные признаки [N, F], type_index — индекс модели для каждой строки [N].
+        Считаются только типы, присутствующие в батче.
+        """
+        present, row_type = torch.unique(type_index, return_inverse=True)
+        # [типы, N, F]: масштабирование всеми нужными скейлерами одним шагом
+        h = (x.unsqueeze(0) - self.scaler_mean[present]) / self.scaler_scale[present]
+
+        last = len(self.weights) - 1
+        for i, (weight, bias) in enumerate(zip(self.weights, self.biases)):
+            out = torch.baddbmm(bias[present], h, weight[present])
+            if i == last:
+                h = F.softplus(out)
+                break
+            out = F.leaky_relu(out, self.negative_slope)
+            h = h + out if self.residual[i] else out
+
+        # Каждая строка берет результат своей модели
+        return h[row_type, torch.arange(x.shape[0], device=x.device), 0]
+
+
+def build_fused_predictor():
+    """Собирает совмещенную модель из .pth всех типов, для которых есть артефакты."""
+    if not inference_artifacts:
+        return None, []
+    type_names = [name for name in TYPE_CONFIGS if name in inference_artifacts and os.path.exists(TYPE_CONFIGS[name]["model_path"])]
+    if not type_names:
+        return None, []
+    models = [load_eager_model(TYPE_CONFIGS[name]["model_path"]) for name in type_names]
+    scalers = [inference_artifacts[name]["scaler"] for name in type_names]
+    return FusedDurationPredictor(models, scalers).to(DEVICE).eval(), type_names
+
+
+# Совмещенная модель используется для fp32; при MODEL_PRECISION=int8 батчи идут через модели типов
+if MODEL_PRECISION == "fp32":
+    fused_model, FUSED_TYPES = build_fused_predictor()
+else:
+    fused_model, FUSED_TYPES = None, []
+FUSED_TYPE_INDEX = {name: i for i, name in enumerate(FUSED_TYPES)}
+
+# Запасной уровень для типов без модели (hot_water) и на случай, если артефакты не загрузились
+fallback_predictor = load_fallback_predictor()
+
+
+def predict_durations(input_rows: list[dict]) -> list[float | None]:
+    """
+    Предсказывает длительность (часы) для батча отключений разных типов за один вызов.
+    Строки без модели получают оценку запасного предсказателя; None — если нет и его.
+    """
+    results = predict_with_models(input_rows)
+    if fallback_predictor is not None:
+        for i, row in enumerate(input_rows):
+            if results[i] is None:
+                results[i] = predict_fallback(row)
+    return results
+
+
+def predict_fallback(row: dict) -> float | None:
+    """Оценка длительности по таблице квантилей (константное время, без torch)."""
+    if fallback_predictor is None:
+        return None
+    return fallback_predictor.predict_row(row)
+
+
+def predict_with_models(input_rows: list[dict]) -> list[float | None]:
+    """Предсказания нейросетей; для неподдерживаемых типов — None, как и в predict_duration."""
+    results: list[float | None] = [None] * len(input_rows)
+    if inference_artifacts is None or not input_rows:
+        return results
+
+    supported = [i for i, row in enumerate(input_rows) if row.get("type") in inference_artifacts]
+    if not supported:
+        return results
+
+    X = build_feature_matrix([input_rows[i] for i in supported])
+
+    if fused_model is not None and all(input_rows[i]["type"] in FUSED_TYPE_INDEX for i in supported):
+        type_index = torch.tensor([FUSED_TYPE_INDEX[input_rows[i]["type"]] for i in supported], device=DEVICE)
+        with torch.no_grad():
+            predictions = fused_model(torch.FloatTensor(X.to_numpy()).to(DEVICE), type_index).cpu().tolist()
+        for i, prediction in zip(supported, predictions):
+            results[i] = prediction
+        return results
+
+    # Запасной путь: по одному батчу на каждый тип
+    types = np.array([input_rows[i]["type"] for i in supported])
+    for type_name in np.unique(types):
+        positions = np.flatnonzero(types == type_name)
+        artifacts = inference_artifacts[type_name]
+        X_scaled = artifacts["scaler"].transform(X.iloc[positions])
+        with torch.no_grad():
+            predictions = artifacts["model"](torch.FloatTensor(X_scaled).to(DEVICE)).cpu().view(-1).tolist()
+        for position, prediction in zip(positions, predictions):
+            results[supported[position]] = prediction
+    return results
+
+
+if __name__ == "__main__":
+    from core.nn.prediction_service import predict_duration
+
+    rng = np.random.default_rng(0)
+    sample_rows = [
+        {
+            "start_date": f"2019-0{rng.integers(1, 10)}-1{rng.integers(0, 10)} {rng.integers(10, 24)}:00:00",
+            "description": "аварийные работы на линии",
+            "type": type_name,
+            "city": "Владивосток",
+            "street": "Алеутская ул.",
+            "house_number": str(rng.integers(1, 100)),
+            "district": "Фрунзенский район",
+            "temp_max": 12.0,
+            "temp_min": 8.0,
+            "weather_description": "пасмурно слабый дождь",
+        }
+        for type_name in rng.choice(["electricity", "cold_water", "heat"], size=30)
+    ]
+
+    started = time.perf_counter()
+    sequential = [predict_duration(row) for row in sample_rows]
+    sequential_ms = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    fused = predict_with_models(sample_rows)
+    fused_ms = (time.perf_counter() - started) * 1000
+
+    max_diff = max(abs(a - b) for a, b in zip(sequential, fused))
+    print(f"Смешанный батч из {len(sample_rows)} строк: по одной {sequential_ms:.1f} мс, совмещенно {fused_ms:.1f} мс")
+    print(f"Максимальное расхождение: {max_diff:.2e} ч")
@@ -1,12 +1,12 @@
-import re
 import joblib
-import numpy as np
 import pandas as pd
 import torch
-import torch.nn as nn
-from gensim.models import Word2Vec
 import os # Добавлен import os для работы с путями
 
+from core.config.settings import MODEL_BUNDLE_DIR, MODEL_PRECISION
+from core.nn.architecture import ImprovedDurationPredictor
+from core.nn.features import FeatureEncoder
+
 # Этот файл содержит всю логику для предсказания длительности отключений.
 # Он загружает обученные модели и все необходимые для работы артефакты.
 
@@ -16,110 +16,73 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 # Константы и маппинги, определенные при обучении
 DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
 
-# Маппинги ваще автоматизировать все по хорошему, но мне чет лень, поэтому часть - хардкод
-
-type_mapping = {
-    "electricity": 1,
-    "cold_water": 2,
-    "hot_water": 3,
-    "heat": 4,
-}
-
-weather_type_mapping = {
-    "малооблачно без осадков": 1, "малооблачно гроза": 2, "малооблачно осадки": 3,
-    "малооблачно сильный снег": 4, "малооблачно сильный туман": 5, "малооблачно слабый дождь": 6,
-    "малооблачно слабый снег": 7, "малооблачно слабый туман": 8, "малооблачно снег": 9,
-    "малооблачно туман": 10, "облачно без осадков": 11, "облачно гроза": 12,
-    "облачно дождь": 13, "облачно сильный дождь": 14, "облачно сильный туман": 15,
-    "облачно слабые осадки": 16, "облачно слабый дождь": 17, "облачно слабый снег": 18,
-    "облачно слабый туман": 19, "облачно снег": 20, "пасмурно без осадков": 21,
-    "пасмурно гроза": 22, "пасмурно дождь": 23, "пасмурно сильный дождь": 24,
-    "пасмурно сильный снег": 25, "пасмурно сильный туман": 26, "пасмурно слабые осадки": 27,
-    "пасмурно слабый дождь": 28, "пасмурно слабый снег": 29, "пасмурно слабый туман": 30,
-    "пасмурно снег": 31, "ясно без осадков": 32
-}
-
-city_mapping = {"Владивосток": 1, "Артем": 2}
-
-russian_alphabet = "абвгдеёжзийклмнопрстуфхцчшщъыьэюя"
-letter_mapping = {letter: i + 1 for i, letter in enumerate(russian_alphabet)}
+# Маппинги и кодирование признаков общие с обучением (train.py) — см. features.py
+# Папка артефактов: по умолчанию core/nn, MODEL_BUNDLE_DIR — бандл, собранный python -m core.nn.train
+ARTIFACT_DIR = MODEL_BUNDLE_DIR or BASE_DIR
 
 # Функция для получения абсолютного пути к файлу артефакта
 def get_artifact_path(filename):
-    """Возвращает абсолютный путь к файлу артефакта внутри папки nn."""
-    # Обратите внимание: путь "nn/" из исходного кода удален,
-    # т.к. BASE_DIR уже указывает на папку nn.
-    return os.path.join(BASE_DIR, filename)
+    """Возвращает абсолютный путь к файлу артефакта внутри папки моделей (ARTIFACT_DIR)."""
+    return os.path.join(ARTIFACT_DIR, filename)
 
 TYPE_CONFIGS = {
     "electricity": {
         "model_path": get_artifact_path("improved_duration_predictor_electricity.pth"),
+        "scripted_model_path": get_artifact_path("improved_duration_predictor_electricity.pt"),
+        "quantized_model_path": get_artifact_path("improved_duration_predictor_electricity_int8.pt"),
         "scaler_path": get_artifact_path("duration_scaler_electricity.joblib"),
     },
     "cold_water": {
         "model_path": get_artifact_path("improved_duration_predictor_cold_water.pth"),
+        "scripted_model_path": get_artifact_path("improved_duration_predictor_cold_water.pt"),
+        "quantized_model_path": get_artifact_path("improved_duration_predictor_cold_water_int8.pt"),
         "scaler_path": get_artifact_path("duration_scaler_cold_water.joblib"),
     },
     "heat": {
         "model_path": get_artifact_path("improved_duration_predictor_heat.pth"),
+        "scripted_model_path": get_artifact_path("improved_duration_predictor_heat.pt"),
+        "quantized_model_path": get_artifact_path("improved_duration_predictor_heat_int8.pt"),
         "scaler_path": get_artifact_path("duration_scaler_heat.joblib"),
     },
 }
 
-# Определение архитектуры модели (должно быть идентично тому, что при обучении)
-class ResidualBlock(nn.Module):
-    def __init__(self, layers):
-        super(ResidualBlock, self).__init__()
-        self.layers = layers
-
-    def forward(self, x):
-        return x + self.layers(x)
-
-class ImprovedDurationPredictor(nn.Module):
-    def __init__(self, input_dim, hidden_dims=[256, 256, 128, 128, 64, 32], dropout_rate=0.4):
-        super(ImprovedDurationPredictor, self).__init__()
-        layers = []
-        prev_dim = input_dim
-        for i, hidden_dim in enumerate(hidden_dims):
-            block_layers = [
-                nn.Linear(prev_dim, hidden_dim),
-                nn.BatchNorm1d(hidden_dim),
-                nn.LeakyReLU(0.1),
-                nn.Dropout(dropout_rate),
-            ]
-            if i > 0 and prev_dim == hidden_dim:
-                layers.append(ResidualBlock(nn.Sequential(*block_layers)))
-            else:
-                layers.extend(block_layers)
-            prev_dim = hidden_dim
-        self.feature_extractor = nn.Sequential(*layers)
-        self.output_layer = nn.Sequential(
-            nn.Linear(prev_dim, 1),
-            nn.Softplus()
-        )
-
-    def forward(self, x):
-        features = self.feature_extractor(x)
-        return self.output_layer(features)
+def is_fresh_export(path, source_path):
+    """Экспортированный артефакт используется, только если он не старше исходного .pth."""
+    return os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(source_path)
+
+
+def load_model(config):
+    """
+    Загружает модель типа с учетом MODEL_PRECISION:
+    int8-версия (только CPU) -> TorchScript со свернутым BatchNorm -> исходная eager-модель.
+    """
+    quantized_path = config["quantized_model_path"]
+    if MODEL_PRECISION == "int8" and DEVICE == "cpu" and is_fresh_export(quantized_path, config["model_path"]):
+        model = torch.jit.load(quantized_path, map_location=DEVICE)
+    elif is_fresh_export(config["scripted_model_path"], config["model_path"]):
+        # TorchScript-версия со свернутым BatchNorm (см. export_model.py)
+        model = torch.jit.load(config["scripted_model_path"], map_location=DEVICE)
+    else:
+        model = ImprovedDurationPredictor(input_dim=len(FEATURE_COLS))
+        # config["model_path"] и config["scaler_path"] теперь содержат абсолютные пути
+        checkpoint = torch.load(config["model_path"], map_location=DEVICE)
+        model.load_state_dict(checkpoint['model_state_dict'])
+        model.to(DEVICE)
+    model.eval()
+    return model
+
 
 # Загрузка артефактов
 # В реальном бэкенде это нужно делать один раз при старте приложения
 try:
     # Использование функции get_artifact_path для всех загружаемых файлов
-    street_mapping_loaded = joblib.load(get_artifact_path('street_mapping.joblib'))
-    district_mapping_loaded = joblib.load(get_artifact_path('district_mapping.joblib'))
-    w2v_model_loaded = Word2Vec.load(get_artifact_path("word2vec.model"))
-    FEATURE_COLS = joblib.load(get_artifact_path('feature_cols.joblib'))
+    feature_encoder = FeatureEncoder.load(ARTIFACT_DIR)
+    FEATURE_COLS = feature_encoder.feature_cols
 
     inference_artifacts = {}
     for type_name, config in TYPE_CONFIGS.items():
         try:
-            model = ImprovedDurationPredictor(input_dim=len(FEATURE_COLS))
-            # config["model_path"] и config["scaler_path"] теперь содержат абсолютные пути
-            checkpoint = torch.load(config["model_path"], map_location=DEVICE)
-            model.load_state_dict(checkpoint['model_state_dict'])
-            model.to(DEVICE)
-            model.eval()
+            model = load_model(config)
             scaler = joblib.load(config["scaler_path"])
             inference_artifacts[type_name] = {"model": model, "scaler": scaler}
             print(f"Артефакты для '{type_name}' успешно загружены.")
@@ -130,6 +93,14 @@ except FileNotFoundError as e:
     inference_artifacts = None
 
 
+def build_feature_matrix(rows: list[dict]) -> pd.DataFrame:
+    """
+    Строит матрицу признаков (до масштабирования) в порядке FEATURE_COLS для списка входных словарей.
+    Отсутствующие признаки (например, погода) заполняются -1, как при обучении.
+    """
+    return feature_encoder.transform(rows)
+
+
 # Основная функция предсказания
 def predict_duration(input_data: dict):
     """
@@ -148,39 +119,7 @@ def predict_duration(input_data: dict):
     model = artifacts["model"]
     scaler = artifacts["scaler"]
 
-    df = pd.DataFrame([input_data])
-    df["start_date"] = pd.to_datetime(df["start_date"])
-    df['start_month'] = df['start_date'].dt.month
-    df['start_dayofweek'] = df['start_date'].dt.dayofweek
-    df['start_hour'] = df['start_date'].dt.hour
-
-    tokenized_description = re.findall(r'\b\w+\b', df['description'].iloc[0].lower())
-    
-    def description_to_vector(description_tokens, model):
-        vectors = [model.wv[word] for word in description_tokens if word in model.wv]
-        if not vectors:
-            return np.zeros(model.vector_size)
-        return np.mean(vectors, axis=0)
-
-    description_vector = description_to_vector(tokenized_description, w2v_model_loaded)
-    desc_vec_df = pd.DataFrame([description_vector], columns=[f"desc_vec_{i}" for i in range(w2v_model_loaded.vector_size)])
-    
-    df = pd.concat([df.reset_index(drop=True), desc_vec_df], axis=1)
-    df = df.drop(columns=["description"])
-
-    df["house_number_letter"] = df["house_number"].str.extract(r"(\D+)", expand=False).str.lower().fillna("").apply(lambda x: letter_mapping.get(x, -1))
-    df["house_number"] = df["house_number"].str.extract(r"(\d+)").astype(float)
-
-    df["type"] = df["type"].map(type_mapping)
-    df["weather_description"] = df["weather_description"].map(weather_type_mapping)
-    df["city"] = df["city"].map(city_mapping)
-    df["street"] = df["street"].map(street_mapping_loaded)
-    df["district"] = df["district"].map(district_mapping_loaded)
-
-    X = df[FEATURE_COLS]
-    # Используем .loc для избежания SettingWithCopyWarning
-    X.loc[:, FEATURE_COLS] = X[FEATURE_COLS].fillna(-1)
-
+    X = build_feature_matrix([input_data])
 
     X_scaled = scaler.transform(X)
     X_tensor = torch.FloatTensor(X_scaled).to(DEVICE)
@@ -0,0 +1,145 @@
+import argparse
+import asyncio
+import os
+
+from core.config.settings import PREDICTION_BATCH_MAX_ROWS, PREDICTION_BATCH_WAIT_MS, PREDICTION_SOCKET
+from core.nn.fused_inference import predict_durations
+from core.utils.prediction_client import encode_frame, read_frame
+
+# Отдельный процесс инференса: держит модели один раз на машину и обслуживает все API-воркеры
+# (PREDICTION_MODE=worker) по Unix-сокету. Запросы всех соединений, пришедшие, пока считается
+# предыдущий батч (или в пределах PREDICTION_BATCH_WAIT_MS), объединяются в один вызов predict_durations.
+#
+# Запуск из папки backend:
+#   python -m core.nn.prediction_worker --socket /tmp/blackout_prediction.sock
+
+
+class BatchingPredictor:
+    """Очередь запросов и один цикл, который собирает их в батчи и считает в отдельном потоке."""
+
+    def __init__(self, max_batch_rows: int, max_wait: float):
+        self.max_batch_rows = max_batch_rows
+        self.max_wait = max_wait
+        self.queue: asyncio.Queue[tuple[list[dict], asyncio.Future]] = asyncio.Queue()
+        self.batches = 0
+        self.requests = 0
+        self.rows = 0
+
+    async def predict(self, rows: list[dict]) -> list[float | None]:
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((rows, future))
+        return await future
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            batch_rows = len(batch[0][0])
+            deadline = loop.time() + self.max_wait
+            while batch_rows < self.max_batch_rows:
+                try:
+                    if self.queue.empty():
+                        item = await asyncio.wait_for(self.queue.get(), timeout=max(deadline - loop.time(), 0))
+                    else:
+                        item = self.queue.get_nowait()
+                except asyncio.TimeoutError:
+                    break
+                batch.append(item)
+                batch_rows += len(item[0])
+
+            all_rows = [row for rows, _ in batch for row in rows]
+            try:
+                predictions = await asyncio.to_thread(predict_durations, all_rows)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            offset = 0
+            for rows, future in batch:
+                if not future.done():
+                    future.set_result(predictions[offset:offset + len(rows)])
+                offset += len(rows)
+
+            self.batches += 1
+            self.requests += len(batch)
+            self.rows += len(all_rows)
+
+
+async def handle_connection(predictor: BatchingPredictor, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    """Запросы одного соединения обрабатываются конкурентно, ответы пишутся по мере готовности."""
+    write_lock = asyncio.Lock()
+
+    async def respond(message: dict):
+        try:
+            response = {"id": message["id"], "predictions": await predictor.predict(message["rows"])}
+        except Exception as e:
+            response = {"id": message["id"], "error": repr(e)}
+        async with write_lock:
+            try:
+                writer.write(encode_frame(response))
+                await writer.drain()
+            except ConnectionError:
+                pass  # клиент отключился, ответ никому не нужен
+
+    tasks = set()
+    try:
+        while True:
+            message = await read_frame(reader)
+            task = asyncio.create_task(respond(message))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def report_stats(predictor: BatchingPredictor, interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        if predictor.batches:
+            print(
+                f"Батчей: {predictor.batches}, запросов: {predictor.requests}, строк: {predictor.rows} "
+                f"(в среднем {predictor.requests / predictor.batches:.1f} запросов на батч)",
+                flush=True,
+            )
+
+
+async def serve(socket_path: str, max_batch_rows: int, max_wait: float, stats_interval: float):
+    predictor = BatchingPredictor(max_batch_rows=max_batch_rows, max_wait=max_wait)
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    server = await asyncio.start_unix_server(lambda r, w: handle_connection(predictor, r, w), path=socket_path)
+    print(f"Процесс инференса слушает {socket_path}", flush=True)
+
+    background = [asyncio.create_task(predictor.run())]
+    if stats_interval > 0:
+        background.append(asyncio.create_task(report_stats(predictor, stats_interval)))
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        for task in background:
+            task.cancel()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Процесс инференса моделей длительности для API-воркеров")
+    parser.add_argument("--socket", default=PREDICTION_SOCKET, help="Путь к Unix-сокету")
+    parser.add_argument("--max-batch-rows", type=int, default=PREDICTION_BATCH_MAX_ROWS, help="Максимум строк в одном батче")
+    parser.add_argument("--max-wait-ms", type=float, default=PREDICTION_BATCH_WAIT_MS, help="Сколько ждать попутных запросов после первого")
+    parser.add_argument("--stats-interval", type=float, default=60, help="Период печати статистики батчей, секунды (0 — не печатать)")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args.socket, args.max_batch_rows, args.max_wait_ms / 1000, args.stats_interval))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import argparse
+import io
+import os
+
+import joblib
+import numpy as np
+import torch
+import torch.nn as nn
+
+from core.nn.export_model import FoldedDurationPredictor, benchmark, load_eager_model
+from core.nn.prediction_service import FEATURE_COLS, TYPE_CONFIGS, build_feature_matrix
+from core.nn.training_data import load_blackout_frame
+
+# Квантование моделей длительности в int8 для CPU.
+# Используется динамическое квантование Linear-слоев (веса int8, активации квантуются на лету)
+# поверх модели со свернутым BatchNorm. Калибровочная выборка из dataset.db нужна для оценки точности:
+# считается MAE в часах для fp32 и int8 и их разница, а также латентность и размер модели.
+# Сервис использует int8-версию при MODEL_PRECISION=int8.
+#
+# Запуск из папки backend:
+#   python -m core.nn.quantize_model --dataset ../../databases/dataset.db --weather ../../databases/weather.db
+
+
+def quantize(model: nn.Module) -> nn.Module:
+    folded = FoldedDurationPredictor(model).eval()
+    return torch.ao.quantization.quantize_dynamic(folded, {nn.Linear}, dtype=torch.qint8)
+
+
+def export_quantized(model: nn.Module, output_path: str) -> torch.jit.ScriptModule:
+    example = torch.zeros(1, len(FEATURE_COLS))
+    with torch.no_grad():
+        scripted = torch.jit.trace(quantize(model), example)
+    scripted.save(output_path)
+    return scripted
+
+
+def serialized_size(model: nn.Module) -> int:
+    """Размер сериализованной модели в байтах — оценка занимаемой весами памяти."""
+    buffer = io.BytesIO()
+    if isinstance(model, torch.jit.ScriptModule):
+        torch.jit.save(model, buffer)
+    else:
+        torch.save(model.state_dict(), buffer)
+    return buffer.tell()
+
+
+def predict(model: nn.Module, X_scaled: np.ndarray) -> np.ndarray:
+    with torch.no_grad():
+        return model(torch.FloatTensor(X_scaled)).numpy().ravel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="int8-квантование моделей длительности с отчетом о точности и скорости")
+    parser.add_argument("--dataset", help="dataset.db для калибровочной выборки (без него MAE считается только fp32 vs int8)")
+    parser.add_argument("--weather", help="weather.db для погодных признаков")
+    parser.add_argument("--types", help="Типы через запятую (по умолчанию все из TYPE_CONFIGS)")
+    parser.add_argument("--samples", type=int, default=2000, help="Размер калибровочной выборки на тип")
+    parser.add_argument("--iterations", type=int, default=2000, help="Итераций бенчмарка латентности")
+    args = parser.parse_args()
+
+    torch.set_num_threads(1)
+    type_names = args.types.split(",") if args.types else list(TYPE_CONFIGS)
+
+    for type_name in type_names:
+        config = TYPE_CONFIGS[type_name]
+        if not os.path.exists(config["model_path"]):
+            print(f"Пропуск {type_name}: нет файла {config['model_path']}")
+            continue
+
+        eager = load_eager_model(config["model_path"])
+        scaler = joblib.load(config["scaler_path"])
+        quantized = export_quantized(eager, config["quantized_model_path"])
+        print(f"\n=== {type_name}: сохранено {config['quantized_model_path']} ===")
+
+        if args.dataset:
+            frame = load_blackout_frame(args.dataset, args.weather, types=[type_name], limit=args.samples)
+            X_scaled = scaler.transform(build_feature_matrix(frame.drop(columns=["end_date", "duration"]).to_dict("records")))
+            target = frame["duration"].to_numpy()
+        else:
+            # Без датасета — стандартизованные случайные входы, сравниваем только модели между собой
+            X_scaled = np.random.default_rng(0).standard_normal((args.samples, len(FEATURE_COLS)))
+            target = None
+
+        fp32_pred = predict(eager, X_scaled)
+        int8_pred = predict(quantized, X_scaled)
+        print(f"Калибровочная выборка: {len(X_scaled)} строк")
+        print(f"MAE int8 относительно fp32: {np.abs(int8_pred - fp32_pred).mean():.4f} ч")
+        if target is not None and len(target):
+            fp32_mae = np.abs(fp32_pred - target).mean()
+            int8_mae = np.abs(int8_pred - target).mean()
+            print(f"MAE fp32: {fp32_mae:.4f} ч, MAE int8: {int8_mae:.4f} ч, дельта: {int8_mae - fp32_mae:+.4f} ч")
+
+        fp32_stats = benchmark(eager, iterations=args.iterations)
+        int8_stats = benchmark(quantized, iterations=args.iterations)
+        fp32_size = serialized_size(eager)
+        int8_size = serialized_size(quantized)
+        print(
+            f"Латентность (батч 1): fp32 eager {fp32_stats['mean_us']:.1f} мкс, int8 {int8_stats['mean_us']:.1f} мкс "
+            f"(x{fp32_stats['mean_us'] / int8_stats['mean_us']:.2f})"
+        )
+        print(
+            f"Размер модели: fp32 {fp32_size / 1024:.0f} КБ, int8 {int8_size / 1024:.0f} КБ "
+            f"(x{fp32_size / int8_size:.2f})"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,355 @@
+import argparse
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from multiprocessing import get_context
+
+import gensim
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+import torch
+import torch.nn as nn
+import torch.optim as optim
+from gensim.models import Word2Vec
+from sklearn.metrics import mean_squared_error, r2_score
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+from torch.utils.data import DataLoader, TensorDataset
+
+from core.nn.architecture import ImprovedDurationPredictor
+from core.nn.features import FEATURE_COLS, W2V_VECTOR_SIZE, FeatureEncoder, tokenize
+from core.nn.training_data import load_blackout_frame
+
+# Обучение моделей длительности (рецепт из predict_duration_jn.ipynb) одной командой.
+# Признаки строятся тем же FeatureEncoder, что и в prediction_service, поэтому обучение и сервис не расходятся.
+# Word2Vec обучается в несколько потоков, модели типов — параллельно в пуле процессов,
+# батчи готовят воркеры DataLoader. Результат — версионированный бандл
+# bundles/<время>-<хэш данных>/ с теми же файлами, что лежат в core/nn, и manifest.json
+# (данные, гиперпараметры, версии библиотек, метрики, sha256 файлов).
+# Сервис загружает бандл при MODEL_BUNDLE_DIR=<путь к бандлу>.
+#
+# Запуск из папки backend:
+#   python -m core.nn.train --dataset ../../databases/dataset.db --weather ../../databases/weather.db
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+BUNDLES_DIR = os.path.join(BASE_DIR, "bundles")
+
+# Отсечка выбросов по длительности (часы) для каждого типа; hot_water в ноутбуке не обучается
+DURATION_LIMITS = {
+    "electricity": 24,
+    "cold_water": 80,
+    "heat": 45,
+}
+MAX_DURATION_HOURS = 1000
+
+EPOCHS = 500
+BATCH_SIZE = 128
+LEARNING_RATE = 0.001
+WEIGHT_DECAY = 1e-5
+TEST_SIZE = 0.2
+VAL_SIZE = 0.15
+W2V_WINDOW = 5
+W2V_MIN_COUNT = 1
+
+
+def model_filename(type_name: str) -> str:
+    return f"improved_duration_predictor_{type_name}.pth"
+
+
+def scaler_filename(type_name: str) -> str:
+    return f"duration_scaler_{type_name}.joblib"
+
+
+def seed_everything(seed: int):
+    random.seed(seed)
+    np.random.seed(seed)
+    torch.manual_seed(seed)
+
+
+def build_mappings(dataset_path: str) -> tuple[dict, dict]:
+    """Маппинги улиц и районов (с 1) как в ноутбуке, но в стабильном порядке имен."""
+    conn = sqlite3.connect(dataset_path)
+    streets = [row[0] for row in conn.execute("SELECT DISTINCT name FROM streets WHERE name IS NOT NULL ORDER BY name")]
+    districts = [row[0] for row in conn.execute("""
+        SELECT name FROM folk_districts WHERE name IS NOT NULL
+        UNION
+        SELECT name FROM big_folk_districts WHERE name IS NOT NULL
+        UNION
+        SELECT name FROM districts WHERE name IS NOT NULL
+        ORDER BY name
+    """)]
+    conn.close()
+    return {name: i for i, name in enumerate(streets, 1)}, {name: i for i, name in enumerate(districts, 1)}
+
+
+def train_word2vec(descriptions: pd.Series, seed: int, workers: int) -> Word2Vec:
+    """Word2Vec по описаниям всех отключений; токенизируется только каждое уникальное описание."""
+    codes, uniques = pd.factorize(descriptions.fillna(""))
+    unique_tokens = [tokenize(description) for description in uniques]
+    sentences = [unique_tokens[code] for code in codes]
+    return Word2Vec(
+        sentences=sentences,
+        vector_size=W2V_VECTOR_SIZE,
+        window=W2V_WINDOW,
+        min_count=W2V_MIN_COUNT,
+        workers=workers,
+        seed=seed,
+    )
+
+
+def frame_fingerprint(frame: pd.DataFrame) -> str:
+    """Хэш содержимого обучающих данных — часть версии бандла."""
+    return hashlib.sha256(pd.util.hash_pandas_object(frame, index=False).to_numpy().tobytes()).hexdigest()
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, cwd=BASE_DIR).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def make_loader(X: np.ndarray, y: np.ndarray, batch_size: int, loader_workers: int, shuffle: bool = False, seed: int = 0) -> DataLoader:
+    generator = torch.Generator().manual_seed(seed)
+    return DataLoader(
+        TensorDataset(torch.from_numpy(X), torch.from_numpy(y).view(-1, 1)),
+        batch_size=batch_size,
+        shuffle=shuffle,
+        generator=generator,
+        num_workers=loader_workers,
+        persistent_workers=loader_workers > 0,
+    )
+
+
+def train_type(job: dict) -> dict:
+    """
+    Обучает модель одного типа (выполняется в отдельном процессе пула).
+    Сохраняет .pth (те же ключи чекпоинта, что в ноутбуке) и scaler в бандл, возвращает метрики на тесте.
+    """
+    type_name = job["type_name"]
+    torch.set_num_threads(job["torch_threads"])
+    seed_everything(job["seed"])
+    if job["deterministic"]:
+        torch.use_deterministic_algorithms(True)
+
+    X = np.load(job["X_path"])
+    y = np.load(job["y_path"])
+
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(X).astype(np.float32)
+    X_train, X_test, y_train, y_test = train_test_split(X_scaled, y, test_size=TEST_SIZE, random_state=job["seed"])
+    X_train, X_val, y_train, y_val = train_test_split(X_train, y_train, test_size=VAL_SIZE, random_state=job["seed"])
+
+    batch_size, loader_workers = job["batch_size"], job["loader_workers"]
+    train_loader = make_loader(X_train, y_train, batch_size, loader_workers, shuffle=True, seed=job["seed"])
+    val_loader = make_loader(X_val, y_val, batch_size, loader_workers)
+
+    epochs = job["epochs"]
+    model = ImprovedDurationPredictor(input_dim=X.shape[1])
+    criterion = nn.HuberLoss()
+    optimizer = optim.AdamW(model.parameters(), lr=LEARNING_RATE, weight_decay=WEIGHT_DECAY)
+    scheduler = optim.lr_scheduler.OneCycleLR(optimizer, max_lr=LEARNING_RATE, steps_per_epoch=len(train_loader), epochs=epochs)
+
+    started = time.perf_counter()
+    train_losses = []
+    val_losses = []
+    for epoch in range(epochs):
+        model.train()
+        epoch_train_loss = 0.0
+        for features, labels in train_loader:
+            optimizer.zero_grad()
+            loss = criterion(model(features), labels)
+            loss.backward()
+            torch.nn.utils.clip_grad_norm_(model.parameters(), max_norm=1.0)
+            optimizer.step()
+            scheduler.step()  # OneCycleLR — после каждого батча
+            epoch_train_loss += loss.item()
+        train_losses.append(epoch_train_loss / max(len(train_loader), 1))
+
+        model.eval()
+        epoch_val_loss = 0.0
+        with torch.no_grad():
+            for features, labels in val_loader:
+                epoch_val_loss += criterion(model(features), labels).item()
+        val_losses.append(epoch_val_loss / max(len(val_loader), 1))
+
+        if (epoch + 1) % 10 == 0:
+            print(f"[{type_name}] Эпоха [{epoch + 1}/{epochs}] Train Loss: {train_losses[-1]:.4f}, Val Loss: {val_losses[-1]:.4f}", flush=True)
+
+    model.eval()
+    with torch.no_grad():
+        y_pred = model(torch.from_numpy(X_test)).numpy().ravel()
+
+    torch.save(
+        {
+            "model_state_dict": model.state_dict(),
+            "optimizer_state_dict": optimizer.state_dict(),
+            "scheduler_state_dict": scheduler.state_dict(),
+            "train_losses": train_losses,
+            "val_losses": val_losses,
+            "epochs": epochs,
+            "best_val_loss": min(val_losses) if val_losses else None,
+        },
+        os.path.join(job["bundle_dir"], model_filename(type_name)),
+    )
+    joblib.dump(scaler, os.path.join(job["bundle_dir"], scaler_filename(type_name)))
+
+    return {
+        "type": type_name,
+        "rmse": float(np.sqrt(mean_squared_error(y_test, y_pred))),
+        "r2": float(r2_score(y_test, y_pred)),
+        "best_val_loss": min(val_losses) if val_losses else None,
+        "counts": {"total": len(X), "train": len(X_train), "val": len(X_val), "test": len(X_test)},
+        "train_seconds": round(time.perf_counter() - started, 1),
+    }
+
+
+def write_manifest(bundle_dir: str, manifest: dict):
+    manifest["files"] = {
+        name: file_sha256(os.path.join(bundle_dir, name))
+        for name in sorted(os.listdir(bundle_dir))
+        if name != "manifest.json"
+    }
+    with open(os.path.join(bundle_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Обучение моделей длительности и сборка версионированного бандла артефактов")
+    parser.add_argument("--dataset", required=True, help="Путь к dataset.db")
+    parser.add_argument("--weather", help="Путь к weather.db (без него погодные признаки = -1)")
+    parser.add_argument("--output", default=BUNDLES_DIR, help="Папка, в которой создается бандл")
+    parser.add_argument("--types", default=",".join(DURATION_LIMITS), help="Типы через запятую")
+    parser.add_argument("--epochs", type=int, default=EPOCHS)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--limit", type=int, help="Случайная подвыборка строк (для быстрых прогонов)")
+    parser.add_argument("--workers", type=int, help="Процессов для параллельного обучения типов (по умолчанию min(типов, ядер))")
+    parser.add_argument("--loader-workers", type=int, default=2, help="Воркеров DataLoader на модель")
+    parser.add_argument("--w2v-workers", type=int, default=os.cpu_count() or 1, help="Потоков обучения Word2Vec")
+    parser.add_argument("--deterministic", action="store_true", help="Побитово воспроизводимый результат: Word2Vec в 1 поток и детерминированные алгоритмы torch")
+    args = parser.parse_args()
+
+    type_names = args.types.split(",")
+    unknown = [type_name for type_name in type_names if type_name not in DURATION_LIMITS]
+    if unknown:
+        parser.error(f"Нет отсечки длительности для типов: {', '.join(unknown)}")
+
+    started = time.perf_counter()
+    seed_everything(args.seed)
+
+    frame = load_blackout_frame(args.dataset, args.weather)
+    frame = frame[frame["duration"] < MAX_DURATION_HOURS]
+    if args.limit and args.limit < len(frame):
+        frame = frame.sample(n=args.limit, random_state=args.seed)
+    frame = frame.reset_index(drop=True)
+    print(f"Загружено {len(frame)} строк за {time.perf_counter() - started:.1f} с")
+
+    created_at = datetime.now(timezone.utc)
+    data_hash = frame_fingerprint(frame)
+    version = f"{created_at:%Y%m%dT%H%M%SZ}-{data_hash[:8]}"
+    bundle_dir = os.path.join(args.output, version)
+    os.makedirs(bundle_dir)
+
+    # Word2Vec на всех описаниях (как в ноутбуке); для воспроизводимости gensim нужен 1 поток и PYTHONHASHSEED
+    w2v_workers = 1 if args.deterministic else args.w2v_workers
+    street_mapping, district_mapping = build_mappings(args.dataset)
+    w2v_model = train_word2vec(frame["description"], seed=args.seed, workers=w2v_workers)
+    encoder = FeatureEncoder(street_mapping, district_mapping, w2v_model, FEATURE_COLS)
+    encoder.save(bundle_dir)
+
+    X_all = encoder.transform(frame).to_numpy(dtype=np.float32)
+    print(f"Признаки: {X_all.shape} за {time.perf_counter() - started:.1f} с")
+
+    with tempfile.TemporaryDirectory(dir=bundle_dir) as work_dir:
+        # Матрицы типов передаются процессам через .npy, а не через pickle
+        jobs = []
+        for type_name in type_names:
+            mask = ((frame["type"] == type_name) & (frame["duration"] <= DURATION_LIMITS[type_name])).to_numpy()
+            if mask.sum() < 10:
+                print(f"Пропуск {type_name}: недостаточно данных ({mask.sum()} строк)")
+                continue
+            X_path = os.path.join(work_dir, f"X_{type_name}.npy")
+            y_path = os.path.join(work_dir, f"y_{type_name}.npy")
+            np.save(X_path, X_all[mask])
+            np.save(y_path, frame["duration"].to_numpy(dtype=np.float32)[mask])
+            jobs.append({"type_name": type_name, "X_path": X_path, "y_path": y_path})
+
+        cpu_count = os.cpu_count() or 1
+        workers = max(1, min(args.workers or cpu_count, len(jobs) or 1))
+        torch_threads = max(1, cpu_count // workers)
+        for job in jobs:
+            job.update(
+                bundle_dir=bundle_dir,
+                seed=args.seed,
+                epochs=args.epochs,
+                batch_size=args.batch_size,
+                loader_workers=args.loader_workers,
+                torch_threads=torch_threads,
+                deterministic=args.deterministic,
+            )
+
+        print(f"Обучение {len(jobs)} моделей: {workers} процессов x {torch_threads} потоков torch, {args.loader_workers} воркеров DataLoader")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn")) as pool:
+            results = list(pool.map(train_type, jobs))
+
+    metrics = {result.pop("type"): result for result in results}
+    write_manifest(bundle_dir, {
+        "version": version,
+        "created_at": created_at.isoformat(),
+        "git_commit": git_commit(),
+        "data": {
+            "dataset": os.path.abspath(args.dataset),
+            "weather": os.path.abspath(args.weather) if args.weather else None,
+            "rows": len(frame),
+            "sha256": data_hash,
+        },
+        "params": {
+            "seed": args.seed,
+            "epochs": args.epochs,
+            "batch_size": args.batch_size,
+            "learning_rate": LEARNING_RATE,
+            "weight_decay": WEIGHT_DECAY,
+            "test_size": TEST_SIZE,
+            "val_size": VAL_SIZE,
+            "duration_limits": {type_name: DURATION_LIMITS[type_name] for type_name in type_names},
+            "max_duration_hours": MAX_DURATION_HOURS,
+            "limit": args.limit,
+            "deterministic": args.deterministic,
+            "word2vec": {"vector_size": W2V_VECTOR_SIZE, "window": W2V_WINDOW, "min_count": W2V_MIN_COUNT, "workers": w2v_workers},
+        },
+        "libraries": {
+            "torch": torch.__version__,
+            "gensim": gensim.__version__,
+            "scikit-learn": sklearn.__version__,
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+        },
+        "metrics": metrics,
+    })
+
+    for type_name, result in metrics.items():
+        print(f"{type_name}: RMSE {result['rmse']:.3f} ч, R2 {result['r2']:.3f} ({result['counts']['total']} строк, {result['train_seconds']} с)")
+    print(f"\nБандл {version} сохранен: {bundle_dir} (всего {time.perf_counter() - started:.1f} с)")
+    print(f"Подключить в сервисе: MODEL_BUNDLE_DIR={os.path.abspath(bundle_dir)}")
+
+
+if __name__ == "__main__":
+    main()
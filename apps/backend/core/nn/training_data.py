@@ -0,0 +1,72 @@
+import sqlite3
+
+import pandas as pd
+
+# Загрузка размеченных отключений из dataset.db и weather.db в том же виде,
+# в каком BlackoutService передает их в predict_duration (плюс фактическая длительность).
+# Район — народный, если он есть (как в predict_duration_jn.ipynb); сервис подставляет то же значение.
+
+BLACKOUTS_QUERY = """
+SELECT
+    b.start_date,
+    b.end_date,
+    b.description,
+    b.type,
+    c.name AS city,
+    s.name AS street,
+    bu.number AS house_number,
+    COALESCE(fd.name, bfd.name, d.name) AS district
+FROM blackouts b
+JOIN blackouts_buildings bb ON b.id = bb.blackout_id
+JOIN buildings bu ON bb.building_id = bu.id
+JOIN streets s ON bu.street_id = s.id
+JOIN cities c ON bu.city_id = c.id
+LEFT JOIN folk_districts fd ON bu.folk_district_id = fd.id
+LEFT JOIN big_folk_districts bfd ON bu.big_folk_district_id = bfd.id
+LEFT JOIN districts d ON bu.district_id = d.id
+"""
+
+
+def load_blackout_frame(
+    dataset_path: str,
+    weather_path: str | None = None,
+    types: list[str] | None = None,
+    limit: int | None = None,
+) -> pd.DataFrame:
+    """
+    Возвращает DataFrame со столбцами входа predict_duration и целевой длительностью `duration` (часы).
+    Некорректные и отрицательные длительности отбрасываются.
+    """
+    query = BLACKOUTS_QUERY
+    params = []
+    if types:
+        query += f" WHERE b.type IN ({', '.join('?' for _ in types)})"
+        params.extend(types)
+    if limit:
+        query += " ORDER BY RANDOM() LIMIT ?"
+        params.append(limit)
+
+    conn = sqlite3.connect(dataset_path)
+    df = pd.read_sql_query(query, conn, params=params)
+    conn.close()
+
+    df["start_date"] = pd.to_datetime(df["start_date"], errors="coerce")
+    df["end_date"] = pd.to_datetime(df["end_date"], errors="coerce")
+    df = df.dropna(subset=["start_date", "end_date"])
+    df["duration"] = (df["end_date"] - df["start_date"]).dt.total_seconds() / 3600
+    df = df[df["duration"] >= 0]
+
+    if weather_path:
+        weather_conn = sqlite3.connect(weather_path)
+        weather_df = pd.read_sql_query("SELECT date, temp_max, temp_min, weather_type FROM weather", weather_conn)
+        weather_conn.close()
+
+        weather_df["merge_date"] = pd.to_datetime(weather_df["date"]).dt.date
+        weather_df["temp_min"] = pd.to_numeric(weather_df["temp_min"], errors="coerce")
+        weather_df["temp_max"] = pd.to_numeric(weather_df["temp_max"], errors="coerce")
+        weather_df = weather_df.rename(columns={"weather_type": "weather_description"}).drop(columns=["date"])
+
+        df["merge_date"] = df["start_date"].dt.date
+        df = df.merge(weather_df, on="merge_date", how="left").drop(columns=["merge_date"])
+
+    return df.reset_index(drop=True)
@@ -0,0 +1,270 @@
+import argparse
+import calendar
+import os
+import sqlite3
+import time
+from datetime import datetime
+
+# Денормализованная read-модель blackout_building_view: одна строка на пару (отключение, здание)
+# с готовыми именами улицы/районов/города, числовыми lat/lon и датами в epoch-секундах.
+# Списки и поиск по адресу читают только ее — без семи джойнов и json_extract на каждый запрос.
+# Таблица поддерживается триггерами на blackouts, blackouts_buildings, buildings и справочниках,
+# так что любая запись в исходные таблицы сразу отражается в ней.
+# Сборка — шаг развертывания: сервис при старте только проверяет, что таблица и триггеры на месте (check_view).
+#
+# Полная сборка из папки backend:
+#   python -m core.read_model.blackout_view --dataset ../../databases/dataset.db
+# Досинхронизация (например, после загрузки данных при снятых триггерах):
+#   python -m core.read_model.blackout_view --dataset ../../databases/dataset.db --refresh
+# --refresh чинит только данные (лишние, недостающие и устаревшие строки); после изменения схемы
+# таблицы, индексов или SELECT_SQL нужна полная сборка без --refresh.
+
+VIEW_TABLE = "blackout_building_view"
+
+CREATE_TABLE_SQL = f"""
+CREATE TABLE IF NOT EXISTS {VIEW_TABLE} (
+    blackout_id TEXT NOT NULL,
+    building_id TEXT NOT NULL,
+    start_date TEXT,
+    end_date TEXT,
+    start_ts INTEGER,
+    end_ts INTEGER,
+    description TEXT,
+    type TEXT,
+    building_number TEXT,
+    lat REAL,
+    lon REAL,
+    street TEXT,
+    district TEXT,
+    folk_district TEXT,
+    big_folk_district TEXT,
+    city TEXT,
+    street_id TEXT,
+    district_id TEXT,
+    folk_district_id TEXT,
+    big_folk_district_id TEXT,
+    city_id TEXT,
+    PRIMARY KEY (blackout_id, building_id)
+)
+"""
+
+INDEXES = {
+    f"ix_{VIEW_TABLE}_type_start": "type, start_ts",
+    f"ix_{VIEW_TABLE}_start_end": "start_ts, end_ts",
+    f"ix_{VIEW_TABLE}_building_start": "building_id, start_ts, end_ts",
+    f"ix_{VIEW_TABLE}_district": "district_id, start_ts",
+    f"ix_{VIEW_TABLE}_folk_district": "folk_district_id, start_ts",
+    f"ix_{VIEW_TABLE}_big_folk_district": "big_folk_district_id, start_ts",
+    f"ix_{VIEW_TABLE}_lat_lon": "lat, lon",
+}
+
+# Тот же набор INNER JOIN, что был в запросах репозитория: здания без справочных записей не попадают
+SOURCE_SQL = """
+FROM blackouts b
+JOIN blackouts_buildings bb ON bb.blackout_id = b.id
+JOIN buildings bu ON bu.id = bb.building_id
+JOIN streets s ON s.id = bu.street_id
+JOIN districts d ON d.id = bu.district_id
+JOIN folk_districts fd ON fd.id = bu.folk_district_id
+JOIN big_folk_districts bfd ON bfd.id = bu.big_folk_district_id
+JOIN cities c ON c.id = bu.city_id
+"""
+
+# Колонки в порядке CREATE_TABLE_SQL; псевдонимы нужны refresh_view для сравнения со строками таблицы
+SELECT_SQL = f"""
+SELECT
+    b.id AS blackout_id, bb.building_id AS building_id, b.start_date AS start_date, b.end_date AS end_date,
+    CAST(strftime('%s', b.start_date) AS INTEGER) AS start_ts, CAST(strftime('%s', b.end_date) AS INTEGER) AS end_ts,
+    b.description AS description, b.type AS type, bu.number AS building_number,
+    CAST(json_extract(bu.coordinates, '$[0].lat') AS REAL) AS lat, CAST(json_extract(bu.coordinates, '$[0].lon') AS REAL) AS lon,
+    s.name AS street, d.name AS district, fd.name AS folk_district, bfd.name AS big_folk_district, c.name AS city,
+    bu.street_id AS street_id, bu.district_id AS district_id, bu.folk_district_id AS folk_district_id,
+    bu.big_folk_district_id AS big_folk_district_id, bu.city_id AS city_id
+{SOURCE_SQL}"""
+
+VIEW_COLUMNS = (
+    "blackout_id", "building_id", "start_date", "end_date", "start_ts", "end_ts", "description", "type",
+    "building_number", "lat", "lon", "street", "district", "folk_district", "big_folk_district", "city",
+    "street_id", "district_id", "folk_district_id", "big_folk_district_id", "city_id",
+)
+
+INSERT_SQL = f"INSERT OR REPLACE INTO {VIEW_TABLE} {SELECT_SQL}"
+
+# Справочник -> (колонка с id, колонка с именем) в read-модели
+DIMENSIONS = {
+    "streets": ("street_id", "street"),
+    "districts": ("district_id", "district"),
+    "folk_districts": ("folk_district_id", "folk_district"),
+    "big_folk_districts": ("big_folk_district_id", "big_folk_district"),
+    "cities": ("city_id", "city"),
+}
+
+
+def to_epoch(value: datetime) -> int:
+    """Как strftime('%s') в SQLite: наивная дата считается UTC."""
+    return calendar.timegm(value.timetuple())
+
+
+def trigger_statements() -> dict[str, str]:
+    """Триггеры инкрементального обновления: имя -> CREATE TRIGGER."""
+    triggers = {
+        "blackouts_buildings_insert": f"""
+            AFTER INSERT ON blackouts_buildings BEGIN
+                {INSERT_SQL} WHERE b.id = NEW.blackout_id AND bu.id = NEW.building_id;
+            END""",
+        "blackouts_buildings_delete": f"""
+            AFTER DELETE ON blackouts_buildings BEGIN
+                DELETE FROM {VIEW_TABLE} WHERE blackout_id = OLD.blackout_id AND building_id = OLD.building_id;
+            END""",
+        "blackouts_insert": f"""
+            AFTER INSERT ON blackouts BEGIN
+                {INSERT_SQL} WHERE b.id = NEW.id;
+            END""",
+        "blackouts_update": f"""
+            AFTER UPDATE ON blackouts BEGIN
+                DELETE FROM {VIEW_TABLE} WHERE blackout_id = OLD.id;
+                {INSERT_SQL} WHERE b.id = NEW.id;
+            END""",
+        "blackouts_delete": f"""
+            AFTER DELETE ON blackouts BEGIN
+                DELETE FROM {VIEW_TABLE} WHERE blackout_id = OLD.id;
+            END""",
+        "buildings_update": f"""
+            AFTER UPDATE ON buildings BEGIN
+                DELETE FROM {VIEW_TABLE} WHERE building_id = OLD.id;
+                {INSERT_SQL} WHERE bu.id = NEW.id;
+            END""",
+        "buildings_delete": f"""
+            AFTER DELETE ON buildings BEGIN
+                DELETE FROM {VIEW_TABLE} WHERE building_id = OLD.id;
+            END""",
+    }
+    for table, (id_column, name_column) in DIMENSIONS.items():
+        triggers[f"{table}_update"] = f"""
+            AFTER UPDATE OF name ON {table} BEGIN
+                UPDATE {VIEW_TABLE} SET {name_column} = NEW.name WHERE {id_column} = NEW.id;
+            END"""
+    return {f"trg_{VIEW_TABLE}_{name}": body for name, body in triggers.items()}
+
+
+def view_exists(conn: sqlite3.Connection) -> bool:
+    row = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (VIEW_TABLE,)).fetchone()
+    return row is not None
+
+
+def install_triggers(conn: sqlite3.Connection):
+    for name, body in trigger_statements().items():
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+        conn.execute(f"CREATE TRIGGER {name} {body}")
+
+
+def build_view(conn: sqlite3.Connection) -> int:
+    """Полная пересборка: таблица, данные, индексы (после вставки — так быстрее) и триггеры."""
+    with conn:
+        conn.execute(f"DROP TABLE IF EXISTS {VIEW_TABLE}")
+        conn.execute(CREATE_TABLE_SQL)
+        conn.execute(INSERT_SQL)
+        for name, columns in INDEXES.items():
+            conn.execute(f"CREATE INDEX {name} ON {VIEW_TABLE} ({columns})")
+        install_triggers(conn)
+    conn.execute(f"ANALYZE {VIEW_TABLE}")
+    return conn.execute(f"SELECT COUNT(*) FROM {VIEW_TABLE}").fetchone()[0]
+
+
+def refresh_view(conn: sqlite3.Connection) -> tuple[int, int, int]:
+    """
+    Досинхронизация без пересборки: удаляет строки, которых SELECT_SQL больше не дает (нет связи
+    в blackouts_buildings или справочной записи), добавляет недостающие пары и переписывает строки,
+    колонки которых разошлись с SELECT_SQL (изменения, сделанные при снятых триггерах).
+    Схему таблицы и индексы не трогает — после их изменения нужна полная сборка build_view.
+    Возвращает (удалено, добавлено, обновлено).
+    """
+    changed = " OR ".join(f"v.{column} IS NOT f.{column}" for column in VIEW_COLUMNS[2:])
+    with conn:
+        deleted = conn.execute(f"""
+            DELETE FROM {VIEW_TABLE}
+            WHERE NOT EXISTS (
+                SELECT 1 {SOURCE_SQL}
+                WHERE bb.blackout_id = {VIEW_TABLE}.blackout_id AND bb.building_id = {VIEW_TABLE}.building_id
+            )
+        """).rowcount
+        updated = conn.execute(f"""
+            INSERT OR REPLACE INTO {VIEW_TABLE}
+            SELECT f.* FROM ({SELECT_SQL}) f
+            JOIN {VIEW_TABLE} v ON v.blackout_id = f.blackout_id AND v.building_id = f.building_id
+            WHERE {changed}
+        """).rowcount
+        inserted = conn.execute(f"""
+            {INSERT_SQL}
+            WHERE NOT EXISTS (
+                SELECT 1 FROM {VIEW_TABLE} v WHERE v.blackout_id = bb.blackout_id AND v.building_id = bb.building_id
+            )
+        """).rowcount
+        install_triggers(conn)
+    return deleted, inserted, updated
+
+
+def missing_objects(conn: sqlite3.Connection) -> list[str]:
+    """Таблица, индексы и триггеры read-модели, которых нет в базе."""
+    existing = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'index', 'trigger')")}
+    expected = [VIEW_TABLE, *INDEXES, *trigger_statements()]
+    return [name for name in expected if name not in existing]
+
+
+def check_dataset_file(dataset_path: str | None):
+    """Файл базы есть и не пуст — иначе sqlite3 молча создаст пустую базу или сообщит невнятную ошибку."""
+    if not dataset_path or not os.path.isfile(dataset_path):
+        raise RuntimeError(f"Файл базы {dataset_path!r} не найден: укажите DATABASE_PATH (или DATASET_SHARDS) на dataset.db")
+    if os.path.getsize(dataset_path) == 0:
+        raise RuntimeError(f"Файл базы {dataset_path} пуст: положите на его место dataset.db с данными")
+
+
+def check_view(dataset_path: str):
+    """
+    Проверка при старте сервиса: read-модель собирается отдельным шагом развертывания,
+    сам сервис базу не меняет. Без файла базы, таблицы, индексов или триггеров старт прерывается.
+    """
+    check_dataset_file(dataset_path)
+    conn = sqlite3.connect(f"file:{dataset_path}?mode=ro", uri=True)
+    try:
+        missing = missing_objects(conn)
+    finally:
+        conn.close()
+    if missing:
+        raise RuntimeError(
+            f"В {dataset_path} нет read-модели {VIEW_TABLE} ({', '.join(missing)}). "
+            f"Соберите ее из папки backend: python -m core.read_model.blackout_view --dataset {dataset_path}"
+        )
+
+
+def ensure_view(dataset_path: str):
+    """Собирает read-модель, если ее еще нет (для офлайн-инструментов: выгрузки, шардов)."""
+    conn = sqlite3.connect(dataset_path)
+    try:
+        if not view_exists(conn):
+            started = time.perf_counter()
+            rows = build_view(conn)
+            print(f"Read-модель {VIEW_TABLE} собрана: {rows} строк за {time.perf_counter() - started:.1f} с")
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=f"Сборка и обновление read-модели {VIEW_TABLE}")
+    parser.add_argument("--dataset", required=True, help="Путь к dataset.db")
+    parser.add_argument("--refresh", action="store_true", help="Только досинхронизировать данные существующей таблицы (схему не меняет)")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.dataset)
+    started = time.perf_counter()
+    if args.refresh and view_exists(conn):
+        deleted, inserted, updated = refresh_view(conn)
+        print(f"{VIEW_TABLE}: удалено {deleted}, добавлено {inserted}, обновлено {updated} строк за {time.perf_counter() - started:.1f} с")
+    else:
+        rows = build_view(conn)
+        print(f"{VIEW_TABLE}: {rows} строк за {time.perf_counter() - started:.1f} с")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import argparse
+import sqlite3
+from datetime import datetime, timedelta
+
+from core.read_model.blackout_view import check_dataset_file
+
+# Журнал изменений отключений для дельта-синхронизации клиентов (GET /api/blackout/changes).
+# Триггеры на blackouts и blackouts_buildings пишут в blackout_changes строку на каждую вставку,
+# изменение и удаление; seq (AUTOINCREMENT) монотонно растет и не переиспользуется — это и есть токен версии.
+# building_id = NULL означает изменение отключения целиком (всех его зданий).
+# Старые записи можно удалять (--prune-days): клиент с токеном старше удаленных получит reset
+# и перезагрузит список целиком.
+#
+# Установка — шаг развертывания (сервис при старте только проверяет журнал). Из папки backend:
+#   python -m core.read_model.change_log --dataset ../../databases/dataset.db --prune-days 30
+
+CHANGES_TABLE = "blackout_changes"
+STATE_TABLE = "blackout_changes_state"
+
+CREATE_STATEMENTS = [
+    f"""
+    CREATE TABLE IF NOT EXISTS {CHANGES_TABLE} (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        blackout_id TEXT NOT NULL,
+        building_id TEXT,
+        op TEXT NOT NULL,
+        changed_at TEXT NOT NULL DEFAULT (datetime('now'))
+    )
+    """,
+    # Граница удаленной части журнала: токены не старше нее еще можно обслужить
+    f"""
+    CREATE TABLE IF NOT EXISTS {STATE_TABLE} (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        pruned_through INTEGER NOT NULL
+    )
+    """,
+    f"INSERT OR IGNORE INTO {STATE_TABLE} (id, pruned_through) VALUES (1, 0)",
+    f"CREATE INDEX IF NOT EXISTS ix_{CHANGES_TABLE}_changed_at ON {CHANGES_TABLE} (changed_at)",
+]
+
+
+def trigger_statements() -> dict[str, str]:
+    """Триггеры журнала: имя -> CREATE TRIGGER."""
+    log = f"INSERT INTO {CHANGES_TABLE} (blackout_id, building_id, op) VALUES"
+    triggers = {
+        "blackouts_insert": f"AFTER INSERT ON blackouts BEGIN {log} (NEW.id, NULL, 'insert'); END",
+        "blackouts_update": f"""
+            AFTER UPDATE ON blackouts BEGIN
+                {log} (NEW.id, NULL, 'update');
+                INSERT INTO {CHANGES_TABLE} (blackout_id, building_id, op) SELECT OLD.id, NULL, 'delete' WHERE OLD.id IS NOT NEW.id;
+            END""",
+        "blackouts_delete": f"AFTER DELETE ON blackouts BEGIN {log} (OLD.id, NULL, 'delete'); END",
+        "blackouts_buildings_insert": f"AFTER INSERT ON blackouts_buildings BEGIN {log} (NEW.blackout_id, NEW.building_id, 'insert'); END",
+        "blackouts_buildings_update": f"""
+            AFTER UPDATE ON blackouts_buildings BEGIN
+                {log} (OLD.blackout_id, OLD.building_id, 'delete');
+                {log} (NEW.blackout_id, NEW.building_id, 'insert');
+            END""",
+        "blackouts_buildings_delete": f"AFTER DELETE ON blackouts_buildings BEGIN {log} (OLD.blackout_id, OLD.building_id, 'delete'); END",
+    }
+    return {f"trg_{CHANGES_TABLE}_{name}": body for name, body in triggers.items()}
+
+
+def install_change_log(conn: sqlite3.Connection):
+    with conn:
+        for statement in CREATE_STATEMENTS:
+            conn.execute(statement)
+        for name, body in trigger_statements().items():
+            conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+            conn.execute(f"CREATE TRIGGER {name} {body}")
+
+
+def check_change_log(dataset_path: str):
+    """Проверка при старте сервиса: журнал и триггеры ставятся CLI или core.shard.split, сервис их только ищет."""
+    check_dataset_file(dataset_path)
+    conn = sqlite3.connect(f"file:{dataset_path}?mode=ro", uri=True)
+    try:
+        existing = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')")}
+    finally:
+        conn.close()
+    missing = [name for name in (CHANGES_TABLE, STATE_TABLE, *trigger_statements()) if name not in existing]
+    if missing:
+        raise RuntimeError(
+            f"В {dataset_path} нет журнала изменений ({', '.join(missing)}). "
+            f"Установите его из папки backend: python -m core.read_model.change_log --dataset {dataset_path}"
+        )
+
+
+def ensure_change_log(dataset_path: str):
+    """Создает журнал и триггеры (повторный вызов только обновляет триггеры)."""
+    conn = sqlite3.connect(dataset_path)
+    try:
+        install_change_log(conn)
+    finally:
+        conn.close()
+
+
+def prune_change_log(conn: sqlite3.Connection, older_than: datetime) -> int:
+    """Удаляет записи старше older_than и сдвигает pruned_through; возвращает число удаленных."""
+    with conn:
+        last_seq = conn.execute(
+            f"SELECT MAX(seq) FROM {CHANGES_TABLE} WHERE changed_at < ?", (older_than.strftime("%Y-%m-%d %H:%M:%S"),)
+        ).fetchone()[0]
+        if last_seq is None:
+            return 0
+        deleted = conn.execute(f"DELETE FROM {CHANGES_TABLE} WHERE seq <= ?", (last_seq,)).rowcount
+        conn.execute(f"UPDATE {STATE_TABLE} SET pruned_through = MAX(pruned_through, ?) WHERE id = 1", (last_seq,))
+    return deleted
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Журнал изменений отключений для дельта-синхронизации")
+    parser.add_argument("--dataset", required=True, help="Путь к dataset.db")
+    parser.add_argument("--prune-days", type=float, help="Удалить записи старше стольких дней")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.dataset)
+    install_change_log(conn)
+    if args.prune_days is not None:
+        deleted = prune_change_log(conn, datetime.utcnow() - timedelta(days=args.prune_days))
+        print(f"Удалено записей журнала: {deleted}")
+    count, last_seq = conn.execute(f"SELECT COUNT(*), MAX(seq) FROM {CHANGES_TABLE}").fetchone()
+    pruned_through = conn.execute(f"SELECT pruned_through FROM {STATE_TABLE}").fetchone()[0]
+    print(f"Журнал {CHANGES_TABLE}: {count} записей, последний токен {last_seq or pruned_through}, удалено до {pruned_through}")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
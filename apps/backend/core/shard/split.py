@@ -0,0 +1,128 @@
+import argparse
+import json
+import os
+import sqlite3
+import time
+
+from core.read_model.blackout_view import VIEW_TABLE, ensure_view
+from core.read_model.change_log import CHANGES_TABLE, STATE_TABLE, ensure_change_log
+
+# Разбиение dataset.db на шарды по городам: dataset_<id города>.db и карта shards.json.
+# В шард города попадают его город, улицы и здания, связи blackouts_buildings этих зданий и их отключения
+# (отключение, задевшее здания двух городов, есть в обоих шардах со своими зданиями).
+# Справочники районов небольшие и копируются целиком. Read-модель и журнал изменений строятся заново в каждом шарде.
+# Исходная база не меняется; шард пишется во временный файл и подменяется целиком.
+#
+# Из папки backend:
+#   python -m core.shard.split --dataset ../../databases/dataset.db --output ../../databases/shards
+# Сервис на шардах: DATASET_SHARDS=../../databases/shards/shards.json
+
+MAP_FILE = "shards.json"
+
+# Производные таблицы: в шарде собираются заново
+DERIVED_TABLES = {VIEW_TABLE, CHANGES_TABLE, STATE_TABLE}
+
+# Таблица -> условие отбора строк шарда (таблицы не из списка копируются целиком).
+# Порядок важен: условия ссылаются на уже заполненные таблицы шарда.
+CITY_FILTERS = {
+    "cities": "id = :city_id",
+    "streets": "city_id = :city_id",
+    "buildings": "city_id = :city_id",
+    "blackouts_buildings": "building_id IN (SELECT id FROM main.buildings)",
+    "blackouts": "id IN (SELECT blackout_id FROM main.blackouts_buildings)",
+}
+
+
+def source_schema(conn: sqlite3.Connection) -> tuple[list[tuple[str, str]], list[str]]:
+    """(таблица, CREATE TABLE) и CREATE INDEX исходной базы без производных таблиц."""
+    rows = conn.execute(
+        "SELECT type, name, tbl_name, sql FROM sqlite_master "
+        "WHERE type IN ('table', 'index') AND sql IS NOT NULL AND name NOT LIKE 'sqlite_%'"
+    ).fetchall()
+    tables = [(name, sql) for kind, name, table, sql in rows if kind == "table" and name not in DERIVED_TABLES]
+    indexes = [sql for kind, name, table, sql in rows if kind == "index" and table not in DERIVED_TABLES]
+    # Сначала таблицы с условиями в порядке CITY_FILTERS, потом остальные
+    order = list(CITY_FILTERS)
+    tables.sort(key=lambda table: order.index(table[0]) if table[0] in order else len(order))
+    return tables, indexes
+
+
+def write_shard(dataset_path: str, shard_path: str, city_id: str, tables: list[tuple[str, str]], indexes: list[str]) -> dict[str, int]:
+    """Собирает шард города во временном файле и подменяет им shard_path; возвращает число строк по таблицам."""
+    tmp_path = shard_path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    conn = sqlite3.connect(tmp_path)
+    counts = {}
+    try:
+        conn.execute("ATTACH DATABASE ? AS src", (dataset_path,))
+        with conn:
+            for table, create_sql in tables:
+                conn.execute(create_sql)
+                where = CITY_FILTERS.get(table)
+                select_sql = f'SELECT * FROM src."{table}"' + (f" WHERE {where}" if where else "")
+                counts[table] = conn.execute(f'INSERT INTO main."{table}" {select_sql}', {"city_id": city_id}).rowcount
+            for create_sql in indexes:
+                conn.execute(create_sql)
+        conn.execute("DETACH DATABASE src")
+        conn.execute("ANALYZE")
+    finally:
+        conn.close()
+
+    ensure_view(tmp_path)
+    ensure_change_log(tmp_path)
+    os.replace(tmp_path, shard_path)
+    return counts
+
+
+def split_dataset(dataset_path: str, output_dir: str) -> dict:
+    os.makedirs(output_dir, exist_ok=True)
+    conn = sqlite3.connect(dataset_path)
+    tables, indexes = source_schema(conn)
+    cities = conn.execute("SELECT id, name FROM cities ORDER BY name").fetchall()
+    source_counts = {table: conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0] for table, _ in tables}
+    orphan_buildings = conn.execute(
+        "SELECT COUNT(*) FROM buildings WHERE city_id IS NULL OR city_id NOT IN (SELECT id FROM cities)"
+    ).fetchone()[0]
+    conn.close()
+
+    shards = []
+    for city_id, city in cities:
+        started = time.perf_counter()
+        file_name = f"dataset_{city_id}.db"
+        counts = write_shard(dataset_path, os.path.join(output_dir, file_name), city_id, tables, indexes)
+        shards.append({"city_id": city_id, "city": city, "path": file_name, "rows": counts})
+        print(
+            f"{city}: зданий {counts.get('buildings', 0)}, отключений {counts.get('blackouts', 0)}, "
+            f"связей {counts.get('blackouts_buildings', 0)} за {time.perf_counter() - started:.1f} с"
+        )
+
+    shard_map = {"source": os.path.abspath(dataset_path), "shards": shards}
+    map_path = os.path.join(output_dir, MAP_FILE)
+    with open(map_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(shard_map, f, ensure_ascii=False, indent=2)
+    os.replace(map_path + ".tmp", map_path)
+
+    # Каждое здание и каждая связь должны оказаться ровно в одном шарде
+    for table in ("buildings", "blackouts_buildings"):
+        total = sum(shard["rows"].get(table, 0) for shard in shards)
+        if total != source_counts.get(table, 0):
+            print(f"Внимание: {table} в шардах {total}, в исходной базе {source_counts.get(table, 0)}")
+    if orphan_buildings:
+        print(f"Внимание: {orphan_buildings} зданий без города не попали ни в один шард")
+    return shard_map
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Разбиение dataset.db на шарды по городам")
+    parser.add_argument("--dataset", required=True, help="Путь к dataset.db")
+    parser.add_argument("--output", required=True, help="Папка для шардов и shards.json")
+    args = parser.parse_args()
+
+    split_dataset(args.dataset, args.output)
+    print(f"Карта шардов: {os.path.join(args.output, MAP_FILE)}")
+
+
+if __name__ == "__main__":
+    main()
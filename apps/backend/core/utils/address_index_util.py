@@ -0,0 +1,401 @@
+import asyncio
+import bisect
+import heapq
+import re
+import time
+from dataclasses import dataclass, field
+from itertools import combinations
+
+from core.config.settings import DIMENSION_CHECK_INTERVAL_S
+from core.models.geo import BuildingOrm, CityOrm, StreetOrm
+from core.utils.dimension_util import load_table_version
+from core.utils.metrics_util import metrics
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Нечеткий поиск адресов в памяти процесса: улицы разбираются на слова (без типа улицы, ё -> е),
+# по словам строится индекс удалений в духе SymSpell — опечатка ищется пересечением «слов без 1-2 букв»,
+# а не перебором словаря. Ввод в латинской раскладке переводится в русскую, номер дома сравнивается точно
+# (дома, номер которых только начинается с введенного, идут ниже). Весь поиск — словари и bisect, без запросов к базе.
+
+# Тип улицы -> каноническое сокращение; в запросе тип не обязателен и только влияет на порядок
+STREET_TYPES = {
+    **dict.fromkeys(["ул", "улица"], "ул"),
+    **dict.fromkeys(["пр", "пр-т", "пр-кт", "просп", "проспект"], "пр-т"),
+    **dict.fromkeys(["пер", "переулок"], "пер"),
+    **dict.fromkeys(["б-р", "бул", "бульвар"], "б-р"),
+    **dict.fromkeys(["ш", "шоссе"], "ш"),
+    **dict.fromkeys(["пл", "площадь"], "пл"),
+    **dict.fromkeys(["наб", "набережная"], "наб"),
+    **dict.fromkeys(["пр-д", "проезд"], "пр-д"),
+    **dict.fromkeys(["туп", "тупик"], "туп"),
+    **dict.fromkeys(["пос", "поселок"], "пос"),
+    **dict.fromkeys(["с", "село"], "с"),
+    **dict.fromkeys(["о", "остров"], "о"),
+    **dict.fromkeys(["п-ов", "полуостров"], "п-ов"),
+    **dict.fromkeys(["у", "урочище"], "у"),
+    **dict.fromkeys(["мкр", "микрорайон"], "мкр"),
+    **dict.fromkeys(["кв-л", "квартал"], "кв-л"),
+}
+ORDINAL_SUFFIXES = {"я", "й", "ая", "ый", "ий", "ой", "ья", "го", "ого"}
+HOUSE_LETTERS = "абвгдежзик"
+
+# Латинская раскладка -> русская (тот же физический ключ) и похожие латинские буквы для литеры дома
+KEYBOARD_LAYOUT = str.maketrans("qwertyuiop[]asdfghjkl;'zxcvbnm,.`", "йцукенгшщзхъфывапролджэячсмитьбюё")
+HOUSE_LETTER_LOOKALIKES = {"a": "а", "b": "б", "v": "в", "g": "г", "e": "е", "c": "с", "k": "к"}
+
+PUNCTUATION_RE = re.compile(r"[.,;:()\"'«»\[\]{}!?]+")
+ORDINAL_RE = re.compile(r"^(\d+)(?:-?(я|й|ая|ый|ий|ой|ья|го|ого))$")
+HOUSE_RE = re.compile(r"^\d+[а-я]?(?:/\d+[а-я]?)?$")
+NUMBER_KEY_RE = re.compile(r"^(\d*)(.*)$")
+
+# Веса ранжирования: чем меньше сумма, тем выше адрес
+COST_PREFIX = 0.25          # слово запроса — начало слова улицы (ввод еще не закончен)
+COST_SUBSTRING = 0.5        # слово запроса — часть слова улицы
+COST_FUZZY_PREFIX = 0.25    # добавка к опечатке в начале слова
+COST_EXTRA_WORD = 0.05      # слово улицы, не упомянутое в запросе
+COST_EXTRA_NUMBER = 0.1     # номер улицы (1-я, 100-летия), не упомянутый в запросе
+COST_TYPE_MISMATCH = 0.5    # тип из запроса у улицы другой
+COST_HOUSE_PREFIX = 0.5     # номер дома только начинается с введенного
+
+MIN_PREFIX_INDEX_LEN = 4
+MATCH_CACHE_SIZE = 10000
+
+
+def max_distance(length: int) -> int:
+    """Допустимое число опечаток в слове: короткие слова — только точно или началом."""
+    if length <= 3:
+        return 0
+    if length <= 6:
+        return 1
+    return 2
+
+
+def deletes(word: str, distance: int) -> set[str]:
+    """Все варианты слова без 0..distance букв (ключи индекса SymSpell)."""
+    variants = {word}
+    for count in range(1, min(distance, len(word) - 1) + 1):
+        for positions in combinations(range(len(word)), count):
+            variants.add("".join(char for i, char in enumerate(word) if i not in positions))
+    return variants
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Расстояние Дамерау-Левенштейна (перестановка соседних букв — одна опечатка); limit + 1, если больше limit."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous_previous, previous = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous_previous, previous = previous, current
+    return previous[-1]
+
+
+def normalize_house_number(number: str) -> str:
+    number = number.lower().replace("ё", "е").replace(" ", "")
+    return "".join(HOUSE_LETTER_LOOKALIKES.get(char, char) for char in number)
+
+
+def house_number_key(number: str) -> tuple[int, str]:
+    """Естественный порядок номеров: 2 < 10 < 10А."""
+    digits, rest = NUMBER_KEY_RE.match(number).groups()
+    return (int(digits) if digits else 0, rest)
+
+
+def _from_latin_layout(raw: str) -> str:
+    if re.fullmatch(r"\d+[a-z]", raw):
+        # Литера дома: 118f (раскладка) или 118a (похожая буква)
+        letter = raw[-1].translate(KEYBOARD_LAYOUT)
+        if letter not in HOUSE_LETTERS:
+            letter = HOUSE_LETTER_LOOKALIKES.get(raw[-1], letter)
+        return raw[:-1] + letter
+    return raw.translate(KEYBOARD_LAYOUT)
+
+
+@dataclass
+class ParsedQuery:
+    words: list[str] = field(default_factory=list)
+    types: set[str] = field(default_factory=set)
+    street_numbers: set[str] = field(default_factory=set)  # 1-я, 100-летия; число без суффикса до или между словами
+    house: str | None = None                               # последнее число после слов (или единственное)
+
+
+def parse_text(text: str) -> ParsedQuery:
+    """Разбор строки (запроса или названия улицы) на слова, типы и номера."""
+    parsed = ParsedQuery()
+    tokens = []
+    for raw in text.lower().split():
+        if re.search(r"[a-z]", raw) and not re.search(r"[а-яё]", raw):
+            raw = _from_latin_layout(raw)
+        tokens.extend(PUNCTUATION_RE.sub(" ", raw.replace("ё", "е")).split())
+
+    # Числа и номера с литерой в порядке ввода: (номер, позиция среди слов)
+    numbers: list[tuple[str, int]] = []
+    for token in tokens:
+        if token in STREET_TYPES:
+            parsed.types.add(STREET_TYPES[token])
+            continue
+        pieces = [piece for piece in token.split("-") if piece]
+        for position, piece in enumerate(pieces):
+            if piece.isdigit() and position + 1 < len(pieces):
+                parsed.street_numbers.add(piece)  # 1-я, 100-летия: число — часть названия улицы
+            elif (ordinal := ORDINAL_RE.match(piece)) is not None:
+                parsed.street_numbers.add(ordinal.group(1))
+            elif HOUSE_RE.match(piece):
+                numbers.append((piece, len(parsed.words)))
+            elif position > 0 and piece in ORDINAL_SUFFIXES and pieces[position - 1].isdigit():
+                continue
+            elif piece.isalpha():
+                if len(piece) == 1 and piece in HOUSE_LETTERS and numbers and numbers[-1][1] == len(parsed.words) and numbers[-1][0].isdigit():
+                    numbers[-1] = (numbers[-1][0] + piece, numbers[-1][1])  # «118 а»
+                else:
+                    parsed.words.append(piece)
+
+    # Дом — последнее число после всех слов; остальные числа относятся к названию улицы
+    if numbers and (numbers[-1][1] == len(parsed.words) or not parsed.words):
+        parsed.house = numbers.pop()[0]
+    parsed.street_numbers.update(number for number, _ in numbers)
+    return parsed
+
+
+@dataclass
+class IndexedStreet:
+    name: str
+    words: frozenset[str]
+    numbers: frozenset[str]
+    types: frozenset[str]
+    city_words: frozenset[str]
+    buildings: list[tuple[str, str, str]] = field(default_factory=list)  # (нормализованный номер, номер, id), по возрастанию
+
+
+class AddressIndex:
+    """
+    Индекс улиц и домов для нечеткого поиска. Версия — load_table_version улиц, домов и городов
+    каждого шарда; проверяется не чаще раза в check_interval секунд, при изменении индекс строится заново
+    в отдельном потоке и подменяется целиком.
+    """
+
+    def __init__(self, check_interval: float):
+        self.check_interval = check_interval
+        self.streets: list[IndexedStreet] = []
+        self.word_streets: dict[str, set[int]] = {}
+        self.word_deletes: dict[str, set[tuple[str, int]]] = {}
+        self.vocabulary: list[str] = []
+        self.houses: list[tuple[str, int, int]] = []  # (нормализованный номер, улица, дом) для запросов без улицы
+        self._match_cache: dict[str, dict[str, float]] = {}
+        self.version: tuple | None = None
+        self.checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+        metrics.gauge("address_index_streets", lambda: len(self.streets))
+        metrics.gauge("address_index_keys", lambda: len(self.word_deletes))
+
+    async def ensure_fresh(self, sessions: list[AsyncSession]):
+        """sessions — по одной на шард; индекс общий для всех."""
+        if self.version is not None and time.monotonic() - self.checked_at < self.check_interval:
+            return
+        async with self._lock:
+            if self.version is not None and time.monotonic() - self.checked_at < self.check_interval:
+                return
+            version = tuple([
+                await load_table_version(session, [StreetOrm.name, BuildingOrm.number, CityOrm.name])
+                for session in sessions
+            ])
+            if version != self.version:
+                stmt = (
+                    select(BuildingOrm.id, BuildingOrm.number, StreetOrm.name.label("street"), CityOrm.name.label("city"))
+                    .join(StreetOrm, StreetOrm.id == BuildingOrm.street_id)
+                    .outerjoin(CityOrm, CityOrm.id == StreetOrm.city_id)
+                )
+                rows = [row for session in sessions for row in (await session.execute(stmt)).all()]
+                await asyncio.to_thread(self._build, rows)
+                self.version = version
+                metrics.inc("address_index_reloads")
+            self.checked_at = time.monotonic()
+
+    def _build(self, rows):
+        streets: list[IndexedStreet] = []
+        street_index: dict[tuple[str, str | None], int] = {}
+        for building_id, number, street, city in rows:
+            key = (street, city)
+            if key not in street_index:
+                parsed = parse_text(street or "")
+                street_index[key] = len(streets)
+                streets.append(IndexedStreet(
+                    name=street,
+                    words=frozenset(parsed.words),
+                    numbers=frozenset(parsed.street_numbers | ({parsed.house} if parsed.house else set())),
+                    types=frozenset(parsed.types),
+                    city_words=frozenset(parse_text(city or "").words),
+                ))
+            streets[street_index[key]].buildings.append((normalize_house_number(number or ""), number, building_id))
+
+        word_streets: dict[str, set[int]] = {}
+        houses = []
+        for street_id, street in enumerate(streets):
+            street.buildings.sort()
+            for word in street.words | street.city_words:
+                word_streets.setdefault(word, set()).add(street_id)
+            houses.extend((number_norm, street_id, position) for position, (number_norm, _, _) in enumerate(street.buildings))
+        houses.sort()
+
+        # Ключ -> (слово, длина начала слова); 0 — слово целиком (до 2 опечаток), иначе начало (1 опечатка)
+        word_deletes: dict[str, set[tuple[str, int]]] = {}
+        for word in word_streets:
+            for variant in deletes(word, max_distance(len(word))):
+                word_deletes.setdefault(variant, set()).add((word, 0))
+            for length in range(MIN_PREFIX_INDEX_LEN, len(word)):
+                for variant in deletes(word[:length], 1):
+                    word_deletes.setdefault(variant, set()).add((word, length))
+
+        self.streets, self.word_streets, self.word_deletes = streets, word_streets, word_deletes
+        self.vocabulary = sorted(word_streets)
+        self.houses = houses
+        self._match_cache = {}
+
+    def match_word(self, query_word: str) -> dict[str, float]:
+        """Слова индекса, подходящие под слово запроса: слово -> штраф. Результаты кэшируются до перестройки индекса."""
+        matches = self._match_cache.get(query_word)
+        if matches is None:
+            matches = self._match_word(query_word)
+            if len(self._match_cache) >= MATCH_CACHE_SIZE:
+                self._match_cache.clear()
+            self._match_cache[query_word] = matches
+        return matches
+
+    def _match_word(self, query_word: str) -> dict[str, float]:
+        matches: dict[str, float] = {}
+
+        # Точное совпадение и начало слова — bisect по отсортированному словарю
+        position = bisect.bisect_left(self.vocabulary, query_word)
+        while position < len(self.vocabulary) and self.vocabulary[position].startswith(query_word):
+            word = self.vocabulary[position]
+            matches[word] = 0.0 if word == query_word else COST_PREFIX
+            position += 1
+
+        if len(query_word) >= 3:
+            for word in self.vocabulary:
+                if query_word in word and word not in matches:
+                    matches[word] = COST_SUBSTRING
+
+        # Опечатки ищутся, только если слово не нашлось как есть (как режим closest в SymSpell)
+        distance = max_distance(len(query_word))
+        if matches or not distance:
+            return matches
+
+        checked = set()
+        for variant in deletes(query_word, distance):
+            for candidate in self.word_deletes.get(variant, ()):
+                if candidate in checked:
+                    continue
+                checked.add(candidate)
+                word, prefix_length = candidate
+                if prefix_length == 0:
+                    found = edit_distance(query_word, word, distance)
+                    cost = found
+                else:
+                    found = edit_distance(query_word, word[:prefix_length], 1)
+                    cost = found + COST_FUZZY_PREFIX
+                if found <= (distance if prefix_length == 0 else 1) and cost < matches.get(word, float("inf")):
+                    matches[word] = cost
+        return matches
+
+    def search(self, text: str, limit: int) -> list[dict]:
+        """Адреса по вводу пользователя, лучшие первыми."""
+        metrics.inc("address_search_requests")
+        query = parse_text(text)
+
+        if not query.words:
+            # Только номер дома — по всем улицам
+            if query.house is None or query.street_numbers:
+                return []
+            results = self._houses_anywhere(normalize_house_number(query.house), limit)
+            results.sort(key=lambda result: result[:3])
+            return [result[3] for result in results[:limit]]
+
+        street_costs: dict[int, float] = {}
+        for index, query_word in enumerate(query.words):
+            word_costs: dict[int, float] = {}
+            for word, cost in self.match_word(query_word).items():
+                for street_id in self.word_streets[word]:
+                    if cost < word_costs.get(street_id, float("inf")):
+                        word_costs[street_id] = cost
+            if index == 0:
+                street_costs = word_costs
+            else:
+                street_costs = {
+                    street_id: street_costs[street_id] + cost
+                    for street_id, cost in word_costs.items()
+                    if street_id in street_costs
+                }
+            if not street_costs:
+                return []
+
+        # Улицы — от лучшей; штраф улицы — нижняя граница штрафа ее домов, поэтому
+        # как только набрано limit адресов, улицы хуже худшего из них можно не смотреть
+        results: list[tuple] = []
+        bound = None
+        for street_id, cost in sorted(street_costs.items(), key=lambda item: (item[1], self.streets[item[0]].name)):
+            if bound is not None and cost > bound:
+                break
+            results.extend(self._street_results(street_id, cost, query))
+            if len(results) >= limit:
+                bound = heapq.nsmallest(limit, (result[0] for result in results))[-1]
+
+        results.sort(key=lambda result: result[:3])
+        return [result[3] for result in results[:limit]]
+
+    def _street_results(self, street_id: int, cost: float, query: ParsedQuery) -> list[tuple]:
+        street = self.streets[street_id]
+        if not query.street_numbers <= street.numbers:
+            return []
+
+        cost += COST_EXTRA_WORD * len(street.words - set(query.words))
+        cost += COST_EXTRA_NUMBER * len(street.numbers - query.street_numbers)
+        cost += COST_TYPE_MISMATCH * len(query.types - street.types)
+
+        if query.house is None:
+            selected = [(cost, building) for building in street.buildings]
+        else:
+            house = normalize_house_number(query.house)
+            start = bisect.bisect_left(street.buildings, (house,))
+            selected = []
+            for building in street.buildings[start:]:
+                if not building[0].startswith(house):
+                    break
+                selected.append((cost if building[0] == house else cost + COST_HOUSE_PREFIX, building))
+
+        return [
+            (result_cost, street.name, house_number_key(number), {"street": street.name, "building": number, "building_id": building_id})
+            for result_cost, (_, number, building_id) in selected
+        ]
+
+    def _houses_anywhere(self, house: str, limit: int) -> list[tuple]:
+        """Дома с таким номером на всех улицах; номера, начинающиеся с него, — только если точных меньше limit."""
+        results = []
+        start = bisect.bisect_left(self.houses, (house,))
+        for number_norm, street_id, position in self.houses[start:]:
+            if not number_norm.startswith(house):
+                break
+            exact = number_norm == house
+            if not exact and len(results) >= limit:
+                break
+            street = self.streets[street_id]
+            _, number, building_id = street.buildings[position]
+            results.append((
+                0.0 if exact else COST_HOUSE_PREFIX,
+                street.name,
+                house_number_key(number),
+                {"street": street.name, "building": number, "building_id": building_id},
+            ))
+        return results
+
+
+address_index = AddressIndex(check_interval=DIMENSION_CHECK_INTERVAL_S)
@@ -0,0 +1,62 @@
+import asyncio
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Hashable
+
+from core.utils.metrics_util import metrics
+
+
+def time_bucket(value: datetime, seconds: float) -> datetime | int:
+    """Номер интервала длиной seconds, в который попадает value (при seconds <= 0 — само значение)."""
+    if seconds <= 0:
+        return value
+    return int(value.timestamp() // seconds)
+
+
+class SingleFlight:
+    """
+    Объединение одинаковых одновременных вызовов (single-flight).
+    Первый вызов с ключом (лидер) выполняет работу, остальные с тем же ключом
+    ждут его результата или исключения. После завершения ключ забывается — это не кэш.
+    Если лидер отменен (например, клиент отключился), ожидающие повторяют попытку сами.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._in_flight: dict[Hashable, asyncio.Future] = {}
+        self.waiting = 0
+
+        metrics.gauge(f"{name}_in_flight", lambda: len(self._in_flight))
+        metrics.gauge(f"{name}_waiting", lambda: self.waiting)
+
+    async def run(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        while (future := self._in_flight.get(key)) is not None:
+            metrics.inc(f"{self.name}_coalesced")
+            self.waiting += 1
+            try:
+                # shield: отмена ожидающего не должна отменять общий результат
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                metrics.inc(f"{self.name}_leader_cancelled")
+            finally:
+                self.waiting -= 1
+
+        future = asyncio.get_running_loop().create_future()
+        # Исключение лидера без ожидающих не должно попадать в лог как «never retrieved»
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._in_flight[key] = future
+        metrics.inc(f"{self.name}_leaders")
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._in_flight[key]
@@ -0,0 +1,59 @@
+import msgpack
+import numpy as np
+
+# Колоночное представление списков для клиентов карты.
+# Вместо массива объектов — параллельные массивы по полям; повторяющиеся строки (типы, улицы,
+# районы) заменяются индексами в общем словаре `strings`, id передаются как есть.
+# В MessagePack числовые столбцы и индексы упаковываются в little-endian бинарные массивы
+# (Float64Array / BigInt64Array / Uint32Array на стороне JS без разбора), а 32-символьные
+# шестнадцатеричные id — подряд по 16 байт.
+
+NULL_CODE = 0xFFFFFFFF
+HEX_ID_BYTES = 16
+
+
+def to_columns(rows: list[tuple], fields: tuple[str, ...], dictionary_fields: set[str]) -> dict:
+    """Кортежи строк -> {"count", "strings", <поле>: [...]}; поля из dictionary_fields — индексы в strings."""
+    strings: dict[str, int] = {}
+    columns = {"count": len(rows), "strings": []}
+    for field, values in zip(fields, zip(*rows) if rows else [()] * len(fields)):
+        if field in dictionary_fields:
+            columns[field] = [None if value is None else strings.setdefault(value, len(strings)) for value in values]
+        else:
+            columns[field] = list(values)
+    columns["strings"] = list(strings)
+    return columns
+
+
+def pack_hex_ids(values: list) -> bytes | None:
+    """Id по 16 байт подряд; None — если хоть один id не 32 шестнадцатеричных символа (тогда остается список)."""
+    try:
+        packed = b"".join(bytes.fromhex(value) for value in values)
+    except (TypeError, ValueError):
+        return None
+    return packed if len(packed) == HEX_ID_BYTES * len(values) else None
+
+
+def pack_msgpack(columns: dict, packed_dtypes: dict[str, str], dictionary_fields: set[str], hex_id_fields: set[str] = frozenset()) -> bytes:
+    """
+    MessagePack с упакованными столбцами: packed_dtypes — numpy dtype для числовых полей,
+    индексы словаря — '<u4' (NULL_CODE вместо отсутствующего значения), id из hex_id_fields — по 16 байт.
+    Упаковываются только поля, которые есть в columns.
+    """
+    packed = dict(columns)
+    for field, dtype in packed_dtypes.items():
+        values = columns[field]
+        if np.dtype(dtype).kind == "f":
+            array = np.array([np.nan if value is None else value for value in values], dtype=dtype)
+        else:
+            array = np.array([-1 if value is None else value for value in values], dtype=dtype)
+        packed[field] = array.tobytes()
+    for field in dictionary_fields & columns.keys():
+        packed[field] = np.array(
+            [NULL_CODE if code is None else code for code in columns[field]], dtype="<u4"
+        ).tobytes()
+    for field in hex_id_fields & columns.keys():
+        ids = pack_hex_ids(columns[field])
+        if ids is not None:
+            packed[field] = ids
+    return msgpack.packb(packed, use_bin_type=True)
@@ -1,6 +1,6 @@
 import logging
 from functools import wraps
-from http.client import HTTPException
+from fastapi import HTTPException
 
 from core.common.common_exceptions import IntervalServerErrorHttpException
 
@@ -0,0 +1,83 @@
+import asyncio
+import time
+
+from core.config.settings import DIMENSION_CHECK_INTERVAL_S
+from core.models.geo import BigFolkDistrictOrm, DistrictOrm, FolkDistrictOrm
+from core.utils.metrics_util import metrics
+from sqlalchemy import func, literal_column, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Справочники районов трех уровней маленькие и почти не меняются,
+# поэтому держим их в памяти: фильтр по имени района переводится в id без джойнов.
+
+# Колонка read-модели с id района -> таблица справочника
+DIMENSION_COLUMNS = {
+    "district_id": DistrictOrm,
+    "folk_district_id": FolkDistrictOrm,
+    "big_folk_district_id": BigFolkDistrictOrm,
+}
+DIMENSION_TABLES = list(DIMENSION_COLUMNS.values())
+
+
+async def load_table_version(session: AsyncSession, columns: list) -> tuple:
+    """
+    Версия таблиц одним запросом: для каждой колонки — число строк, максимальный rowid
+    и суммарная длина значений ее таблицы. Меняется при вставке, удалении и переименовании.
+    """
+    stmt = select(*[
+        select(
+            func.count()
+            .concat(":").concat(func.coalesce(func.max(literal_column("rowid")), 0))
+            .concat(":").concat(func.coalesce(func.sum(func.length(column)), 0))
+        ).select_from(column.class_).scalar_subquery()
+        for column in columns
+    ])
+    return tuple((await session.execute(stmt)).one())
+
+
+class DimensionCache:
+    """
+    Словари id -> имя для справочников районов в памяти процесса.
+    Версия — load_table_version по именам каждой таблицы;
+    проверяется не чаще раза в check_interval секунд, при изменении справочники перечитываются целиком.
+    """
+
+    def __init__(self, check_interval: float, name: str = "dimension"):
+        self.check_interval = check_interval
+        self.name = name
+        self.names: dict[str, dict[str, str]] = {}
+        self.version: tuple | None = None
+        self.checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+        metrics.gauge(f"{name}_rows", lambda: sum(len(names) for names in self.names.values()))
+
+    async def ensure_fresh(self, session: AsyncSession):
+        if self.version is not None and time.monotonic() - self.checked_at < self.check_interval:
+            return
+        async with self._lock:
+            if self.version is not None and time.monotonic() - self.checked_at < self.check_interval:
+                return
+            version = await load_table_version(session, [table.name for table in DIMENSION_TABLES])
+            if version != self.version:
+                await self._load(session)
+                self.version = version
+                metrics.inc(f"{self.name}_reloads")
+            self.checked_at = time.monotonic()
+
+    async def _load(self, session: AsyncSession):
+        names = {}
+        for table in DIMENSION_TABLES:
+            rows = (await session.execute(select(table.id, table.name))).all()
+            names[table.__tablename__] = {row.id: row.name for row in rows}
+        self.names = names
+
+    def resolve_district(self, name: str) -> dict[str, list[str]]:
+        """id районов всех трех уровней с таким именем — для фильтра без джойна по именам."""
+        return {
+            column: [dimension_id for dimension_id, dimension_name in self.names[table.__tablename__].items() if dimension_name == name]
+            for column, table in DIMENSION_COLUMNS.items()
+        }
+
+
+dimensions = DimensionCache(check_interval=DIMENSION_CHECK_INTERVAL_S)
@@ -0,0 +1,94 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from core.utils.metrics_util import metrics
+
+
+class OverloadedError(Exception):
+    """Работа отклонена: очередь переполнена или не уложились в дедлайн."""
+
+    def __init__(self, reason: str):
+        self.reason = reason
+        super().__init__(reason)
+
+
+class ConcurrencyLimiter:
+    """
+    Ограничивает число одновременных CPU-задач и длину очереди к ним.
+    Задачи выполняются в отдельном пуле потоков, чтобы не блокировать событийный цикл;
+    run_async ограничивает так же корутины (запросы к внешнему процессу).
+    Если очередь заполнена или дедлайн истек, бросается OverloadedError — вызывающий деградирует сам.
+    """
+
+    def __init__(self, name: str, max_concurrency: int, max_queue: int, deadline: float):
+        self.name = name
+        self.max_queue = max_queue
+        self.deadline = deadline
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix=name)
+        self.waiting = 0
+        self.active = 0
+
+        metrics.gauge(f"{name}_queue_depth", lambda: self.waiting)
+        metrics.gauge(f"{name}_active", lambda: self.active)
+
+    async def run(self, func, *args, deadline: float | None = None):
+        """
+        func(*args) в пуле потоков. deadline — момент time.monotonic(), к которому нужен ответ
+        (обычно отсчитан от прихода запроса); по умолчанию — self.deadline от вызова.
+        """
+        deadline = await self._acquire(deadline)
+
+        self.active += 1
+        future = asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        # Слот освобождается, только когда поток реально закончил работу, даже если запрос уже ушел по таймауту
+        future.add_done_callback(self._release)
+
+        try:
+            result = await asyncio.wait_for(asyncio.shield(future), timeout=max(deadline - time.monotonic(), 0))
+        except asyncio.TimeoutError:
+            metrics.inc(f"{self.name}_shed_deadline")
+            raise OverloadedError("deadline")
+
+        metrics.inc(f"{self.name}_completed")
+        return result
+
+    async def run_async(self, func, *args, deadline: float | None = None):
+        """То же для корутины func(*args) — например, вызова отдельного процесса инференса; по дедлайну она отменяется."""
+        deadline = await self._acquire(deadline)
+
+        self.active += 1
+        try:
+            result = await asyncio.wait_for(func(*args), timeout=max(deadline - time.monotonic(), 0))
+        except asyncio.TimeoutError:
+            metrics.inc(f"{self.name}_shed_deadline")
+            raise OverloadedError("deadline")
+        finally:
+            self._release(None)
+
+        metrics.inc(f"{self.name}_completed")
+        return result
+
+    async def _acquire(self, deadline: float | None) -> float:
+        """Занимает слот или бросает OverloadedError; возвращает дедлайн вызова."""
+        if deadline is None:
+            deadline = time.monotonic() + self.deadline
+
+        if self._semaphore.locked() and self.waiting >= self.max_queue:
+            metrics.inc(f"{self.name}_shed_queue_full")
+            raise OverloadedError("queue_full")
+
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=max(deadline - time.monotonic(), 0))
+        except asyncio.TimeoutError:
+            metrics.inc(f"{self.name}_shed_deadline")
+            raise OverloadedError("deadline")
+        finally:
+            self.waiting -= 1
+        return deadline
+
+    def _release(self, _future):
+        self.active -= 1
+        self._semaphore.release()
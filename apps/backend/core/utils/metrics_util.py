@@ -0,0 +1,24 @@
+from collections import defaultdict
+from typing import Callable
+
+
+class MetricsRegistry:
+    """Простейший реестр метрик процесса: счетчики и гейджи, вычисляемые при чтении."""
+
+    def __init__(self):
+        self.counters: dict[str, int] = defaultdict(int)
+        self.gauges: dict[str, Callable[[], float]] = {}
+
+    def inc(self, name: str, value: int = 1):
+        self.counters[name] += value
+
+    def gauge(self, name: str, getter: Callable[[], float]):
+        self.gauges[name] = getter
+
+    def snapshot(self) -> dict[str, float]:
+        values = {name: getter() for name, getter in self.gauges.items()}
+        values.update(self.counters)
+        return dict(sorted(values.items()))
+
+
+metrics = MetricsRegistry()
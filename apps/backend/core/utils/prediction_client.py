@@ -0,0 +1,116 @@
+import asyncio
+import itertools
+import struct
+import time
+from datetime import datetime
+
+import msgpack
+
+from core.config.settings import PREDICTION_SOCKET
+from core.utils.metrics_util import metrics
+
+# Клиент отдельного процесса инференса (python -m core.nn.prediction_worker) по Unix-сокету.
+# Сообщения — msgpack с 4-байтным префиксом длины. Запрос {"id", "rows"}, ответ {"id", "predictions"} или {"id", "error"}.
+# Модуль не импортирует torch, gensim и pandas — API-воркеры с PREDICTION_MODE=worker остаются легкими.
+
+FRAME_HEADER = struct.Struct(">I")
+
+
+class PredictionWorkerError(Exception):
+    """Процесс инференса недоступен, вернул ошибку или не ответил вовремя."""
+
+
+def encode_frame(message: dict) -> bytes:
+    payload = msgpack.packb(message, default=_encode_value)
+    return FRAME_HEADER.pack(len(payload)) + payload
+
+
+async def read_frame(reader: asyncio.StreamReader) -> dict:
+    header = await reader.readexactly(FRAME_HEADER.size)
+    (length,) = FRAME_HEADER.unpack(header)
+    return msgpack.unpackb(await reader.readexactly(length))
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ")
+    raise TypeError(f"Не сериализуется: {type(value).__name__}")
+
+
+class PredictionClient:
+    """
+    Одно постоянное соединение на процесс; запросы мультиплексируются по id,
+    так что конкурентные вызовы не ждут друг друга. При обрыве соединение переоткрывается при следующем вызове.
+    """
+
+    def __init__(self, socket_path: str = PREDICTION_SOCKET, timeout: float = 2.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._ids = itertools.count()
+        self._connect_lock = asyncio.Lock()
+        self._writer: asyncio.StreamWriter | None = None
+        self._reader_task: asyncio.Task | None = None
+        self._pending: dict[int, asyncio.Future] = {}
+
+        metrics.gauge("prediction_worker_pending", lambda: len(self._pending))
+
+    async def predict(self, rows: list[dict], deadline: float | None = None) -> list[float | None]:
+        """
+        Длительности (часы) для батча входов predict_duration; PredictionWorkerError — если ответа нет.
+        deadline — момент time.monotonic(), общий для всего запроса; по умолчанию — timeout от вызова.
+        """
+        loop = asyncio.get_running_loop()
+        if deadline is None:
+            deadline = time.monotonic() + self.timeout
+        try:
+            writer, pending = await asyncio.wait_for(self._connection(), timeout=max(deadline - time.monotonic(), 0))
+        except (OSError, asyncio.TimeoutError) as e:
+            metrics.inc("prediction_worker_unavailable")
+            raise PredictionWorkerError(f"нет соединения с {self.socket_path}: {e!r}") from e
+
+        request_id = next(self._ids)
+        future = loop.create_future()
+        pending[request_id] = future
+        try:
+            writer.write(encode_frame({"id": request_id, "rows": rows}))
+            await writer.drain()
+            predictions = await asyncio.wait_for(future, timeout=max(deadline - time.monotonic(), 0))
+        except asyncio.TimeoutError as e:
+            metrics.inc("prediction_worker_timeout")
+            raise PredictionWorkerError("таймаут ответа процесса инференса") from e
+        except OSError as e:
+            metrics.inc("prediction_worker_unavailable")
+            raise PredictionWorkerError(f"ошибка отправки: {e!r}") from e
+        finally:
+            pending.pop(request_id, None)
+
+        metrics.inc("prediction_worker_completed")
+        return predictions
+
+    async def _connection(self) -> tuple[asyncio.StreamWriter, dict[int, asyncio.Future]]:
+        async with self._connect_lock:
+            if self._writer is None or self._writer.is_closing():
+                reader, self._writer = await asyncio.open_unix_connection(self.socket_path)
+                # Ожидающие ответы привязаны к соединению: при его обрыве ошибку получают только они
+                self._pending = {}
+                self._reader_task = asyncio.create_task(self._read_responses(reader, self._writer, self._pending))
+            return self._writer, self._pending
+
+    async def _read_responses(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, pending: dict[int, asyncio.Future]):
+        try:
+            while True:
+                message = await read_frame(reader)
+                future = pending.get(message["id"])
+                if future is None or future.done():
+                    continue
+                if "error" in message:
+                    future.set_exception(PredictionWorkerError(message["error"]))
+                else:
+                    future.set_result(message["predictions"])
+        except (asyncio.IncompleteReadError, OSError):
+            pass
+        finally:
+            writer.close()
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(PredictionWorkerError("соединение с процессом инференса разорвано"))
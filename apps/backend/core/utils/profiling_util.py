@@ -0,0 +1,211 @@
+import asyncio
+import cProfile
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from core.utils.common_util import logger
+
+# Профилирование одного запроса по требованию.
+# Middleware подключается только при PROFILING_ENABLED, поэтому в обычном режиме накладных расходов нет.
+# Профиль снимается, если в запросе есть заголовок X-Profile (значения: sample | cprofile).
+#   sample   — сэмплирующий профайлер, пишет свернутые стеки (.folded) для flamegraph.pl / speedscope
+#   cprofile — детерминированный cProfile, пишет .prof (snakeviz, pstats, flameprof)
+# SQL aiosqlite выполняет в потоке своего соединения, инференс — в пуле потоков ConcurrencyLimiter,
+# поэтому сэмплер снимает стеки всех потоков, и корень каждого стека — группа потока
+# («thread event-loop», «thread aiosqlite», «thread inference»). cProfile видит только поток цикла событий,
+# так что в режиме cprofile остальные потоки сэмплируются в соседний файл .threads.folded.
+# Профили видят весь процесс, поэтому профилируемый запрос выполняется один: новые запросы ждут его
+# окончания, а уже начатые он сам дожидается (не дольше drain_timeout). Если дождаться не удалось,
+# число параллельных запросов попадает в имя файла (_concurrent<N>) и в заголовок X-Profile-Concurrent.
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_FILE_HEADER = b"x-profile-file"
+PROFILE_SKIPPED_HEADER = b"x-profile-skipped"
+PROFILE_CONCURRENT_HEADER = b"x-profile-concurrent"
+
+# Листовые кадры простаивающих рабочих потоков (ожидание очереди): такие сэмплы не пишутся
+IDLE_FILES = {"threading.py", "queue.py"}
+IDLE_FRAMES = {("thread.py", "_worker")}
+
+
+def thread_group(thread: threading.Thread | None, loop_thread_id: int) -> str:
+    """Имя группы потока: потоки одного пула или одной библиотеки сворачиваются в одну ветку."""
+    if thread is None:
+        return "unknown"
+    if thread.ident == loop_thread_id:
+        return "event-loop"
+    module = type(thread).__module__.split(".")[0]
+    if module != "threading":
+        return module
+    return re.sub(r"[-_]?\d+$", "", thread.name) or thread.name
+
+
+class StackSampler:
+    """Периодически снимает стеки всех потоков процесса (кроме своего и skip_thread_id) и копит свернутые стеки."""
+
+    def __init__(self, loop_thread_id: int, interval: float, skip_thread_id: int | None = None):
+        self.loop_thread_id = loop_thread_id
+        self.interval = interval
+        self.skip_thread_id = skip_thread_id
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            threads = {thread.ident: thread for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id in (self._thread.ident, self.skip_thread_id):
+                    continue
+                if thread_id != self.loop_thread_id and self._is_idle(frame):
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                stack.append(f"thread {thread_group(threads.get(thread_id), self.loop_thread_id)}")
+                self.stacks[";".join(reversed(stack))] += 1
+
+    @staticmethod
+    def _is_idle(frame) -> bool:
+        file_name = os.path.basename(frame.f_code.co_filename)
+        return file_name in IDLE_FILES or (file_name, frame.f_code.co_name) in IDLE_FRAMES
+
+    def dump(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.items():
+                f.write(f"{stack} {count}\n")
+
+
+class ProfilingMiddleware:
+    """ASGI middleware: профилирует запрос целиком (роутинг, запросы SQLAlchemy, инференс, сериализация)."""
+
+    def __init__(self, app, output_dir: str, default_mode: str = "sample", interval_ms: float = 1.0, drain_timeout_ms: float = 5000):
+        self.app = app
+        self.output_dir = output_dir
+        self.default_mode = default_mode
+        self.interval = interval_ms / 1000
+        self.drain_timeout = drain_timeout_ms / 1000
+        # cProfile и сэмплер видят все, что выполняется в процессе, поэтому профилируем по одному запросу
+        self._lock = asyncio.Lock()
+        # Остальные HTTP-запросы: сколько выполняется, и открыт ли им вход (закрыт на время профиля)
+        self.in_flight = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._gate = asyncio.Event()
+        self._gate.set()
+        os.makedirs(self.output_dir, exist_ok=True)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        mode = self._requested_mode(scope)
+        if mode is None:
+            return await self._run_tracked(scope, receive, send)
+        if self._lock.locked():
+            # Уже профилируется другой запрос: отвечаем без профиля и сообщаем об этом
+            logger.info(f"Профиль запроса {scope['path']} ({mode}) пропущен: уже профилируется другой запрос")
+
+            async def send_skipped(message):
+                if message["type"] == "http.response.start":
+                    message = {**message, "headers": [*message.get("headers", []), (PROFILE_SKIPPED_HEADER, b"busy")]}
+                await send(message)
+
+            return await self._run_tracked(scope, receive, send_skipped)
+
+        async with self._lock:
+            self._gate.clear()
+            try:
+                await self._profile(scope, receive, send, mode)
+            finally:
+                self._gate.set()
+
+    async def _run_tracked(self, scope, receive, send):
+        """Обычный запрос: во время профиля ждет его окончания, затем учитывается в in_flight."""
+        if not self._gate.is_set():
+            await self._gate.wait()
+        self.in_flight += 1
+        self._idle.clear()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
+            if self.in_flight == 0:
+                self._idle.set()
+
+    async def _profile(self, scope, receive, send, mode: str):
+        # Новые запросы уже ждут у закрытого входа; дожидаемся начатых, чтобы профиль был только этого запроса
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout=self.drain_timeout)
+        except asyncio.TimeoutError:
+            pass
+        concurrent = self.in_flight
+        path = self._profile_path(scope, mode, concurrent)
+        if concurrent:
+            logger.info(f"Профиль запроса {scope['path']} снимается при {concurrent} параллельных запросах: они тоже попадут в профиль")
+
+        async def send_with_header(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((PROFILE_FILE_HEADER, os.path.basename(path).encode()))
+                headers.append((PROFILE_CONCURRENT_HEADER, str(concurrent).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        started = time.perf_counter()
+        loop_thread_id = threading.get_ident()
+        if mode == "cprofile":
+            profiler = cProfile.Profile()
+            # Потоки aiosqlite и инференса cProfile не видит — их стеки снимает сэмплер
+            sampler = StackSampler(loop_thread_id, self.interval, skip_thread_id=loop_thread_id)
+            sampler.start()
+            profiler.enable()
+            try:
+                await self.app(scope, receive, send_with_header)
+            finally:
+                profiler.disable()
+                sampler.stop()
+                profiler.dump_stats(path)
+                sampler.dump(f"{os.path.splitext(path)[0]}.threads.folded")
+        else:
+            sampler = StackSampler(loop_thread_id, self.interval)
+            sampler.start()
+            try:
+                await self.app(scope, receive, send_with_header)
+            finally:
+                sampler.stop()
+                sampler.dump(path)
+
+        logger.info(
+            f"Профиль запроса {scope['path']} ({mode}, {(time.perf_counter() - started) * 1000:.1f} мс) сохранен: {path}"
+        )
+
+    def _requested_mode(self, scope) -> str | None:
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER:
+                value = value.decode().strip().lower()
+                if value in ("sample", "cprofile"):
+                    return value
+                return self.default_mode
+        return None
+
+    def _profile_path(self, scope, mode: str, concurrent: int = 0) -> str:
+        slug = re.sub(r"[^\w]+", "_", scope["path"]).strip("_") or "root"
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        extension = "prof" if mode == "cprofile" else "folded"
+        suffix = f"_concurrent{concurrent}" if concurrent else ""
+        return os.path.join(self.output_dir, f"{timestamp}_{scope['method']}_{slug}{suffix}.{extension}")
@@ -0,0 +1,157 @@
+import asyncio
+import json
+import os
+from collections import OrderedDict
+from contextlib import AsyncExitStack, asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncGenerator, Awaitable, Callable, TypeVar
+
+from core.config.settings import DATASET_SHARDS, DIMENSION_CHECK_INTERVAL_S
+from core.models.geo import BuildingOrm
+from core.utils.db_util import DB_PATH, async_session_maker
+from core.utils.dimension_util import DimensionCache, dimensions
+from core.utils.metrics_util import metrics
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+# Шардирование dataset.db по городам: у каждого города своя база (и своя блокировка записи SQLite).
+# Карта шардов — shards.json из python -m core.shard.split, путь к ней — DATASET_SHARDS.
+# Без DATASET_SHARDS шард один — DATABASE_PATH, ключ None, и все работает как с одной базой.
+# Репозитории ходят в шарды через роутеры (BlackoutRepositoryRouter, AddressRepositoryRouter):
+# запросы по зданию — в шард его города, списки и справочники — во все шарды параллельно со склейкой.
+
+T = TypeVar("T")
+
+# Сколько зданий помнит справочник «здание -> шард» (LRU); остальные ищутся во всех шардах заново
+BUILDING_SHARD_CACHE_SIZE = 100_000
+
+
+@dataclass
+class Shard:
+    key: str | None  # id города; None — единственная база без шардирования
+    city: str | None
+    path: str
+    session_maker: async_sessionmaker
+    dimensions: DimensionCache
+
+
+def load_shard_map(map_path: str) -> list[dict]:
+    """Шарды из shards.json; пути в карте — относительно ее папки."""
+    with open(map_path, encoding="utf-8") as f:
+        shard_map = json.load(f)
+    base_dir = os.path.dirname(os.path.abspath(map_path))
+    return [
+        {**shard, "path": os.path.join(base_dir, shard["path"])}
+        for shard in shard_map["shards"]
+    ]
+
+
+def encode_change_token(tokens: dict[str | None, int]) -> str:
+    """Токен журнала изменений: число для одной базы, «город:seq,...» для шардов."""
+    if list(tokens) == [None]:
+        return str(tokens[None])
+    return ",".join(f"{key}:{seq}" for key, seq in sorted(tokens.items()))
+
+
+def decode_change_token(token: str, keys: list[str | None]) -> dict[str | None, int] | None:
+    """Токены по шардам; None — токен не разбирается или не от этого набора шардов."""
+    try:
+        if keys == [None]:
+            return {None: int(token)}
+        tokens = {key: int(seq) for key, seq in (part.split(":") for part in token.split(","))}
+    except ValueError:
+        return None
+    return tokens if set(tokens) == set(keys) else None
+
+
+class ShardRouter:
+    """
+    Шарды и справочник «здание -> шард», который заполняется при первых обращениях к зданиям.
+    Справочник — LRU на BUILDING_SHARD_CACHE_SIZE зданий; сбрасывается при замене базы шарда (forget_buildings).
+    """
+
+    def __init__(self, shards: list[Shard]):
+        self.shards = {shard.key: shard for shard in shards}
+        self.keys = list(self.shards)
+        self._building_shards: OrderedDict[str, str | None] = OrderedDict()
+
+        metrics.gauge("shards", lambda: len(self.shards))
+        metrics.gauge("shard_known_buildings", lambda: len(self._building_shards))
+
+    @classmethod
+    def from_env(cls) -> "ShardRouter":
+        if not DATASET_SHARDS:
+            return cls([Shard(key=None, city=None, path=DB_PATH, session_maker=async_session_maker, dimensions=dimensions)])
+        shards = []
+        for number, shard in enumerate(load_shard_map(DATASET_SHARDS)):
+            engine = create_async_engine(f"sqlite+aiosqlite:///{shard['path']}")
+            shards.append(Shard(
+                key=shard["city_id"],
+                city=shard.get("city"),
+                path=shard["path"],
+                session_maker=async_sessionmaker(engine, expire_on_commit=False),
+                dimensions=DimensionCache(check_interval=DIMENSION_CHECK_INTERVAL_S, name=f"dimension_shard{number}"),
+            ))
+        return cls(shards)
+
+    @asynccontextmanager
+    async def sessions(self) -> AsyncGenerator[dict[str | None, AsyncSession], None]:
+        """Сессия на каждый шард (соединение открывается только при первом запросе в шард)."""
+        async with AsyncExitStack() as stack:
+            sessions = {}
+            for key, shard in self.shards.items():
+                session = await stack.enter_async_context(shard.session_maker())
+                await stack.enter_async_context(session.begin())
+                sessions[key] = session
+            yield sessions
+
+    async def fan_out(self, items: dict[str | None, T], func: Callable[[str | None, T], Awaitable]) -> list:
+        """func для каждого шарда параллельно; результаты в порядке шардов."""
+        if len(items) == 1:
+            key, item = next(iter(items.items()))
+            return [await func(key, item)]
+        metrics.inc("shard_fan_out")
+        return list(await asyncio.gather(*(func(key, item) for key, item in items.items())))
+
+    async def locate_buildings(self, sessions: dict[str | None, AsyncSession], building_ids: list[str]) -> dict[str, str | None]:
+        """
+        Шард каждого найденного здания; неизвестные ищутся во всех шардах сразу.
+        При единственном шарде база не опрашивается — все здания относятся к нему, существование не проверяется.
+        """
+        if len(self.shards) == 1:
+            return dict.fromkeys(building_ids, self.keys[0])
+
+        located = {}
+        unknown = []
+        for building_id in building_ids:
+            if building_id in self._building_shards:
+                self._building_shards.move_to_end(building_id)
+                located[building_id] = self._building_shards[building_id]
+            else:
+                unknown.append(building_id)
+
+        if unknown:
+            async def find(key, session):
+                found = (await session.execute(select(BuildingOrm.id).where(BuildingOrm.id.in_(unknown)))).scalars().all()
+                return {building_id: key for building_id in found}
+
+            for found in await self.fan_out(sessions, find):
+                located.update(found)
+                self._building_shards.update(found)
+            while len(self._building_shards) > BUILDING_SHARD_CACHE_SIZE:
+                self._building_shards.popitem(last=False)
+
+        return {building_id: located[building_id] for building_id in building_ids if building_id in located}
+
+    def forget_buildings(self):
+        """Сброс справочника «здание -> шард» — после замены базы какого-либо шарда."""
+        self._building_shards = OrderedDict()
+        metrics.inc("shard_buildings_forgotten")
+
+
+shard_router = ShardRouter.from_env()
+
+
+async def get_shard_sessions() -> AsyncGenerator[dict[str | None, AsyncSession], None]:
+    async with shard_router.sessions() as sessions:
+        yield sessions
@@ -0,0 +1,156 @@
+import asyncio
+import itertools
+import os
+import sqlite3
+import time
+from typing import Callable
+
+from core.utils import db_util
+from core.utils.common_util import logger
+from core.utils.metrics_util import metrics
+from core.utils.shard_util import Shard, shard_router
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+# Снапшот базы в памяти (IN_MEMORY_SNAPSHOT=true): dataset.db и weather.db для API только читаются,
+# поэтому при старте каждая база копируется в память через sqlite3 backup один раз, и все соединения пула
+# работают с этой копией по shared-cache URI (file:<имя>?mode=memory&cache=shared) — чтения без диска.
+# Наблюдатель раз в SNAPSHOT_WATCH_INTERVAL_S сверяет размер и mtime файла (и его -wal); при изменении
+# в отдельном потоке собирается новое поколение и подменяет фабрику сессий одним присваиванием.
+# Запросы, уже начатые на старом поколении, дочитывают его: база в памяти живет, пока открыто хоть одно
+# соединение к ней, поэтому старое поколение закрывается только после SNAPSHOT_RETIRE_AFTER_S.
+
+_generations = itertools.count(1)
+
+
+class SnapshotGeneration:
+    """Одна копия базы в памяти: держащее соединение, движок и фабрика сессий над ней."""
+
+    def __init__(self, name: str, path: str):
+        self.number = next(_generations)
+        self.uri = f"file:{name}-{self.number}?mode=memory&cache=shared"
+        self.signature = file_signature(path)
+
+        # Соединение-владелец: пока оно открыто, база в памяти существует
+        self.holder = sqlite3.connect(self.uri, uri=True, check_same_thread=False)
+        source = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            source.backup(self.holder)
+        finally:
+            source.close()
+
+        self.engine: AsyncEngine = create_async_engine(
+            f"sqlite+aiosqlite:///{self.uri}&uri=true",
+            # Для mode=memory SQLAlchemy выбрал бы одно общее соединение (StaticPool); нужен пул
+            poolclass=AsyncAdaptedQueuePool,
+        )
+        event.listen(self.engine.sync_engine, "connect", _make_query_only)
+        self.session_maker = async_sessionmaker(self.engine, expire_on_commit=False)
+        self.loaded_at = time.monotonic()
+
+    async def close(self):
+        await self.engine.dispose()
+        self.holder.close()
+
+
+def _make_query_only(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA query_only = ON")
+    cursor.close()
+
+
+def file_signature(path: str) -> tuple:
+    """Размер и mtime файла базы и ее WAL: меняются при любой записи в базу."""
+    signature = []
+    for file_path in (path, f"{path}-wal"):
+        try:
+            stat = os.stat(file_path)
+            signature.append((stat.st_size, stat.st_mtime_ns))
+        except FileNotFoundError:
+            signature.append(None)
+    return tuple(signature)
+
+
+class MemorySnapshot:
+    """
+    База в памяти с горячей заменой. on_swap получает новую фабрику сессий —
+    туда, откуда ее берут зависимости запросов (шард, get_session_weather_obj).
+    """
+
+    def __init__(self, name: str, path: str, on_swap: Callable[[async_sessionmaker], None]):
+        self.name = name
+        self.path = path
+        self.on_swap = on_swap
+        self.current: SnapshotGeneration | None = None
+        self.retired: list[tuple[float, SnapshotGeneration]] = []
+
+        metrics.gauge(f"snapshot_{name}_generation", lambda: self.current.number if self.current else 0)
+
+    async def load(self):
+        started = time.perf_counter()
+        generation = await asyncio.to_thread(SnapshotGeneration, self.name, self.path)
+        previous, self.current = self.current, generation
+        self.on_swap(generation.session_maker)
+        if previous is not None:
+            self.retired.append((time.monotonic(), previous))
+        metrics.inc(f"snapshot_{self.name}_loads")
+        logger.info(f"Снапшот {self.name} ({self.path}) загружен в память за {time.perf_counter() - started:.1f} с")
+
+    def is_stale(self) -> bool:
+        return self.current is None or file_signature(self.path) != self.current.signature
+
+    async def close_retired(self, older_than: float):
+        keep = []
+        for retired_at, generation in self.retired:
+            if time.monotonic() - retired_at >= older_than:
+                await generation.close()
+            else:
+                keep.append((retired_at, generation))
+        self.retired = keep
+
+    async def close(self):
+        for _, generation in self.retired:
+            await generation.close()
+        self.retired = []
+        if self.current is not None:
+            await self.current.close()
+            self.current = None
+
+
+def create_snapshots() -> list[MemorySnapshot]:
+    """Снапшоты всех шардов dataset.db и weather.db; замена переключает фабрики, которые читают зависимости запросов."""
+    snapshots = []
+    for number, shard in enumerate(shard_router.shards.values()):
+        def swap_dataset(session_maker, shard: Shard = shard):
+            shard.session_maker = session_maker
+            shard_router.forget_buildings()
+            if shard.key is None:
+                db_util.async_session_maker = session_maker
+
+        name = "dataset" if shard.key is None else f"dataset_shard{number}"
+        snapshots.append(MemorySnapshot(name, shard.path, swap_dataset))
+
+    def swap_weather(session_maker):
+        db_util.weather_async_session_maker = session_maker
+
+    snapshots.append(MemorySnapshot("weather", db_util.WEATHER_DB_PATH, swap_weather))
+    return snapshots
+
+
+async def watch_snapshots(snapshots: list[MemorySnapshot], interval: float, retire_after: float):
+    """Фоновая задача: перезагружает снапшоты изменившихся файлов и закрывает старые поколения."""
+    while True:
+        await asyncio.sleep(interval)
+        for snapshot in snapshots:
+            try:
+                if snapshot.is_stale():
+                    # Файл еще может дописываться: грузим, только когда подпись не менялась целый интервал
+                    signature = file_signature(snapshot.path)
+                    await asyncio.sleep(interval)
+                    if file_signature(snapshot.path) == signature:
+                        await snapshot.load()
+                await snapshot.close_retired(retire_after)
+            except (sqlite3.Error, OSError) as e:
+                metrics.inc(f"snapshot_{snapshot.name}_errors")
+                logger.warning(f"Снапшот {snapshot.name} не обновлен: {e!r}")
@@ -0,0 +1,9 @@
+import os
+import sys
+
+# Тесты запускаются из папки backend: python -m pytest -q
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# settings.py требует эти переменные; для тестов моделей подходят любые значения
+os.environ.setdefault("COORD_DELTA", "0.005")
+os.environ.setdefault("WEB_URL", "http://localhost:3000")
@@ -0,0 +1,67 @@
+import numpy as np
+import torch
+import torch.nn as nn
+
+from core.nn.architecture import ImprovedDurationPredictor
+from core.nn.export_model import PARITY_ATOL, check_parity, export_scripted
+from core.nn.fused_inference import FusedDurationPredictor
+from core.nn.prediction_service import FEATURE_COLS
+
+
+class FakeScaler:
+    def __init__(self, mean, scale):
+        self.mean_ = mean
+        self.scale_ = scale
+
+
+def random_model(seed: int) -> ImprovedDurationPredictor:
+    """Модель со случайными весами и статистиками BatchNorm — чтобы свертка BN проверялась по-настоящему."""
+    torch.manual_seed(seed)
+    model = ImprovedDurationPredictor(input_dim=len(FEATURE_COLS))
+    with torch.no_grad():
+        for module in model.modules():
+            if isinstance(module, nn.BatchNorm1d):
+                module.running_mean.uniform_(-1.0, 1.0)
+                module.running_var.uniform_(0.5, 2.0)
+                module.weight.uniform_(0.5, 1.5)
+                module.bias.uniform_(-0.5, 0.5)
+    return model.eval()
+
+
+def test_folded_traced_matches_eager(tmp_path):
+    eager = random_model(seed=1)
+    scripted = export_scripted(eager, str(tmp_path / "model.pt"))
+
+    assert check_parity(eager, scripted) <= PARITY_ATOL
+
+    x = torch.randn(64, len(FEATURE_COLS), generator=torch.Generator().manual_seed(2))
+    with torch.no_grad():
+        assert torch.allclose(eager(x), scripted(x), atol=PARITY_ATOL)
+
+
+def test_fused_matches_eager():
+    models = [random_model(seed) for seed in (1, 2, 3)]
+    rng = np.random.default_rng(0)
+    scalers = [
+        FakeScaler(rng.normal(size=len(FEATURE_COLS)), rng.uniform(0.5, 2.0, size=len(FEATURE_COLS)))
+        for _ in models
+    ]
+    fused = FusedDurationPredictor(models, scalers).eval()
+
+    x = torch.randn(90, len(FEATURE_COLS), generator=torch.Generator().manual_seed(3))
+    type_index = torch.randint(0, len(models), (90,), generator=torch.Generator().manual_seed(4))
+
+    expected = torch.empty(90)
+    with torch.no_grad():
+        for i, (model, scaler) in enumerate(zip(models, scalers)):
+            rows = type_index == i
+            scaled = (x[rows] - torch.tensor(scaler.mean_, dtype=torch.float32)) / torch.tensor(scaler.scale_, dtype=torch.float32)
+            expected[rows] = model(scaled).view(-1)
+        actual = fused(x, type_index)
+
+    assert torch.allclose(actual, expected, atol=PARITY_ATOL)
+
+    # Батч из одного типа — считается только присутствующая модель
+    single = type_index == 1
+    with torch.no_grad():
+        assert torch.allclose(fused(x[single], type_index[single]), expected[single], atol=PARITY_ATOL)
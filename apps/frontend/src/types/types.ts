@@ -21,6 +21,7 @@ export interface Blackout {
 
 export interface BlackoutWithPrediction extends Blackout {
   predicted_end_date: string;
+  prediction_degraded?: boolean;
 }
 
 export interface BlackoutsQueryParams {